@@ -1,9 +1,21 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from rest_framework_simplejwt.tokens import AccessToken
 
 from custom_user.models import CustomUser
 
 
 class AuthHelper:
+    # Verified access token -> (user, user pk, cached until). Oldest used entry is at the front.
+    _cache: OrderedDict[str, tuple[CustomUser, int, float]] = OrderedDict()
+    _tokens_by_user: dict[int, set[str]] = {}
+    _lock = threading.Lock()  # Signals invalidate cache from sync threads.
+
+    cache_size: int = getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000)
+    cache_ttl: float = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60)
 
     @classmethod
     def find_user_by_access_token(cls, access_token: str) -> (CustomUser, int):
@@ -13,7 +25,75 @@ class AuthHelper:
         return: `CustomUser` object and user pk.
         """
 
+        if (cached := cls._get_cached(access_token)) is not None:
+            return cached
+
         access_token_obj = AccessToken(access_token)
         user_id = access_token_obj['user_id']
         user = CustomUser.objects.get(id=user_id)
+        cls._set_cached(access_token, access_token_obj, user)
         return user, user_id
+
+    @classmethod
+    async def afind_user_by_access_token(cls, access_token: str) -> (CustomUser, int):
+        """
+        Async version of `find_user_by_access_token`.
+        Use this in consumers instead of wrapping sync version with `sync_to_async`.
+        """
+
+        if (cached := cls._get_cached(access_token)) is not None:
+            return cached
+
+        access_token_obj = AccessToken(access_token)
+        user_id = access_token_obj['user_id']
+        user = await CustomUser.objects.aget(id=user_id)
+        cls._set_cached(access_token, access_token_obj, user)
+        return user, user_id
+
+    @classmethod
+    def invalidate_user(cls, user_id: int):
+        """
+        Drop every cached token of user.
+        Called when user is changed or one of user's token is blacklisted.
+        """
+        with cls._lock:
+            for token in cls._tokens_by_user.pop(user_id, set()):
+                cls._cache.pop(token, None)
+
+    @classmethod
+    def _get_cached(cls, access_token: str) -> tuple[CustomUser, int] | None:
+        with cls._lock:
+            cached = cls._cache.get(access_token, None)
+            if cached is None:
+                return None
+
+            user, user_id, until = cached
+            if until <= time.time():
+                cls._remove(access_token, user_id)
+                return None
+
+            cls._cache.move_to_end(access_token)
+            return user, user_id
+
+    @classmethod
+    def _set_cached(cls, access_token: str, access_token_obj: AccessToken, user: CustomUser):
+        # Never keep token longer than it is valid.
+        until = min(access_token_obj['exp'], time.time() + cls.cache_ttl)
+
+        with cls._lock:
+            cls._cache[access_token] = (user, user.id, until)
+            cls._cache.move_to_end(access_token)
+            cls._tokens_by_user.setdefault(user.id, set()).add(access_token)
+
+            while len(cls._cache) > cls.cache_size:
+                oldest, (_, oldest_user_id, _) = next(iter(cls._cache.items()))
+                cls._remove(oldest, oldest_user_id)
+
+    @classmethod
+    def _remove(cls, access_token: str, user_id: int):
+        cls._cache.pop(access_token, None)
+        tokens = cls._tokens_by_user.get(user_id, None)
+        if tokens is not None:
+            tokens.discard(access_token)
+            if not tokens:
+                del cls._tokens_by_user[user_id]
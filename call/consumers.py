@@ -6,14 +6,13 @@ from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
 from custom_user.models import CustomUser
 
-from asgiref.sync import sync_to_async
-
 from Hasher.Hasher import Hasher
 
 from AuthHelper import AuthHelper
+from websocket.metrics import InstrumentedConsumerMixin
 
 
-class CallConsumer(AsyncJsonWebsocketConsumer):
+class CallConsumer(InstrumentedConsumerMixin, AsyncJsonWebsocketConsumer):
     user: CustomUser | None = None
     user_channel = None  # one channel for one user
     group_channel = None  # group channel for group call
@@ -35,9 +34,9 @@ class CallConsumer(AsyncJsonWebsocketConsumer):
         if content.get("authorization", None) is not None:
             if self.user is None:
                 try:
-                    self.user, _ = await sync_to_async(
-                        AuthHelper.find_user_by_access_token
-                    )(content.get("authorization"))
+                    self.user, _ = await AuthHelper.afind_user_by_access_token(
+                        content.get("authorization")
+                    )
                     self.user_channel = f"call_{self.user.id}"
                     await self.after_auth()
 
@@ -95,6 +94,7 @@ class CallConsumer(AsyncJsonWebsocketConsumer):
         if request is none, send sdp exchange info request
         """
         request = content.get("request", None)
+        self.label_message(request or content.get("type", None) or "unknown")
 
         if request is not None:
             request = request.split(".")
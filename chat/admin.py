@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from chat.models import Chat, ChatBookmark
+from chat.models import Chat, ChatArchiveSegment, ChatBookmark
 
 
 @admin.register(Chat)
@@ -15,3 +15,9 @@ class ChatBookmarkAdmin(admin.ModelAdmin):
     list_display = ['id', 'chat', 'issuer', 'created_at']
     search_fields = ['id', 'chat', 'issuer']
     list_filter = ['issuer']
+
+
+@admin.register(ChatArchiveSegment)
+class ChatArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'first_id', 'last_id', 'chat_count', 'key', 'created_at']
+    list_filter = ['channel']
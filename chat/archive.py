@@ -0,0 +1,235 @@
+import gzip
+import json
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from chat.models import Chat, ChatArchiveSegment, ChatBookmark
+from chat_channel.models import ChatChannel
+from chat_counter.models import Counter
+from chat_reaction.models import ChatReaction
+from custom_user.models import CustomUser
+from file.models import File
+from notifications.models import Notification
+from search.signals import bulk_chat_change
+
+ARCHIVE_AFTER_DAYS: int = getattr(settings, 'CHAT_ARCHIVE_AFTER_DAYS', 180)
+SEGMENT_SIZE: int = getattr(settings, 'CHAT_ARCHIVE_SEGMENT_SIZE', 5000)  # chats per segment
+
+
+def archivable(channel: ChatChannel, before) -> QuerySet:
+    """
+    Chats older than `before` and newer than last segment, Oldest first.
+    Chats still referenced (last read chat of `Counter`, unread `Notification`, bookmark) stay in table,
+    Because deleting chat cascades to them.
+    """
+    last_id = ChatArchiveSegment.objects.filter(channel=channel).values_list('last_id', flat=True).first() or 0
+    return Chat.objects.filter(channel=channel, id__gt=last_id, created_at__lt=before).exclude(
+        Exists(Counter.objects.filter(most_recent_chat=OuterRef('pk')))
+    ).exclude(
+        Exists(Notification.objects.filter(chat=OuterRef('pk'), had_read=False))
+    ).exclude(
+        Exists(ChatBookmark.objects.filter(chat=OuterRef('pk')))
+    ).order_by('id')
+
+
+def to_record(chat: Chat) -> dict:
+    return {
+        'id': chat.id,
+        'message': chat.message,
+        'chatter_id': chat.chatter_id,
+        'file_id': chat.file_id,
+        'created_at': chat.created_at.isoformat(),
+        'reactions': [{'id': reaction.id, 'icon': reaction.icon,
+                       'reactors': [user.id for user in reaction.reactors.all()]}
+                      for reaction in chat.reaction.all()],
+    }
+
+
+def segment_key(channel_id: int, first_id: int, last_id: int) -> str:
+    return f'archive/chat/{channel_id}/{first_id}-{last_id}.jsonl.gz'
+
+
+def segment_body(chats: list[Chat]) -> bytes:
+    return b''.join(json.dumps(to_record(chat), ensure_ascii=False).encode() + b'\n' for chat in chats)
+
+
+def write_segment(key: str, body: bytes):
+    """
+    Always at `key`. Object left by failed run of same chats is overwritten, Not renamed by storage.
+    """
+    if default_storage.exists(key):
+        default_storage.delete(key)
+    default_storage.save(key, ContentFile(gzip.compress(body, mtime=0)))
+
+
+def archive_channel(channel: ChatChannel, before=None, segment_size: int = SEGMENT_SIZE) -> int:
+    """
+    Move archivable chats of `channel` into segments of `segment_size`. Returns number of archived chats.
+
+    Segment is written to storage first, Outside of transaction.
+    Then chats are locked and read again in a short transaction, Which deletes them and adds the segment
+    Only if they're same as written. (If not, Written one is deleted and tried again.)
+    """
+    before = before or timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    archived = 0
+    while ids := list(archivable(channel, before).values_list('id', flat=True)[:segment_size]):
+        chats = list(archivable(channel, before).filter(id__in=ids).prefetch_related('reaction__reactors'))
+        if not chats:
+            continue
+        body = segment_body(chats)
+        key = segment_key(channel.id, chats[0].id, chats[-1].id)
+        write_segment(key, body)
+
+        written = False
+        try:
+            # Search is bumped once per segment, Not for every deleted chat and reaction.
+            with bulk_chat_change([channel.workspace_id]), transaction.atomic():
+                # Locked and checked again, So a chat referenced or changed meanwhile is not deleted.
+                list(Chat.objects.select_for_update().filter(id__in=ids).values_list('id', flat=True))
+                locked = list(archivable(channel, before).filter(id__in=ids).prefetch_related('reaction__reactors'))
+                if segment_body(locked) == body:
+                    ChatArchiveSegment.objects.create(channel=channel, first_id=chats[0].id, last_id=chats[-1].id,
+                                                      chat_count=len(chats), key=key)
+                    Chat.objects.filter(id__in=[chat.id for chat in chats]).delete()
+                    written = True
+        finally:
+            if not written:
+                default_storage.delete(key)
+        if written:
+            archived += len(chats)
+    return archived
+
+
+def load_segment(key: str) -> list[dict]:
+    """
+    Records of segment, Oldest first.
+    """
+    with default_storage.open(key, 'rb') as f:
+        lines = gzip.decompress(f.read()).splitlines()
+    return [json.loads(line) for line in lines if line]
+
+
+@lru_cache(maxsize=getattr(settings, 'CHAT_ARCHIVE_CACHED_SEGMENTS', 64))
+def read_segment(key: str) -> tuple[dict, ...]:
+    """
+    Records of segment, Newest first. Cached in process, Segments never change.
+    """
+    return tuple(reversed(load_segment(key)))
+
+
+def prefetched(queryset: QuerySet, objects: list) -> QuerySet:
+    """
+    Evaluated queryset of `objects`, Like `prefetch_related` leaves in `_prefetched_objects_cache`.
+    """
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    return queryset
+
+
+def to_chats(records: list[dict], channel_id: int) -> list[Chat]:
+    """
+    Unsaved `Chat`s of records, With relations which `ChatSerializer` reads. (Users and files in one query each)
+    """
+    user_ids = {record['chatter_id'] for record in records} \
+        | {user_id for record in records for reaction in record['reactions'] for user_id in reaction['reactors']}
+    users = CustomUser.objects.in_bulk([user_id for user_id in user_ids if user_id is not None])
+    files = File.objects.select_related('uploaded_by', 'workspace').in_bulk(
+        [record['file_id'] for record in records if record['file_id'] is not None]
+    )
+
+    chats = []
+    for record in records:
+        chat = Chat(id=record['id'], message=record['message'], channel_id=channel_id,
+                    chatter=users.get(record['chatter_id'], None), file=files.get(record['file_id'], None),
+                    created_at=parse_datetime(record['created_at']))
+        reactions = []
+        for r in record['reactions']:
+            reaction = ChatReaction(id=r['id'], chat_id=chat.id, icon=r['icon'])
+            reaction._prefetched_objects_cache = {
+                'reactors': prefetched(CustomUser.objects.all(), [users[u] for u in r['reactors'] if u in users])
+            }
+            reactions.append(reaction)
+        chat._prefetched_objects_cache = {'reaction': prefetched(ChatReaction.objects.all(), reactions),
+                                          'bookmarks': prefetched(ChatBookmark.objects.all(), [])}
+        chats.append(chat)
+    return chats
+
+
+class ChatHistory:
+    """
+    Chats of a channel newest first, Table rows and archived segments together.
+    Sliced like a list (by `LimitOffsetPagination`), And only segments in the slice are read.
+    """
+
+    def __init__(self, queryset: QuerySet, channel_id: int | None):
+        self.channel_id = channel_id
+        self.segments = list(ChatArchiveSegment.objects.filter(channel_id=channel_id).order_by('-last_id'))
+        boundary = self.segments[0].last_id if self.segments else 0
+        self.recent = queryset.filter(id__gt=boundary).order_by('-id')
+        self.rest = queryset.filter(id__lte=boundary).order_by('-id')  # Not archived for reference, Only a few.
+        self._recent_count = None
+
+    @property
+    def recent_count(self) -> int:
+        if self._recent_count is None:
+            self._recent_count = self.recent.count()
+        return self._recent_count
+
+    def __len__(self):
+        if not self.segments:
+            return self.recent_count
+        return self.recent_count + self.rest.count() + sum(segment.chat_count for segment in self.segments)
+
+    def __getitem__(self, item: slice) -> list[Chat]:
+        start, stop = item.start or 0, item.stop
+        if not self.segments:
+            return list(self.recent[start:stop])
+
+        if stop is not None and stop <= self.recent_count:
+            return list(self.recent[start:stop])
+        chats = list(self.recent[start:stop]) if start < self.recent_count else []
+        offset = self.recent_count
+        return chats + self.archived(max(start - offset, 0), None if stop is None else stop - offset)
+
+    def archived(self, start: int, stop: int | None) -> list[Chat]:
+        """
+        `start` ~ `stop` of chats older than recent ones. Rows left in table are merged by id.
+        """
+        rest = list(self.rest)
+        result: list[Chat | dict] = []  # Records are made into `Chat` after slicing.
+        position = 0
+        i = 0
+        for segment in self.segments:
+            if stop is not None and position >= stop:
+                break
+            while i < len(rest) and rest[i].id > segment.last_id:  # Between this and newer segment.
+                if position >= start and (stop is None or position < stop):
+                    result.append(rest[i])
+                position += 1
+                i += 1
+            inside = [chat for chat in rest[i:] if chat.id >= segment.first_id]
+            size = segment.chat_count + len(inside)
+            if position + size > start and (stop is None or position < stop):
+                merged = sorted([*inside, *read_segment(segment.key)],
+                                key=lambda chat: chat.id if isinstance(chat, Chat) else chat['id'], reverse=True)
+                result += merged[max(start - position, 0):None if stop is None else stop - position]
+            position += size
+            i += len(inside)
+
+        for chat in rest[i:]:  # Older than every segment.
+            if stop is not None and position >= stop:
+                break
+            if position >= start:
+                result.append(chat)
+            position += 1
+
+        chats = iter(to_chats([record for record in result if isinstance(record, dict)], self.channel_id))
+        return [chat if isinstance(chat, Chat) else next(chats) for chat in result]
@@ -25,10 +25,7 @@ class ChatConsumer(AuthWebsocketConsumer):
 
     async def from_client(self, content, **kwargs):
         # Check that this client is member of given chat_channel.
-        async for member in self.chat_channel.members.all():
-            if self.user == member:
-                break
-        else:
+        if not await self.chat_channel.members.filter(id=self.user.id).aexists():
             await self.send_json({
                 'success': False,
                 'msg': 'You are not in this channel.'
@@ -0,0 +1,157 @@
+import csv
+import heapq
+import json
+import tempfile
+from itertools import islice
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File as DjangoFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from chat.archive import load_segment, to_record
+from chat.models import Chat, ChatArchiveSegment
+from chat_channel.models import ChatChannel
+from chat_reaction.serializers import Util
+from custom_user.models import CustomUser
+from file.models import File
+from file.tasks import submit_on_commit
+
+CHUNK_SIZE: int = getattr(settings, 'CHAT_EXPORT_CHUNK_SIZE', 1000)
+JOB_TIMEOUT: int = getattr(settings, 'CHAT_EXPORT_JOB_TIMEOUT', 24 * 60 * 60)  # seconds to keep status of job
+FORMATS = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+CSV_HEADER = ['id', 'created_at', 'chatter_id', 'chatter', 'message', 'file_name', 'file_url', 'reactions']
+
+
+def table_records(channel_id: int, chunk_size: int):
+    """
+    Chats in table oldest first, `chunk_size` rows per query. (Keyset by id, Not offset)
+    """
+    last_id = 0
+    while True:
+        chats = list(Chat.objects.filter(channel_id=channel_id, id__gt=last_id).order_by('id')
+                     .prefetch_related('reaction__reactors')[:chunk_size])
+        yield from (to_record(chat) for chat in chats)
+        if len(chats) < chunk_size:
+            return
+        last_id = chats[-1].id
+
+
+def archived_records(channel_id: int):
+    """
+    Archived chats oldest first, One segment in memory at a time.
+    """
+    for key in ChatArchiveSegment.objects.filter(channel_id=channel_id).order_by('first_id') \
+            .values_list('key', flat=True):
+        yield from load_segment(key)
+
+
+def records(channel: ChatChannel, chunk_size: int = CHUNK_SIZE):
+    """
+    Every chat of `channel` oldest first, With chatter and file looked up per `chunk_size` chats.
+    Memory use doesn't grow with size of channel.
+    """
+    merged = heapq.merge(archived_records(channel.id), table_records(channel.id, chunk_size),
+                         key=lambda record: record['id'])
+    while chunk := list(islice(merged, chunk_size)):
+        users = CustomUser.objects.only('id', 'username', 'display_name') \
+            .in_bulk({record['chatter_id'] for record in chunk if record['chatter_id'] is not None})
+        files = File.objects.only('id', 'file', 'file_name') \
+            .in_bulk({record['file_id'] for record in chunk if record['file_id'] is not None})
+        for record in chunk:
+            chatter = users.get(record['chatter_id'], None)
+            file = files.get(record['file_id'], None)
+            yield {
+                'id': record['id'],
+                'created_at': record['created_at'],
+                'chatter': {'id': chatter.id, 'username': chatter.username, 'display_name': chatter.display_name}
+                if chatter else None,
+                'message': record['message'],
+                'file': {'id': file.id, 'file_name': file.file_name, 'url': file.file.url} if file else None,
+                'reactions': [{'icon': Util.to_repr(reaction['icon']), 'reactors': reaction['reactors']}
+                              for reaction in record['reactions']],
+            }
+
+
+class Echo:
+    """
+    File-like object of `csv.writer`, Which returns written line instead of keeping it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def lines(channel: ChatChannel, export_format: str):
+    """
+    Encoded lines of export. (`jsonl` or `csv`)
+    """
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(CSV_HEADER).encode()
+        for record in records(channel):
+            chatter, file = record['chatter'], record['file']
+            yield writer.writerow([
+                record['id'], record['created_at'],
+                chatter['id'] if chatter else '', (chatter['display_name'] or chatter['username']) if chatter else '',
+                record['message'],
+                file['file_name'] if file else '', file['url'] if file else '',
+                ' '.join(f'{reaction["icon"]}:{len(reaction["reactors"])}' for reaction in record['reactions']),
+            ]).encode()
+    else:
+        for record in records(channel):
+            yield json.dumps(record, ensure_ascii=False).encode() + b'\n'
+
+
+def export_prefix(channel: ChatChannel) -> str:
+    return f'export/chat/{channel.hashed_value}/'
+
+
+def export_key(channel: ChatChannel, export_format: str) -> str:
+    """
+    Unique, So it's known before being written. (Storage doesn't rename it.)
+    """
+    return f'{export_prefix(channel)}{timezone.now():%Y%m%d%H%M%S}-{uuid4().hex[:8]}.{export_format}'
+
+
+def export_to_storage(channel: ChatChannel, export_format: str, key: str) -> str:
+    """
+    Write export to storage object at `key`, Returns it. Spooled to temporary file on disk, Not memory.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 1024) as f:
+        for line in lines(channel, export_format):
+            f.write(line)
+        f.seek(0)
+        return default_storage.save(key, DjangoFile(f))
+
+
+def _job_cache_key(key: str) -> str:
+    return f'chat_export:{key}'
+
+
+def start_export(channel: ChatChannel, export_format: str) -> str:
+    """
+    Export to storage in background after commit. Returns key of object to be written, Which is handle of the job.
+    """
+    key = export_key(channel, export_format)
+    cache.set(_job_cache_key(key), 'pending', timeout=JOB_TIMEOUT)
+    submit_on_commit(run_export, channel.id, export_format, key)
+    return key
+
+
+def run_export(channel_id: int, export_format: str, key: str):
+    try:
+        export_to_storage(ChatChannel.objects.get(id=channel_id), export_format, key)
+    except Exception:
+        cache.set(_job_cache_key(key), 'failed', timeout=JOB_TIMEOUT)
+        raise
+    cache.set(_job_cache_key(key), 'done', timeout=JOB_TIMEOUT)
+
+
+def export_status(key: str) -> str | None:
+    """
+    `pending`, `done` or `failed`. `None` if there is no such job. (Or it's older than `JOB_TIMEOUT`)
+    """
+    return cache.get(_job_cache_key(key))
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chat.archive import ARCHIVE_AFTER_DAYS, SEGMENT_SIZE, archivable, archive_channel
+from chat_channel.models import ChatChannel
+
+
+class Command(BaseCommand):
+    help = 'Move chats older than `--days` out of chat table into compressed segments in storage, Per channel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--segment-size', type=int, default=SEGMENT_SIZE)
+        parser.add_argument('--channel', action='append', help='Hashed value of channel. (Repeatable, All if not given)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count archivable chats.')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        channels = ChatChannel.objects.order_by('id')
+        if options['channel']:
+            channels = channels.filter(hashed_value__in=options['channel'])
+
+        total = 0
+        for channel in channels.iterator():
+            if options['dry_run']:
+                count = archivable(channel, before).count()
+            else:
+                count = archive_channel(channel, before, options['segment_size'])
+            if count:
+                self.stdout.write(f'{channel.hashed_value}: {count} chats')
+            total += count
+        self.stdout.write(f'{"Archivable" if options["dry_run"] else "Archived"} {total} chats older than {before}.')
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2023-02-20 11:03
+
+from django.db import migrations
+
+INDEX_NAME = 'chat_message_ngram_idx'
+
+
+def add_fulltext_index(apps, schema_editor):
+    """
+    MySQL only. `ngram` parser splits Korean (no spaces between words) into tokens too.
+    Other databases search with `icontains`. (See `search.backends`.)
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = schema_editor.quote_name(apps.get_model('chat', 'Chat')._meta.db_table)
+    schema_editor.execute(f'ALTER TABLE {table} ADD FULLTEXT INDEX {INDEX_NAME} (message) WITH PARSER ngram')
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = schema_editor.quote_name(apps.get_model('chat', 'Chat')._meta.db_table)
+    schema_editor.execute(f'ALTER TABLE {table} DROP INDEX {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0016_merge_20230201_1444'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.7 on 2023-04-27 09:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat_channel', '0012_alter_chatchannel_hashed_value'),
+        ('chat', '0017_chat_message_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('chat_count', models.PositiveIntegerField()),
+                ('key', models.CharField(max_length=1000)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_segments', to='chat_channel.chatchannel')),
+            ],
+            options={
+                'ordering': ['-last_id'],
+                'indexes': [models.Index(fields=['channel', 'last_id'], name='chat_archive_channel_last_idx')],
+            },
+        ),
+    ]
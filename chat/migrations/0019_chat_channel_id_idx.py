@@ -0,0 +1,21 @@
+# Generated by Django 4.1.7 on 2023-05-01 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0018_chatarchivesegment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['channel', 'id'], name='chat_channel_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatbookmark',
+            index=models.Index(fields=['issuer', 'chat'], name='chat_bookmark_issuer_idx'),
+        ),
+    ]
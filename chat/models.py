@@ -16,6 +16,9 @@ class Chat(models.Model):
         verbose_name = 'Chat'
         verbose_name_plural = 'Chats'
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['channel', 'id'], name='chat_channel_id_idx'),  # History of channel.
+        ]
 
     def __str__(self):
         return f'{self.channel} 채널의 {self.message}'
@@ -29,6 +32,31 @@ class ChatBookmark(models.Model):
     class Meta:
         verbose_name = 'Chat Bookmark'
         verbose_name_plural = 'Chat Bookmarks'
+        indexes = [
+            models.Index(fields=['issuer', 'chat'], name='chat_bookmark_issuer_idx'),
+        ]
 
     def __str__(self):
         return f'{self.chat} ({self.issuer})'
+
+
+class ChatArchiveSegment(models.Model):
+    """
+    Old chats of a channel moved out of `Chat` table, In a gzip JSONL object of storage. (See `chat.archive`)
+    Segments are append-only, And `first_id` ~ `last_id` of a channel never overlap.
+    """
+    channel = models.ForeignKey(ChatChannel, on_delete=models.CASCADE, related_name='archive_segments')
+    first_id = models.BigIntegerField()  # `Chat.id`, inclusive
+    last_id = models.BigIntegerField()
+    chat_count = models.PositiveIntegerField()
+    key = models.CharField(max_length=1000)  # Name in storage.
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-last_id']
+        indexes = [
+            models.Index(fields=['channel', 'last_id'], name='chat_archive_channel_last_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.channel} 채널의 {self.first_id} ~ {self.last_id} ({self.chat_count})'
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from chat.models import Chat, ChatArchiveSegment
+from file.models import File
+from file.storage import deletion_queue
+
+
+def load_signal():
+    print('chat signals loaded!')
+
+
+@receiver(post_delete, sender=ChatArchiveSegment)
+def after_delete_archive_segment(sender, instance: ChatArchiveSegment, **kwargs):
+    """
+    Segments are deleted with their channel. Stored object of it too.
+    """
+    transaction.on_commit(lambda: deletion_queue.enqueue(instance.key))
+
+
+@receiver(post_save, sender=Chat)
+def after_save_chat(sender, instance: Chat, created: bool, **kwargs):
+    """
+    Remember channel where file is sent first. File stays searchable there after the chat is deleted.
+    """
+    if created and instance.file_id is not None:
+        File.objects.filter(id=instance.file_id, channel__isnull=True).update(channel_id=instance.channel_id)
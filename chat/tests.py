@@ -1,3 +1,166 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from chat import archive
+from chat.models import Chat, ChatArchiveSegment, ChatBookmark
+from chat.views import ChatView
+from chat_channel.models import ChatChannel
+from chat_reaction.models import ChatReaction
+from custom_user.models import CustomUser
+from file.models import File
+from file.testing import LocalStorageMixin
+from workspace.models import Workspace
+
+
+class ChatViewQueryCountTest(LocalStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create(username='chat_user')
+        self.other = CustomUser.objects.create(username='chat_other')
+        workspace = Workspace.objects.create(name='chat_workspace', hashed_value='chatws')
+        self.channel = ChatChannel.objects.create(name='chat', workspace=workspace, hashed_value='chatch')
+        self.channel.members.add(self.user, self.other)
+
+    def add_chats(self, count: int):
+        for i in range(count):
+            chatter = self.user if i % 2 else self.other
+            file = File.objects.create(uploaded_by=chatter, workspace=self.channel.workspace,
+                                       file=ContentFile(b'chat', name=f'{i}.txt'), size=4) if i % 3 == 0 else None
+            chat = Chat.objects.create(message=f'message {i}', chatter=chatter, channel=self.channel, file=file)
+            reaction = ChatReaction.objects.create(chat=chat, icon='\\U0001f44d')
+            reaction.reactors.add(self.user, self.other)
+            ChatBookmark.objects.create(chat=chat, issuer=self.user if i % 2 else self.other)
+
+    def history(self, **params):
+        """
+        Call view directly, So queries of middlewares (profiler...) are not counted.
+        """
+        request = APIRequestFactory().get('/chat/chatch/', params)
+        force_authenticate(request, user=self.user)
+        response = ChatView.as_view()(request, channel__hashed_value='chatch')
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def history_queries(self, **params) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            self.history(**params)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_chats(self):
+        self.add_chats(3)
+        few = self.history_queries(limit=50, offset=0)
+        self.add_chats(30)
+        many = self.history_queries(limit=50, offset=0)
+
+        self.assertEqual(few, many)
+        # Channel, archive segments, count, page, bookmarks, reactions, reactors.
+        self.assertEqual(many, 7)
+
+    def test_channel_is_resolved_once(self):
+        self.add_chats(5)
+        with CaptureQueriesContext(connection) as queries:
+            self.history(limit=10, offset=0)
+
+        channel_table = ChatChannel._meta.db_table
+        self.assertEqual(sum(channel_table in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_has_bookmarked_is_only_mine(self):
+        self.add_chats(4)
+        data = self.history().data
+
+        mine = set(ChatBookmark.objects.filter(issuer=self.user).values_list('chat_id', flat=True))
+        self.assertEqual({chat['id'] for chat in data if chat['has_bookmarked']}, mine)
+
+
+class ArchiveTest(LocalStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create(username='archive_user')
+        workspace = Workspace.objects.create(name='archive_workspace', hashed_value='archivews')
+        self.channel = ChatChannel.objects.create(name='archive', workspace=workspace, hashed_value='archivech')
+        self.channel.members.add(self.user)
+        self.chats = [Chat.objects.create(message=f'old {i}', chatter=self.user, channel=self.channel)
+                      for i in range(3)]
+        self.before = timezone.now() + timedelta(seconds=1)
+
+    def test_moved_into_segment(self):
+        self.assertEqual(archive.archive_channel(self.channel, self.before), 3)
+
+        segment = ChatArchiveSegment.objects.get()
+        self.assertEqual(segment.key, archive.segment_key(self.channel.id, self.chats[0].id, self.chats[-1].id))
+        self.assertEqual([record['message'] for record in archive.load_segment(segment.key)],
+                         ['old 0', 'old 1', 'old 2'])
+        self.assertFalse(Chat.objects.exists())
+
+    def test_changed_while_writing(self):
+        write_segment = archive.write_segment
+
+        def edit_meanwhile(key, body):
+            write_segment(key, body)
+            if not ChatBookmark.objects.exists():  # Only at first try.
+                ChatBookmark.objects.create(chat=self.chats[1], issuer=self.user)
+
+        with mock.patch('chat.archive.write_segment', side_effect=edit_meanwhile):
+            self.assertEqual(archive.archive_channel(self.channel, self.before), 2)
+
+        # Bookmarked one stays in table, And written again without it. (Same range, So same key)
+        self.assertEqual(list(Chat.objects.values_list('id', flat=True)), [self.chats[1].id])
+        segment = ChatArchiveSegment.objects.get()
+        self.assertEqual([record['message'] for record in archive.load_segment(segment.key)], ['old 0', 'old 2'])
+
+    def test_failed_one_leaves_no_object(self):
+        with mock.patch('chat.archive.ChatArchiveSegment.objects.create', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            archive.archive_channel(self.channel, self.before)
+
+        self.assertEqual(Chat.objects.count(), 3)
+        self.assertFalse(default_storage.exists(
+            archive.segment_key(self.channel.id, self.chats[0].id, self.chats[-1].id)))
+
+
+class ExportTest(LocalStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create(username='export_admin')
+        self.member = CustomUser.objects.create(username='export_member')
+        workspace = Workspace.objects.create(name='export_workspace', hashed_value='exportws')
+        self.channel = ChatChannel.objects.create(name='export', workspace=workspace, hashed_value='exportch')
+        self.channel.members.add(self.admin, self.member)
+        self.channel.admins.add(self.admin)
+        Chat.objects.create(message='exported', chatter=self.member, channel=self.channel)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        return self.client.get('/chat/export/exportch/', params)
+
+    def test_to_storage_in_background(self):
+        with mock.patch('chat.export.submit_on_commit') as submit:
+            response = self.export(to_storage='true')
+        self.assertEqual(response.status_code, 202)
+        key = response.json()['key']
+        self.assertEqual(self.export(job=key).json()['status'], 'pending')
+
+        fn, *args = submit.call_args.args
+        fn(*args)  # Like background thread.
+
+        job = self.export(job=key).json()
+        self.assertEqual((job['status'], job['url'] is not None), ('done', True))
+        with default_storage.open(key, 'rb') as f:
+            self.assertIn('exported', f.read().decode())
+
+    def test_job_of_other_channel(self):
+        self.assertEqual(self.export(job='export/chat/otherch/1.jsonl').status_code, 404)
 
-# Create your tests here.
+    def test_only_admins(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.export().status_code, 403)
@@ -1,15 +1,24 @@
+from urllib.parse import quote
+
+from django.core.files.storage import default_storage
 from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework import generics, status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.generics import get_object_or_404
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from chat import export
+from chat.archive import ChatHistory
 from chat.models import Chat, ChatBookmark
 from chat.serializers import ChatSerializer, ChatBookmarkSerializer
+from chat_channel.models import ChatChannel
 from chat_reaction.models import ChatReaction
 from chat_reaction.serializers import ChatReactionListSerializer
 from custom_user.models import CustomUser
+from file.downloads import aiterate
 
 
 class ChatView(generics.ListAPIView):
@@ -21,24 +30,25 @@ class ChatView(generics.ListAPIView):
     pagination_class = LimitOffsetPagination
     queryset = Chat.objects.all()
 
+    def get_channel_id(self) -> int | None:
+        if not hasattr(self, '_channel_id'):
+            self._channel_id = ChatChannel.id_of(self.kwargs.get('channel__hashed_value', None))
+        return self._channel_id
+
     def get_queryset(self):
-        chv = self.kwargs.get('channel__hashed_value', None)
+        # Prefetches are filtered by `chat_id IN (...)` of the page already.
         return self.queryset \
-            .select_related('file', 'chatter', 'channel') \
-            .filter(channel__hashed_value__exact=chv) \
+            .select_related('file__uploaded_by', 'file__workspace', 'chatter') \
+            .filter(channel_id=self.get_channel_id()) \
             .prefetch_related(
             Prefetch(
                 'bookmarks',
-                queryset=ChatBookmark.objects.filter(chat__channel__hashed_value__exact=chv)
+                queryset=ChatBookmark.objects.filter(issuer_id=self.request.user.id)
             ),
             Prefetch(
                 'reaction',
-                queryset=(ChatReaction.objects.filter(chat__channel__hashed_value__exact=chv)
-                          .select_related('chat')
-                          .prefetch_related(Prefetch('reactors',
-                                                     queryset=CustomUser.objects.all())
-                                            )
-                          )
+                queryset=ChatReaction.objects.prefetch_related(Prefetch('reactors',
+                                                                        queryset=CustomUser.objects.all()))
             )
         )
 
@@ -47,11 +57,11 @@ class ChatView(generics.ListAPIView):
         url query에 `limit`, `offset`을 넣지 않으면 전체 값으로 일반 배열 형태로 결과가 나오고,
         넣었다면 아래 문서와 같이 results에 배열로 값이 들어갑니다.
         `has_bookmarked` field는 오직 "내가 북마크 했는지"만 표시됨으로, true 혹은 false값이 나옵니다.
+        오래된 채팅은 보관(archive)된 곳에서 읽어 이어서 줍니다. (응답 모양은 같음.)
         """
-        q = self.get_queryset()
-        q = list(q)  # For evaluating of queryset. If not to do this now, Redundant query will be executed.
-        if page := self.paginate_queryset(q):
-            q = page
+        history = ChatHistory(self.get_queryset(), self.get_channel_id())
+        page = self.paginate_queryset(history)
+        q = page if page is not None else history[:]
         s = self.get_serializer(q, many=True)
 
         data = s.data[:]
@@ -71,6 +81,46 @@ class ChatView(generics.ListAPIView):
             return Response(data)
 
 
+class ChatExportView(generics.GenericAPIView):
+    queryset = ChatChannel.objects.all()
+
+    def get(self, request: Request, *args, **kwargs):
+        """
+        채널의 모든 채팅(보관된 것 포함)을 오래된 순으로 내려받습니다. 채널 `admins`나 staff만 가능하고, 아니면 403.
+        `type`은 `jsonl`(기본) 또는 `csv`.
+        `to_storage=true`를 주면 파일로 내려주는 대신 백그라운드에서 storage에 저장합니다. (202, 작업의 `key`를 줌)
+        그 `key`를 `job`으로 주면 작업의 `status`(`pending`, `done`, `failed`)를 주고, `done`이면 `url`도 줍니다.
+        """
+        channel = get_object_or_404(ChatChannel, hashed_value=kwargs.get('channel__hashed_value', None))
+        if not request.user.is_staff and not channel.admins.filter(id=request.user.id).exists():
+            raise PermissionDenied('Only admins of channel can export it.')
+
+        if job := request.query_params.get('job', None):
+            job_status = export.export_status(job) if job.startswith(export.export_prefix(channel)) else None
+            if job_status is None:
+                return Response({'msg': 'No such export job.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'key': job, 'status': job_status,
+                             'url': default_storage.url(job) if job_status == 'done' else None})
+
+        export_format = request.query_params.get('type', 'jsonl')
+        if export_format not in export.FORMATS:
+            return Response({'msg': f'type should be one of {", ".join(export.FORMATS)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('to_storage', '').lower() == 'true':
+            key = export.start_export(channel, export_format)
+            return Response({'key': key, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+
+        # Async iterator, So lines are sent chunk by chunk. (Sync one is read whole into memory under ASGI.)
+        # Chunks are read on the thread of other ORM calls, Lines run queries.
+        response = StreamingHttpResponse(aiterate(export.lines(channel, export_format), batch=export.CHUNK_SIZE,
+                                                  thread_sensitive=True),
+                                         content_type=export.FORMATS[export_format])
+        file_name = f'{channel.name}.{export_format}'
+        response.headers['Content-Disposition'] = f'attachment; filename*=UTF-8\'\'{quote(file_name)}'
+        return response
+
+
 class ChatBookmarkCreateView(generics.CreateAPIView):
     queryset = ChatBookmark.objects.all()
     serializer_class = ChatBookmarkSerializer
@@ -53,3 +53,10 @@ class ChatChannel(models.Model):
 
     def __str__(self):
         return f'{self.name} ({self.hashed_value} / {self.workspace})'
+
+    @classmethod
+    def id_of(cls, hashed_value: str | None) -> int | None:
+        """
+        Resolve hashed value to id once, So following queries filter by `channel_id` without joining channel.
+        """
+        return cls.objects.filter(hashed_value=hashed_value).values_list('id', flat=True).first()
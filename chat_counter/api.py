@@ -14,6 +14,16 @@ class CounterApi:
         chv = kwargs.get("channel__hashed_value", None)
         if chv:
             self.chv = chv
+        self._channel_id = None
+
+    @property
+    def channel_id(self):
+        """
+        id of `chv`, resolved once per api (request).
+        """
+        if self._channel_id is None and self.chv:
+            self._channel_id = ChatChannel.id_of(self.chv)
+        return self._channel_id
 
     def get_list(self, **kwargs):
         """
@@ -25,13 +35,8 @@ class CounterApi:
         if not self.chv:
             chv = kwargs.get("channel__hashed_value", None)
 
-        reading = self.counter.filter(channel__hashed_value=self.chv, is_reading=True)
-        not_reading = self.counter.filter(
-            channel__hashed_value=self.chv, is_reading=False
-        )
-
         counters = list(
-            ChatChannel.objects.filter(hashed_value=self.chv)
+            ChatChannel.objects.filter(id=self.channel_id)
             .values("counter__most_recent_chat_id")
             .annotate(total=Count("members", distinct=True))
             .annotate(
@@ -88,9 +93,11 @@ class CounterApi:
                 most_recent_chat,
                 is_reading,
             )
+        elif self.channel_id is None:
+            raise ValueError("CounterApi>>__get_counter:ERROR, no such channel", self.chv)
         else:
             self.counter.update_or_create(
-                channel__hashed_value=self.chv,
+                channel_id=self.channel_id,
                 user=user,
                 defaults={
                     "most_recent_chat_id": most_recent_chat,
@@ -1,11 +1,10 @@
 import json
 
-from channels.db import database_sync_to_async
 from rest_framework.serializers import ValidationError
 
 from chat_channel.models import ChatChannel
 from chat_reaction.models import ChatReaction
-from chat_reaction.serializers import ChatReactionSerializer
+from chat_reaction.serializers import Util
 from websocket.AuthWebsocketConsumer import AuthWebsocketConsumer
 
 
@@ -13,39 +12,49 @@ class ReactionConsumer(AuthWebsocketConsumer):
     chat_channel: ChatChannel | None = None
     channel_hash: str | None = None
 
-    @database_sync_to_async
-    def create_or_add(self, chat_id, icon):
+    async def create_or_add(self, chat_id, icon):
         icon = icon.encode("unicode_escape").decode("ascii")
 
-        reaction, is_created = ChatReaction.objects.get_or_create(
+        reaction, is_created = await ChatReaction.objects.aget_or_create(
             chat_id=chat_id, icon=icon
         )
 
-        if self.user not in reaction.reactors.all():
-            reaction.reactors.add(self.user)
-            serial = ChatReactionSerializer(reaction)
-            return serial.data
+        if not await reaction.reactors.filter(id=self.user.id).aexists():
+            await reaction.reactors.aadd(self.user)
+            return await self.serialize(reaction)
         else:
             raise ValidationError(f"{self.user} was found in reactors (Duplication)")
 
-    @database_sync_to_async
-    def remove_or_delete(self, chat_id, icon):
+    async def remove_or_delete(self, chat_id, icon):
         __icon = icon.encode("unicode_escape").decode("ascii")
 
         try:
-            reaction = ChatReaction.objects.get(chat_id=chat_id, icon=__icon)
+            reaction = await ChatReaction.objects.aget(chat_id=chat_id, icon=__icon)
         except ChatReaction.DoesNotExist:
             raise ValidationError("There is no reaction like that")
 
-        if self.user not in reaction.reactors.all():
+        if not await reaction.reactors.filter(id=self.user.id).aexists():
             raise ValidationError(f"{self.user} was not found in reactors (Not Found)")
         else:
-            reaction.reactors.remove(self.user)
-            serial = ChatReactionSerializer(reaction)
-            if reaction.reactors.count() == 0:
-                reaction.delete()
+            await reaction.reactors.aremove(self.user)
+            if await reaction.reactors.acount() == 0:
+                await reaction.adelete()
                 return {"chat_id": chat_id, "icon": icon, "reactors": [], "count": 0}
-            return serial.data
+            return await self.serialize(reaction)
+
+    @staticmethod
+    async def serialize(reaction: ChatReaction):
+        """
+        Same output with `ChatReactionSerializer`, But without sync queries of serializer.
+        """
+        reactors = [pk async for pk in reaction.reactors.values_list("id", flat=True)]
+        return {
+            "chat_id": reaction.chat_id,
+            "id": reaction.id,
+            "icon": Util.to_repr(reaction.icon),
+            "count": len(reactors),
+            "reactors": reactors,
+        }
 
     async def before_accept(self):
         channel_hash = self.scope["url_route"]["kwargs"]["chat_channel_hashed_value"]
@@ -87,7 +96,11 @@ class ReactionConsumer(AuthWebsocketConsumer):
             else:
                 await self.channel_layer.group_send(
                     self.room_group_name,
-                    {"type": "reaction.broadcast", "reaction": reaction},
+                    {
+                        "type": "reaction.broadcast",
+                        "reaction": reaction,
+                        "chat_channel_hashed_value": self.channel_hash,
+                    },
                 )
         elif mode == "delete":
             icon = content.get("icon")
@@ -99,7 +112,11 @@ class ReactionConsumer(AuthWebsocketConsumer):
             else:
                 await self.channel_layer.group_send(
                     self.room_group_name,
-                    {"type": "reaction.broadcast", "reaction": reaction},
+                    {
+                        "type": "reaction.broadcast",
+                        "reaction": reaction,
+                        "chat_channel_hashed_value": self.channel_hash,
+                    },
                 )
         else:
             await self.send_json(
@@ -1,3 +1,39 @@
-from django.test import TestCase
+from django.test import TransactionTestCase
 
-# Create your tests here.
+from chat.models import Chat
+from chat_channel.models import ChatChannel
+from chat_reaction import routing
+from chat_reaction.models import ChatReaction
+from custom_user.models import CustomUser
+from websocket.testing import auth_communicator, no_blocking_queries
+from workspace.models import Workspace
+
+
+class ReactionConsumerTest(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='reaction_user')
+        workspace = Workspace.objects.create(name='reaction_workspace')
+        channel = ChatChannel.objects.create(name='reaction', workspace=workspace, hashed_value='reactch')
+        self.chat = Chat.objects.create(message='hello', chatter=self.user, channel=channel)
+
+    async def test_create_and_delete_without_blocking_loop(self):
+        with no_blocking_queries():
+            communicator = await auth_communicator(routing.websocket_urlpatterns, '/ws/chat_reaction/reactch/', self.user)
+            self.assertTrue((await communicator.receive_json_from())['success'])
+
+            await communicator.send_json_to({'mode': 'create', 'icon': '👍', 'chat_id': self.chat.id})
+            created = (await communicator.receive_json_from())['reaction']
+
+            await communicator.send_json_to({'mode': 'create', 'icon': '👍', 'chat_id': self.chat.id})
+            duplicated = await communicator.receive_json_from()
+
+            await communicator.send_json_to({'mode': 'delete', 'icon': '👍', 'chat_id': self.chat.id})
+            deleted = (await communicator.receive_json_from())['reaction']
+            await communicator.disconnect()
+
+        self.assertEqual(created['icon'], '👍')
+        self.assertEqual(created['reactors'], [self.user.id])
+        self.assertEqual(created['count'], 1)
+        self.assertFalse(duplicated['success'])
+        self.assertEqual(deleted['count'], 0)
+        self.assertFalse(await ChatReaction.objects.filter(chat=self.chat).aexists())
@@ -11,6 +11,7 @@ class CustomUser(AbstractUser):
     title = models.CharField(max_length=100, null=True, blank=True)
     phone_number = models.CharField(max_length=20, null=True, blank=True)
     profile_image = models.ImageField(upload_to=upload_img, null=True, blank=True)
+    profile_thumbnails = models.JSONField(default=dict, blank=True)  # {size: key, 'source': key of original}
 
     def __str__(self):
         return f'{self.username} ({self.display_name} / {self.title})'
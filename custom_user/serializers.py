@@ -1,12 +1,19 @@
 from rest_framework import serializers
 
 from custom_user.models import CustomUser
+from file.thumbnails import thumbnail_urls
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
+    profile_thumbnails = serializers.SerializerMethodField()  # {size: url}
+
     class Meta:
         model = CustomUser
-        fields = ['id', 'username', 'email', 'display_name', 'title', 'phone_number', 'profile_image']
+        fields = ['id', 'username', 'email', 'display_name', 'title', 'phone_number', 'profile_image',
+                  'profile_thumbnails']
+
+    def get_profile_thumbnails(self, obj: CustomUser) -> dict:
+        return thumbnail_urls(obj.profile_thumbnails)
 
 
 class CustomUserNameSerializer(CustomUserSerializer):
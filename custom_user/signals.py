@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from AuthHelper import AuthHelper
+from custom_user.models import CustomUser
+from file.tasks import submit_on_commit
+from file.thumbnails import generate_profile_thumbnails
+
+
+def load_signal():
+    print('custom_user signals loaded!')
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance: CustomUser, **kwargs):
+    """
+    Websocket auth caches user by access token.
+    When user is changed (deactivated, deleted...), Drop it so next auth reads fresh one.
+    """
+    AuthHelper.invalidate_user(instance.id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def invalidate_blacklisted_user(sender, instance: BlacklistedToken, **kwargs):
+    """
+    If user's token is blacklisted (logout, rotation...), Drop cached tokens of that user too.
+    """
+    AuthHelper.invalidate_user(instance.token.user_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def make_profile_thumbnails(sender, instance: CustomUser, **kwargs):
+    """
+    Avatar thumbnails are made in background when profile image is changed.
+    """
+    if instance.profile_image and instance.profile_thumbnails.get('source', None) != instance.profile_image.name:
+        submit_on_commit(generate_profile_thumbnails, instance.id)
@@ -1,9 +1,30 @@
 from django.contrib import admin
 
-from file.models import File
+from file.models import Blob, File, UploadSession, UserStorageUsage, WorkspaceStorageUsage
 
 
 @admin.register(File)
 class FileAdmin(admin.ModelAdmin):
     list_display = ['id', 'uploaded_by', 'file', 'created_at', 'updated_at']
     search_fields = ['uploaded_by']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'uploaded_by', 'file_name', 'size', 'chunk_size', 'created_at']
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'sha256', 'key', 'size', 'ref_count', 'created_at']
+    search_fields = ['sha256']
+
+
+@admin.register(UserStorageUsage)
+class UserStorageUsageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'bytes', 'file_count', 'updated_at']
+
+
+@admin.register(WorkspaceStorageUsage)
+class WorkspaceStorageUsageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'workspace', 'bytes', 'file_count', 'updated_at']
@@ -0,0 +1,100 @@
+import hashlib
+from contextlib import contextmanager
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from file.models import Blob
+
+
+def hash_file(f) -> tuple[str, int]:
+    """
+    sha256 hex and size of uploaded file. File is rewound after reading.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    f.seek(0)
+    for chunk in f.chunks() if hasattr(f, 'chunks') else iter(lambda: f.read(1024 * 1024), b''):
+        sha256.update(chunk)
+        size += len(chunk)
+    f.seek(0)
+    return sha256.hexdigest(), size
+
+
+def blob_key(sha256: str) -> str:
+    """
+    Addressed by content only. (Name of file is in `File`, And it's different for each upload of same content.)
+    """
+    return f'media/blob/{sha256[:2]}/{sha256}'
+
+
+def acquire(sha256: str) -> Blob | None:
+    """
+    Add a reference to stored blob of `sha256`. `None` if it's not stored yet.
+    """
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            Blob.objects.filter(id=blob.id).update(ref_count=F('ref_count') + 1)
+        return blob
+
+
+def discard(key: str):
+    """
+    Delete object put by failed upload, If no blob has come to point it meanwhile. (Same content uploaded together)
+    """
+    if not Blob.objects.filter(key=key).exists():
+        default_storage.delete(key)
+
+
+def create(sha256: str, key: str, size: int) -> Blob:
+    try:
+        with transaction.atomic():
+            return Blob.objects.create(sha256=sha256, key=key, size=size, ref_count=1)
+    except IntegrityError:
+        # Same content was stored by other request meanwhile. Use that one.
+        blob = acquire(sha256)
+        if blob.key != key:  # Storage renamed it, So it's our own copy.
+            transaction.on_commit(lambda: discard(key))
+        return blob
+
+
+@contextmanager
+def store(f):
+    """
+    Blob of uploaded file, Referenced inside the block. `File` should be saved in the block, Which is a transaction.
+    Object is put to storage before the transaction, So it's not held open while uploading.
+    If the block fails, Object put for it is deleted. (Reference is rolled back with the transaction.)
+    """
+    sha256, size = hash_file(f)
+    put_key = None
+    if (key := Blob.objects.filter(sha256=sha256).values_list('key', flat=True).first()) is None:
+        key = put_key = default_storage.save(blob_key(sha256), f)
+    try:
+        with transaction.atomic():
+            if (blob := acquire(sha256)) is None:
+                if put_key is None:  # Last reference was dropped meanwhile, Object could be gone.
+                    f.seek(0)
+                    key = put_key = default_storage.save(blob_key(sha256), f)
+                blob = create(sha256, key, size)
+            yield blob
+    except BaseException:
+        if put_key is not None:
+            discard(put_key)
+        raise
+
+
+def release(blob_id: int) -> str | None:
+    """
+    Drop a reference. Returns key of object to delete when it was the last one.
+    """
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(id=blob_id).first()
+        if blob is None:
+            return None
+        if blob.ref_count > 1:
+            Blob.objects.filter(id=blob_id).update(ref_count=F('ref_count') - 1)
+            return None
+        blob.delete()
+        return blob.key
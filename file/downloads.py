@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from itertools import islice
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import Http404
+
+from file.storage import get_bucket_name, get_s3_client
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    `(start, end)` (inclusive) of `Range` header, `None` for whole file.
+    Only single range is supported. Multiple ranges are served as whole file, Which HTTP allows.
+    """
+    if not header:
+        return None
+    matched = re.fullmatch(r'bytes=(\d*)-(\d*)', header.strip())
+    if matched is None or matched.groups() == ('', ''):
+        return None
+
+    first, last = matched.groups()
+    if first == '':  # Last N bytes.
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class DiskCache:
+    """
+    Hot objects on local disk, Least recently used ones are evicted over `max_size`.
+    Only whole objects up to `max_file_size` are cached, While they are streamed to client first time.
+    """
+
+    def __init__(self):
+        self.directory = Path(getattr(settings, 'FILE_DOWNLOAD_CACHE_DIR', None)
+                              or Path(tempfile.gettempdir()) / 'xlack-file-cache')
+        self.max_size: int = getattr(settings, 'FILE_DOWNLOAD_CACHE_SIZE', 1024 ** 3)
+        self.max_file_size: int = getattr(settings, 'FILE_DOWNLOAD_CACHE_MAX_FILE_SIZE', 50 * 1024 ** 2)
+        self._lock = threading.Lock()
+        self._size: int | None = None  # Total bytes in directory. Counted at first use.
+
+    def path(self, key: str) -> Path:
+        return self.directory / hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> Path | None:
+        path = self.path(key)
+        try:
+            os.utime(path)  # Recently used.
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fill(self, key: str, chunks):
+        """
+        Pass `chunks` through, Writing them to cache. Kept only when every chunk was read.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            os.replace(temp, self.path(key))
+            self._added(size)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+    def _added(self, size: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self.directory.iterdir() if p.suffix != '.part')
+            else:
+                self._size += size
+            if self._size <= self.max_size:
+                return
+
+            files = sorted((p for p in self.directory.iterdir() if p.suffix != '.part'),
+                           key=lambda p: p.stat().st_mtime)
+            for path in files:
+                if self._size <= self.max_size * 0.9:
+                    break
+                try:
+                    self._size -= path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+
+cache = DiskCache()
+
+
+def is_s3() -> bool:
+    return 's3' in settings.DEFAULT_FILE_STORAGE.lower()
+
+
+def object_size(key: str) -> int:
+    """
+    Raises `Http404` if object is not in storage.
+    """
+    if (path := cache.get(key)) is not None:
+        return path.stat().st_size
+    try:
+        return default_storage.size(key)
+    except FileNotFoundError:
+        raise Http404()
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code', None) in ('404', 'NoSuchKey', 'NotFound'):
+            raise Http404()
+        raise
+
+
+def read_file(path, start: int, end: int):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0 and (chunk := f.read(min(CHUNK_SIZE, remaining))):
+            remaining -= len(chunk)
+            yield chunk
+
+
+def read_storage(key: str, start: int, end: int):
+    """
+    Only requested range is read from storage, Chunk by chunk.
+    """
+    if is_s3():
+        body = get_s3_client().get_object(Bucket=get_bucket_name(), Key=key, Range=f'bytes={start}-{end}')['Body']
+        try:
+            yield from body.iter_chunks(CHUNK_SIZE)
+        finally:
+            body.close()
+    else:
+        yield from read_file(default_storage.path(key), start, end)
+
+
+def stream(key: str, start: int, end: int, size: int):
+    """
+    Chunks of `key` from `start` to `end`. (inclusive)
+    """
+    if (path := cache.get(key)) is not None:
+        yield from read_file(path, start, end)
+    elif start == 0 and end == size - 1 and size <= cache.max_file_size:
+        yield from cache.fill(key, read_storage(key, start, end))
+    else:
+        yield from read_storage(key, start, end)
+
+
+async def aiterate(iterator, batch: int = 1, thread_sensitive: bool = False):
+    """
+    Async iterator of sync `iterator`, `batch` items read on worker thread at a time.
+    Under ASGI, `StreamingHttpResponse` reads sync iterator into a list before sending, So memory grows with response.
+    `thread_sensitive` should be true when `iterator` runs queries. (Same thread as other ORM calls)
+    """
+    iterator = iter(iterator)
+    read = sync_to_async(lambda: list(islice(iterator, batch)), thread_sensitive=thread_sensitive)
+    try:
+        while items := await read():
+            for item in items:
+                yield item
+    finally:
+        if hasattr(iterator, 'close'):  # Generator stopped early. (Client disconnected...)
+            await sync_to_async(iterator.close, thread_sensitive=thread_sensitive)()
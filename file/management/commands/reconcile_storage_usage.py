@@ -0,0 +1,82 @@
+import operator
+import re
+from functools import reduce
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from file.models import Blob, File, UserStorageUsage, WorkspaceStorageUsage
+from file.quota import add_to_counter
+from file.storage import list_objects
+
+THUMBNAIL_PATTERN = re.compile(r'_\d+\.webp$')  # See `thumbnail_key`.
+
+
+class Command(BaseCommand):
+    help = 'Cross-check storage usage counters with sizes of stored objects, Listed from storage in batches. ' \
+           'Differences are only reported unless `--fix` is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', action='append', help='Prefix of objects to list. (Repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true', help='Correct sizes of files and counters.')
+
+    def handle(self, *args, **options):
+        prefixes = options['prefix'] or ['media/file/', 'media/blob/']
+        self.check_objects(prefixes, options['batch_size'], options['fix'])
+        self.check_counters(UserStorageUsage, 'uploaded_by', 'user_id', options['batch_size'], options['fix'])
+        self.check_counters(WorkspaceStorageUsage, 'workspace', 'workspace_id', options['batch_size'], options['fix'])
+
+    def check_objects(self, prefixes: list[str], batch_size: int, fix: bool):
+        """
+        Compare size of each `File` with its object, One page of listing at a time.
+        """
+        checked = wrong_size = unreferenced = 0
+        for prefix in prefixes:
+            for page in list_objects(prefix, batch_size):
+                files = list(File.objects.filter(file__in=page).values_list('id', 'file', 'size'))
+                checked += len(files)
+                for file_id, key, size in files:
+                    if size != page[key]:
+                        wrong_size += 1
+                        self.stdout.write(f'File {file_id} ({key}): {size} bytes in database, {page[key]} in storage.')
+                        if fix:
+                            File.objects.filter(id=file_id).update(size=page[key])
+
+                referenced = {key for _, key, _ in files} \
+                    | set(Blob.objects.filter(key__in=page).values_list('key', flat=True))
+                unreferenced += sum(1 for key in page if key not in referenced and not THUMBNAIL_PATTERN.search(key))
+
+        in_prefixes = File.objects.filter(reduce(operator.or_, (Q(file__startswith=prefix) for prefix in prefixes)))
+        self.stdout.write(f'{checked} files checked, {wrong_size} with wrong size, '
+                          f'{in_prefixes.count() - checked} without object, {unreferenced} objects without file.')
+
+    def check_counters(self, model, file_field: str, owner_field: str, batch_size: int, fix: bool):
+        """
+        Sum of `File.size` per owner against its counter. Fixed by adding the difference with `F()`,
+        So uploads during reconciliation are not lost.
+        """
+        expected = {
+            row[file_field]: (row['bytes'], row['count'])
+            for row in File.objects.filter(**{f'{file_field}__isnull': False}).values(file_field)
+            .annotate(bytes=Coalesce(Sum('size'), Value(0)), count=Count('id')).order_by()
+        }
+        actual = {row[owner_field]: (row['bytes'], row['file_count'])
+                  for row in model.objects.values(owner_field, 'bytes', 'file_count')}
+
+        wrong = 0
+        owners = sorted(expected.keys() | actual.keys())
+        for i in range(0, len(owners), batch_size):
+            for owner in owners[i:i + batch_size]:
+                expected_bytes, expected_count = expected.get(owner, (0, 0))
+                actual_bytes, actual_count = actual.get(owner, (0, 0))
+                if (expected_bytes, expected_count) == (actual_bytes, actual_count):
+                    continue
+                wrong += 1
+                self.stdout.write(f'{model.__name__} of {owner}: {actual_bytes} bytes ({actual_count} files) counted, '
+                                  f'{expected_bytes} bytes ({expected_count} files) stored.')
+                if fix:
+                    add_to_counter(model, {owner_field: owner},
+                                   expected_bytes - actual_bytes, expected_count - actual_count)
+        self.stdout.write(f'{len(owners)} {model.__name__} checked, {wrong} wrong{" and fixed" if fix else ""}.')
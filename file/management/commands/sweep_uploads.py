@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from file.uploads import sweep_unconfirmed
+
+
+class Command(BaseCommand):
+    help = 'Delete objects uploaded with presigned urls but never confirmed, After their upload tokens expired. ' \
+           'Run it periodically, More often than `--hours`.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='How many past hours to look into.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = sweep_unconfirmed(options['hours'], options['batch_size'])
+        self.stdout.write(f'{deleted} unconfirmed objects deleted.')
@@ -0,0 +1,67 @@
+import mimetypes
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+from file import quota
+from file.models import File
+from file.thumbnails import FILE_THUMBNAIL_SIZES, make_thumbnails
+
+TEXT_LIMIT: int = getattr(settings, 'FILE_EXTRACTED_TEXT_LIMIT', 100 * 1024)  # characters
+TEXT_MIME_TYPES = {'application/json', 'application/xml', 'application/javascript', 'application/x-sh'}
+
+
+def guess_mime_type(file_name: str, declared: str | None = None) -> str:
+    """
+    Declared one (by client or storage) if it's specific, If not guessed from extension.
+    """
+    if declared and declared != 'application/octet-stream':
+        return declared.split(';')[0].strip().lower()
+    return mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+
+
+def is_text(mime_type: str) -> bool:
+    return mime_type.startswith('text/') or mime_type in TEXT_MIME_TYPES
+
+
+def extract_text(name: str, mime_type: str) -> str:
+    if not is_text(mime_type):
+        return ''
+    with default_storage.open(name, 'rb') as f:
+        raw = f.read(TEXT_LIMIT * 4)  # Up to 4 bytes per character in utf-8.
+    return raw.decode('utf-8', errors='ignore')[:TEXT_LIMIT]
+
+
+def image_size(name: str, mime_type: str) -> tuple[int, int] | tuple[None, None]:
+    if not mime_type.startswith('image/'):
+        return None, None
+    try:
+        with default_storage.open(name, 'rb') as f:
+            return Image.open(f).size  # Reads header only.
+    except (UnidentifiedImageError, OSError):
+        return None, None
+
+
+def process_file(file_id: int):
+    """
+    Background work after upload. Thumbnails, dimensions and text for search.
+    (Size and MIME type are set at upload already.)
+    """
+    file = File.objects.filter(id=file_id).first()
+    if file is None or not file.file:
+        return
+
+    name = file.file.name
+    counted = file.size is not None
+    if not counted:
+        file.size = default_storage.size(name)
+    if not file.mime_type:
+        file.mime_type = guess_mime_type(file.file_name or name)
+
+    file.thumbnails = {'source': name, **make_thumbnails(name, FILE_THUMBNAIL_SIZES, file.mime_type)}
+    file.width, file.height = image_size(name, file.mime_type)
+    file.extracted_text = extract_text(name, file.mime_type)
+    file.save(update_fields=['thumbnails', 'size', 'mime_type', 'width', 'height', 'extracted_text'])
+    if not counted:  # Charged as 0 bytes at create. (Made without size, On admin...)
+        quota.add_usage(file, file.size, 0)
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2023-04-16 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file', '0005_blob_file_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.1.7 on 2023-04-23 04:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+INDEX_NAME = 'file_name_text_ngram_idx'
+
+
+def add_fulltext_index(apps, schema_editor):
+    """
+    MySQL only, Same as chat message. (See `chat.migrations.0017_chat_message_fulltext`)
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = schema_editor.quote_name(apps.get_model('file', 'File')._meta.db_table)
+    schema_editor.execute(
+        f'ALTER TABLE {table} ADD FULLTEXT INDEX {INDEX_NAME} (file_name, extracted_text) WITH PARSER ngram'
+    )
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = schema_editor.quote_name(apps.get_model('file', 'File')._meta.db_table)
+    schema_editor.execute(f'ALTER TABLE {table} DROP INDEX {INDEX_NAME}')
+
+
+def fill_channel(apps, schema_editor):
+    """
+    Channel of first chat each file is sent with.
+    """
+    File = apps.get_model('file', 'File')
+    Chat = apps.get_model('chat', 'Chat')
+    File.objects.filter(channel__isnull=True).update(channel_id=Subquery(
+        Chat.objects.filter(file_id=OuterRef('pk')).order_by('id').values('channel_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat_channel', '0012_alter_chatchannel_hashed_value'),
+        ('chat', '0010_chat_file'),
+        ('file', '0006_file_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='mime_type',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='extracted_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='channel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='chat_channel.chatchannel'),
+        ),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+        migrations.RunPython(fill_channel, migrations.RunPython.noop),
+    ]
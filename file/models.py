@@ -7,12 +7,109 @@ def upload_file(instance, filename):
     return f'media/file/user_{instance.uploaded_by.id}/{filename}'
 
 
+class Blob(models.Model):
+    """
+    Stored object addressed by its content. Same bytes are stored once and shared by `File`s.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    key = models.CharField(max_length=1000)  # Name in storage.
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)  # Number of `File`s pointing this.
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.sha256} ({self.ref_count} refs)'
+
+
 class File(models.Model):
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploaded_file')
+    workspace = models.ForeignKey('workspace.Workspace', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='files')  # Counted in quota of this workspace too.
+    channel = models.ForeignKey('chat_channel.ChatChannel', on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='files')  # Where it's sent first. Kept after that chat is deleted.
     file = models.FileField(upload_to=upload_file)
     file_name = models.CharField(max_length=1000, blank=True, null=True) # For searching.
+    blob = models.ForeignKey(Blob, on_delete=models.SET_NULL, null=True, blank=True, related_name='files')
+    thumbnails = models.JSONField(default=dict, blank=True)  # {size: key, 'source': key of original}
+    size = models.BigIntegerField(null=True, blank=True)  # bytes
+    mime_type = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    width = models.PositiveIntegerField(null=True, blank=True)  # Only for image.
+    height = models.PositiveIntegerField(null=True, blank=True)
+    extracted_text = models.TextField(blank=True, default='')  # For searching. (Text files)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.file.url
+
+
+class UploadSession(models.Model):
+    """
+    Chunked upload in progress. Parts are kept by multipart backend until `complete`.
+    """
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_session')
+    workspace = models.ForeignKey('workspace.Workspace', on_delete=models.CASCADE, null=True, blank=True,
+                                  related_name='upload_sessions')  # Of `File` after complete.
+    file_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255)
+    key = models.CharField(max_length=1000)  # Name of `File.file` after complete.
+    size = models.BigIntegerField()  # Total bytes declared by client.
+    chunk_size = models.BigIntegerField()
+    upload_id = models.CharField(max_length=1000, blank=True, default='')  # Multipart upload id of S3.
+    # Made by `complete`. Session is kept with it, So completing again returns the same file.
+    file = models.OneToOneField(File, on_delete=models.CASCADE, null=True, blank=True, related_name='upload_session')
+    # Set while storage assembles parts, Outside of transaction. Taken over when it's older than a timeout.
+    completing_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_count(self) -> int:
+        return max(-(-self.size // self.chunk_size), 1)
+
+    def __str__(self):
+        return f'{self.file_name} ({self.uploaded_by})'
+
+
+class UploadPart(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='parts')
+    number = models.PositiveIntegerField()  # 1 ~ `part_count`
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    etag = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'number'], name='unique_upload_part')
+        ]
+
+    def __str__(self):
+        return f'{self.session} #{self.number}'
+
+
+class StorageUsage(models.Model):
+    """
+    Bytes stored, Kept up to date with `F()` on every create and delete of `File`. (See `file.quota`)
+    Size of `File` is counted, Even if its content is shared by other files. (See `Blob`)
+    """
+    bytes = models.BigIntegerField(default=0)
+    file_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class UserStorageUsage(StorageUsage):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='storage_usage')
+
+    def __str__(self):
+        return f'{self.user}: {self.bytes} bytes'
+
+
+class WorkspaceStorageUsage(StorageUsage):
+    workspace = models.OneToOneField('workspace.Workspace', on_delete=models.CASCADE, related_name='storage_usage')
+
+    def __str__(self):
+        return f'{self.workspace}: {self.bytes} bytes'
@@ -0,0 +1,115 @@
+import base64
+import hashlib
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+from file.models import UploadPart, UploadSession
+from file.storage import get_bucket_name, get_s3_client
+
+MAX_CHUNK_SIZE: int = getattr(settings, 'FILE_UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024)
+READ_SIZE = 1024 * 1024  # Bytes of part read from request at once.
+
+
+@contextmanager
+def receive_part(stream, expected: int):
+    """
+    Body of part spooled into temporary file, Read `READ_SIZE` at a time. Gives (file, size, sha256 hex, md5).
+    Only `READ_SIZE` is kept in memory, Bigger part goes to disk. One more byte than `expected` is read at most,
+    To find longer body.
+    """
+    sha256, md5, size = hashlib.sha256(), hashlib.md5(), 0
+    with tempfile.SpooledTemporaryFile(max_size=READ_SIZE) as f:
+        while stream and size <= expected and (data := stream.read(min(READ_SIZE, expected + 1 - size))):
+            f.write(data)
+            sha256.update(data)
+            md5.update(data)
+            size += len(data)
+        f.seek(0)
+        yield f, size, sha256.hexdigest(), md5.digest()
+
+
+class S3MultipartBackend:
+    """
+    Parts are uploaded to S3 multipart upload, And S3 assembles them at `complete`.
+    Every part except last one should be 5MB or bigger.
+    """
+    min_chunk_size = 5 * 1024 * 1024
+
+    def start(self, session: UploadSession):
+        params = {'Bucket': get_bucket_name(), 'Key': session.key, 'ContentType': session.content_type}
+        if acl := getattr(settings, 'AWS_DEFAULT_ACL', None):
+            params['ACL'] = acl
+        session.upload_id = get_s3_client().create_multipart_upload(**params)['UploadId']
+
+    def upload_part(self, session: UploadSession, number: int, f, md5: bytes) -> str:
+        """
+        `f` is read by boto3 in chunks, Not loaded at once.
+        """
+        response = get_s3_client().upload_part(
+            Bucket=get_bucket_name(), Key=session.key, UploadId=session.upload_id, PartNumber=number, Body=f,
+            ContentMD5=base64.b64encode(md5).decode(),  # S3 checks it again.
+        )
+        return response['ETag']
+
+    def complete(self, session: UploadSession, parts: list[UploadPart]):
+        get_s3_client().complete_multipart_upload(
+            Bucket=get_bucket_name(), Key=session.key, UploadId=session.upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': part.number, 'ETag': part.etag} for part in parts]},
+        )
+
+    def abort(self, session: UploadSession):
+        get_s3_client().abort_multipart_upload(Bucket=get_bucket_name(), Key=session.key, UploadId=session.upload_id)
+
+
+class LocalMultipartBackend:
+    """
+    Parts are files in `FILE_UPLOAD_TEMP_DIR`, And they are concatenated into default storage at `complete`.
+    For local development and tests without S3.
+    """
+    min_chunk_size = 1
+
+    @staticmethod
+    def directory(session: UploadSession) -> Path:
+        return Path(getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or settings.MEDIA_ROOT) / 'uploads' / str(session.id)
+
+    def start(self, session: UploadSession):
+        pass  # Directory is made at first part, Because session has no id yet.
+
+    def upload_part(self, session: UploadSession, number: int, f, md5: bytes) -> str:
+        directory = self.directory(session)
+        directory.mkdir(parents=True, exist_ok=True)
+        with (directory / str(number)).open('wb') as destination:
+            shutil.copyfileobj(f, destination)
+        return ''
+
+    def complete(self, session: UploadSession, parts: list[UploadPart]):
+        directory = self.directory(session)
+        assembled = directory / 'assembled'
+        with assembled.open('wb') as destination:
+            for part in parts:
+                with (directory / str(part.number)).open('rb') as source:
+                    shutil.copyfileobj(source, destination)
+        with assembled.open('rb') as f:
+            session.key = default_storage.save(session.key, DjangoFile(f))
+        self.abort(session)
+
+    def abort(self, session: UploadSession):
+        shutil.rmtree(self.directory(session), ignore_errors=True)
+
+
+def get_backend():
+    """
+    `FILE_MULTIPART_BACKEND` if set, If not S3 when files are stored in S3.
+    """
+    if path := getattr(settings, 'FILE_MULTIPART_BACKEND', None):
+        return import_string(path)()
+    if 's3' in settings.DEFAULT_FILE_STORAGE.lower():
+        return S3MultipartBackend()
+    return LocalMultipartBackend()
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from custom_user.models import CustomUser
+from file.models import File, UserStorageUsage, WorkspaceStorageUsage
+from workspace.models import Workspace
+
+# bytes. `None` means unlimited.
+USER_QUOTA: int | None = getattr(settings, 'FILE_USER_QUOTA', 5 * 1024 ** 3)
+WORKSPACE_QUOTA: int | None = getattr(settings, 'FILE_WORKSPACE_QUOTA', 50 * 1024 ** 3)
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def add_to_counter(model, owner: dict, size: int, count: int):
+    """
+    Add to counter of `owner` with single `UPDATE`, So concurrent uploads never lose each other's bytes.
+    Row is made at first upload.
+    """
+    if model.objects.filter(**owner).update(bytes=F('bytes') + size, file_count=F('file_count') + count):
+        return
+    if size <= 0 and count <= 0:
+        return  # Nothing was counted. (Owner is being deleted, Or counter is not made yet.)
+    try:
+        with transaction.atomic():
+            model.objects.create(**owner, bytes=size, file_count=count)
+    except IntegrityError:  # Made by other request meanwhile.
+        model.objects.filter(**owner).update(bytes=F('bytes') + size, file_count=F('file_count') + count)
+
+
+def add_usage(file: File, size: int, count: int):
+    add_to_counter(UserStorageUsage, {'user_id': file.uploaded_by_id}, size, count)
+    if file.workspace_id is not None:
+        add_to_counter(WorkspaceStorageUsage, {'workspace_id': file.workspace_id}, size, count)
+
+
+def charge(file: File):
+    add_usage(file, file.size or 0, 1)
+
+
+def refund(file: File):
+    add_usage(file, -(file.size or 0), -1)
+
+
+def used_bytes(model, owner: dict) -> int:
+    return model.objects.filter(**owner).values_list('bytes', flat=True).first() or 0
+
+
+def check_quota(user: CustomUser, workspace: Workspace | None, size: int):
+    """
+    Raise `QuotaExceeded` if `size` more bytes don't fit. Called before upload starts.
+    """
+    if USER_QUOTA is not None and used_bytes(UserStorageUsage, {'user_id': user.id}) + size > USER_QUOTA:
+        raise QuotaExceeded(f'Storage quota of user ({USER_QUOTA} bytes) exceeded.')
+    if workspace is not None and WORKSPACE_QUOTA is not None \
+            and used_bytes(WorkspaceStorageUsage, {'workspace_id': workspace.id}) + size > WORKSPACE_QUOTA:
+        raise QuotaExceeded(f'Storage quota of workspace ({WORKSPACE_QUOTA} bytes) exceeded.')
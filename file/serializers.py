@@ -1,12 +1,71 @@
 from rest_framework import serializers
 
 from custom_user.serializers import CustomUserSerializer
-from file.models import File
+from file.models import File, UploadSession
+from file.multipart import MAX_CHUNK_SIZE
+from file.thumbnails import thumbnail_urls
 
 
 class FileSerializer(serializers.ModelSerializer):
     uploaded_by = CustomUserSerializer(read_only=True)
+    workspace = serializers.SlugRelatedField(slug_field='hashed_value', read_only=True)
+    thumbnails = serializers.SerializerMethodField()  # {size: url}, Empty until made or if it's not an image.
 
     class Meta:
         model = File
-        fields = ['id', 'uploaded_by', 'file', 'created_at', 'updated_at']
+        fields = ['id', 'uploaded_by', 'workspace', 'file', 'thumbnails', 'size', 'mime_type', 'width', 'height',
+                  'created_at', 'updated_at']
+        read_only_fields = ['size', 'mime_type', 'width', 'height']
+
+    def get_thumbnails(self, obj: File) -> dict:
+        return thumbnail_urls(obj.thumbnails)
+
+
+class UploadSlotSerializer(serializers.Serializer):
+    file_name = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=255, default='application/octet-stream')
+    size = serializers.IntegerField(min_value=0)  # bytes, For quota.
+
+    def update(self, instance, validated_data):
+        pass
+
+    def create(self, validated_data):
+        pass
+
+
+class DedupSerializer(serializers.Serializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$')
+    file_name = serializers.CharField(max_length=255)
+
+    def update(self, instance, validated_data):
+        pass
+
+    def create(self, validated_data):
+        pass
+
+
+class UploadConfirmSerializer(serializers.Serializer):
+    upload_token = serializers.CharField()
+
+    def update(self, instance, validated_data):
+        pass
+
+    def create(self, validated_data):
+        pass
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    content_type = serializers.CharField(max_length=255, default='application/octet-stream')
+    size = serializers.IntegerField(min_value=1)
+    chunk_size = serializers.IntegerField(min_value=1, max_value=MAX_CHUNK_SIZE, required=False)
+    part_count = serializers.IntegerField(read_only=True)
+    received_parts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'file_name', 'content_type', 'size', 'chunk_size', 'part_count', 'received_parts', 'file',
+                  'created_at']
+        read_only_fields = ['file']
+
+    def get_received_parts(self, obj: UploadSession) -> list[int]:
+        return sorted(part.number for part in obj.parts.all())
@@ -1,10 +1,12 @@
-import os
-
-import boto3
-from django.db.models.signals import pre_delete
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 
+from file import blobs, quota
 from file.models import File
+from file.storage import deletion_queue
+from file.tasks import submit_on_commit
+from file.metadata import process_file
 
 
 def load_signal():
@@ -16,15 +18,29 @@ def before_delete_file(sender: File, **kwargs):
     """
     If you delete files on admin or anywhere, Files still preserve on bucket.
     So for deleting that original files too, Connect signals to django.
+    Objects are deleted in background after commit, Batched with others. (See `DeletionQueue`)
     """
-    s3_client = boto3.client('s3',
-                             aws_access_key_id=os.getenv('AWS_S3_ACCESS_KEY_ID'),
-                             aws_secret_access_key=os.getenv('AWS_S3_SECRET_ACCESS_KEY'),
-                             endpoint_url='https://' + os.getenv('AWS_S3_CUSTOM_DOMAIN'))
-
     file: File = kwargs.get('instance', None)
+    quota.refund(file)
+
+    if file.blob_id is not None:
+        # Shared by other files. Object is deleted only with the last reference.
+        key = blobs.release(file.blob_id)
+    else:
+        key = file.file.name
+
+    if key:
+        keys = [key] + [thumbnail for size, thumbnail in file.thumbnails.items() if size != 'source']
+        transaction.on_commit(lambda: [deletion_queue.enqueue(k) for k in keys])
 
-    response = s3_client.delete_object(
-        Bucket=os.getenv('AWS_STORAGE_BUCKET_NAME'),
-        Key=file.file.name
-    )
+
+@receiver(post_save, sender=File)
+def after_save_file(sender, instance: File, created: bool, **kwargs):
+    """
+    Count new file in storage usage of uploader (and workspace),
+    Make thumbnails and extract metadata in background when original is new. (Not processed yet.)
+    """
+    if created:
+        quota.charge(instance)
+    if instance.file and instance.thumbnails.get('source', None) != instance.file.name:
+        submit_on_commit(process_file, instance.id)
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from queue import Empty, Queue
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """
+    One client per process. It's thread safe and keeps connection pool, So don't make new one per request.
+    Endpoint comes from `AWS_S3_ENDPOINT_URL`, So any S3 compatible storage (MinIO on local...) works.
+    """
+    return boto3.client('s3',
+                        aws_access_key_id=settings.AWS_S3_ACCESS_KEY_ID,
+                        aws_secret_access_key=settings.AWS_S3_SECRET_ACCESS_KEY,
+                        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                        config=Config(signature_version='s3v4',
+                                      max_pool_connections=getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 50)))
+
+
+def get_bucket_name() -> str:
+    return settings.AWS_STORAGE_BUCKET_NAME
+
+
+def delete_objects(keys: list[str]) -> list[str]:
+    """
+    Delete objects with `delete_objects`, 1000 keys per call. Returns keys failed to delete.
+    (One by one if files are not stored in S3.)
+    """
+    failed = []
+    if 's3' not in settings.DEFAULT_FILE_STORAGE.lower():
+        for key in keys:
+            try:
+                default_storage.delete(key)
+            except OSError as e:
+                logger.warning('Failed to delete %s: %s', key, e)
+                failed.append(key)
+        return failed
+
+    for i in range(0, len(keys), 1000):
+        batch = keys[i:i + 1000]
+        try:
+            response = get_s3_client().delete_objects(
+                Bucket=get_bucket_name(),
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.warning('Failed to delete %d objects: %s', len(batch), e)
+            failed += batch
+            continue
+        failed += [error['Key'] for error in response.get('Errors', [])]
+    return failed
+
+
+def list_objects(prefix: str, page_size: int = 1000):
+    """
+    Pages of `{key: size}` under `prefix`, `page_size` objects each. (`list_objects_v2` of S3)
+    Walks `MEDIA_ROOT` if files are not stored in S3.
+    """
+    if 's3' not in settings.DEFAULT_FILE_STORAGE.lower():
+        root = Path(default_storage.path(''))
+        page = {}
+        for path in sorted((root / prefix).rglob('*')) if (root / prefix).exists() else []:
+            if path.is_file():
+                page[path.relative_to(root).as_posix()] = path.stat().st_size
+                if len(page) >= page_size:
+                    yield page
+                    page = {}
+        if page:
+            yield page
+        return
+
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    for response in paginator.paginate(Bucket=get_bucket_name(), Prefix=prefix,
+                                       PaginationConfig={'PageSize': page_size}):
+        if contents := response.get('Contents', []):
+            yield {content['Key']: content['Size'] for content in contents}
+
+
+class DeletionQueue:
+    """
+    Objects are deleted in background thread, Batched into `delete_objects` calls.
+    So deleting thousands of files (cascade of workspace...) doesn't wait for storage one by one.
+
+    Failed keys are retried with backoff up to `max_attempts`.
+    Keys still in queue when process exits are left in storage. (Only orphan objects, No data loss.)
+    """
+    batch_window: float = getattr(settings, 'FILE_DELETE_BATCH_WINDOW', 0.5)  # seconds to gather a batch
+    max_attempts: int = getattr(settings, 'FILE_DELETE_MAX_ATTEMPTS', 5)
+
+    def __init__(self):
+        self.queue: Queue[tuple[str, int]] = Queue()  # (key, attempt)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, key: str, attempt: int = 1):
+        self.queue.put((key, attempt))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='file-deletion-queue', daemon=True)
+                self._thread.start()
+
+    def join(self):
+        """
+        Wait until every queued key is handled. (Retries scheduled later are not waited.)
+        """
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < 1000 and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except Empty:
+                    break
+
+            try:
+                attempts = dict(batch)
+                for key in delete_objects(list(attempts)):
+                    self._retry(key, attempts[key])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _retry(self, key: str, attempt: int):
+        if attempt >= self.max_attempts:
+            logger.error('Gave up deleting object %s after %d attempts.', key, attempt)
+            return
+        timer = threading.Timer(2 ** attempt, self.enqueue, args=(key, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+
+deletion_queue = DeletionQueue()
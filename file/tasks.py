@@ -0,0 +1,27 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=getattr(settings, 'FILE_TASK_WORKERS', 2), thread_name_prefix='file-task')
+
+
+def _run(fn, *args):
+    close_old_connections()
+    try:
+        fn(*args)
+    except Exception:
+        logger.exception('File task %s%s failed.', fn.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def submit_on_commit(fn, *args):
+    """
+    Run `fn(*args)` in background thread after current transaction is committed.
+    (Task reads rows saved in this transaction.)
+    """
+    transaction.on_commit(lambda: executor.submit(_run, fn, *args))
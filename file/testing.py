@@ -0,0 +1,22 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import DEFAULT_STORAGE_ALIAS
+
+
+class LocalStorageMixin:
+    """
+    Files are stored in a temporary directory of each test, Not in S3.
+    So tests run offline, And objects of one test are never seen by another.
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp(prefix='xlack-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)  # Background threads could write later.
+        # `STORAGES`, Not `DEFAULT_FILE_STORAGE`. Only overriding it resets `default_storage`. (It's set together.)
+        local = {'BACKEND': 'django.core.files.storage.FileSystemStorage'}
+        storage = self.settings(STORAGES={**settings.STORAGES, DEFAULT_STORAGE_ALIAS: local}, MEDIA_ROOT=media_root)
+        storage.enable()
+        self.addCleanup(storage.disable)
@@ -1,3 +1,348 @@
-from django.test import TestCase
+import hashlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from chat.models import Chat
+from chat_channel.models import ChatChannel
+from custom_user.models import CustomUser
+from file import quota
+from file.blobs import blob_key
+from file.downloads import RangeNotSatisfiable, parse_range
+from file.models import Blob, File, UploadSession, UserStorageUsage, WorkspaceStorageUsage
+from file.multipart import MAX_CHUNK_SIZE
+from file.storage import deletion_queue
+from file.testing import LocalStorageMixin
+from file.uploads import make_key, sweep_unconfirmed, upload_prefix
+from workspace.models import Workspace
+
+
+class ParseRangeTest(SimpleTestCase):
+    def test_whole_file(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('', 100))
+        self.assertIsNone(parse_range('bytes=-', 100))
+        self.assertIsNone(parse_range('items=0-10', 100))
+
+    def test_closed_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=10-10', 100), (10, 10))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))  # Cut at end of file.
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_range('bytes=40-', 100), (40, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=100-', 'bytes=150-200', 'bytes=20-10', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 100)
+
+    def test_multiple_ranges_are_whole_file(self):
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))
+
+
+class FileTestCase(LocalStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create(username='file_user')
+        self.other = CustomUser.objects.create(username='file_other')
+        self.workspace = Workspace.objects.create(name='file_workspace', hashed_value='filews')
+        self.workspace.members.add(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content: bytes, name: str = 'a.txt', **params):
+        response = self.client.post('/file/' + (f'?workspace={params["workspace"]}' if params else ''),
+                                    {'file': SimpleUploadedFile(name, content)}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        return File.objects.get(id=response.json()['id'])
+
+    @staticmethod
+    def usage(model, **owner) -> tuple[int, int]:
+        usage = model.objects.filter(**owner).first()
+        return (usage.bytes, usage.file_count) if usage else (0, 0)
+
+
+class DownloadTest(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = self.upload(bytes(range(100)), 'range.bin')
+
+    @staticmethod
+    def content(response) -> bytes:
+        async def read():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(read)()
+
+    def download(self, **headers):
+        return self.client.get(f'/file/{self.file.id}/download/', **headers)
+
+    def test_partial_content(self):
+        response = self.download(HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(self.content(response), bytes(range(10, 20)))
+
+    def test_unsatisfiable_range(self):
+        response = self.download(HTTP_RANGE='bytes=100-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_not_visible_to_others(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.download().status_code, 404)
+
+        channel = ChatChannel.objects.create(name='file_channel', workspace=self.workspace, hashed_value='filech')
+        channel.members.add(self.user, self.other)
+        Chat.objects.create(message='file', chatter=self.user, channel=channel, file=self.file)
+        self.assertEqual(self.download().status_code, 200)
+
+    def test_not_visible_to_workspace_members(self):
+        # Counted in workspace, But sent only to private channel.
+        self.file = self.upload(b'private', 'private.txt', workspace='filews')
+        ChatChannel.objects.create(name='general', workspace=self.workspace, hashed_value='genech') \
+            .members.add(self.user, self.other)  # Joins workspace with it.
+        channel = ChatChannel.objects.create(name='private', workspace=self.workspace, hashed_value='privch')
+        channel.members.add(self.user)
+        Chat.objects.create(message='file', chatter=self.user, channel=channel, file=self.file)
+
+        self.client.force_authenticate(self.other)
+        self.assertTrue(self.workspace.members.filter(id=self.other.id).exists())
+        self.assertEqual(self.download().status_code, 404)
+
+
+class QuotaTest(FileTestCase):
+    def test_charged_on_upload_and_refunded_on_delete(self):
+        file = self.upload(b'x' * 10, workspace='filews')
+        self.assertEqual(self.usage(UserStorageUsage, user=self.user), (10, 1))
+        self.assertEqual(self.usage(WorkspaceStorageUsage, workspace=self.workspace), (10, 1))
+
+        self.assertEqual(self.client.delete(f'/file/{file.id}/').status_code, 204)
+        self.assertEqual(self.usage(UserStorageUsage, user=self.user), (0, 0))
+        self.assertEqual(self.usage(WorkspaceStorageUsage, workspace=self.workspace), (0, 0))
+
+    def test_upload_over_quota(self):
+        self.upload(b'x' * 10)
+        with mock.patch.object(quota, 'USER_QUOTA', 15):
+            response = self.client.post('/file/uploads/', {'file_name': 'big.bin', 'size': 10}, format='json')
+        self.assertEqual(response.status_code, 413)
+
+
+class BlobTest(FileTestCase):
+    def test_same_content_is_stored_once(self):
+        first = self.upload(b'same content', 'a.txt')
+        second = self.upload(b'same content', 'b.txt')
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+
+    def test_object_is_deleted_with_last_reference(self):
+        first = self.upload(b'shared', 'a.txt')
+        second = self.upload(b'shared', 'b.txt')
+        key = first.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        deletion_queue.join()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(default_storage.exists(key))
+
+    def test_key_is_content_only(self):
+        first = self.upload(b'same content', 'a.txt')
+        second = self.upload(b'same content', 'b.PNG')
+
+        self.assertEqual(first.file.name, blob_key(hashlib.sha256(b'same content').hexdigest()))
+        self.assertEqual(second.file.name, first.file.name)
+
+    def test_store_failure_keeps_no_reference(self):
+        self.upload(b'stored', 'a.txt')
+        with mock.patch('file.views.FileSerializer.save', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            self.upload(b'stored', 'b.txt')
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+    def test_store_failure_deletes_new_object(self):
+        key = blob_key(hashlib.sha256(b'new content').hexdigest())
+        with mock.patch('file.views.FileSerializer.save', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            self.upload(b'new content', 'a.txt')
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(default_storage.exists(key))
+
+
+class DedupTest(FileTestCase):
+    def dedup(self, content: bytes):
+        return self.client.post('/file/dedup/', {'sha256': hashlib.sha256(content).hexdigest(), 'file_name': 'c.txt'},
+                                format='json')
+
+    def test_own_content_is_not_uploaded_again(self):
+        self.upload(b'mine', 'a.txt')
+        response = self.dedup(b'mine')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+        self.assertEqual(self.usage(UserStorageUsage, user=self.user), (8, 2))
+
+    def test_content_of_others_is_not_given(self):
+        self.upload(b'mine', 'a.txt')
+        self.client.force_authenticate(self.other)
+
+        self.assertEqual(self.dedup(b'mine').status_code, 404)
+        self.assertEqual(self.dedup(b'never stored').status_code, 404)
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+
+class PresignedUploadTest(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('file.uploads.get_s3_client')
+        self.s3 = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.s3.return_value.generate_presigned_url.return_value = 'https://bucket/presigned'
+
+    def slot(self, size: int) -> dict:
+        response = self.client.post('/file/upload_slot/', {'file_name': 'direct.png', 'size': size,
+                                                            'content_type': 'image/png'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def confirm(self, slot: dict):
+        return self.client.post('/file/upload_confirm/', {'upload_token': slot['upload_token']}, format='json')
+
+    def test_confirm_creates_file_once(self):
+        slot = self.slot(10)
+        self.s3.return_value.head_object.return_value = {'ContentLength': 10, 'ContentType': 'image/png'}
+
+        first, second = self.confirm(slot), self.confirm(slot)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()['id'], second.json()['id'])
+        file = File.objects.get()
+        self.assertEqual((file.file.name, file.size, file.mime_type), (slot['key'], 10, 'image/png'))
+
+    def test_bigger_than_declared(self):
+        slot = self.slot(10)
+        self.s3.return_value.head_object.return_value = {'ContentLength': 11}
+
+        with mock.patch('file.uploads.deletion_queue') as queue:
+            self.assertEqual(self.confirm(slot).status_code, 400)
+        queue.enqueue.assert_called_once_with(slot['key'])
+        self.assertFalse(File.objects.exists())
+
+    def test_token_of_other_user(self):
+        slot = self.slot(10)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.confirm(slot).status_code, 400)
+
+    def test_size_is_signed(self):
+        slot = self.slot(10)
+
+        params = self.s3.return_value.generate_presigned_url.call_args.kwargs['Params']
+        self.assertEqual(params['ContentLength'], 10)
+        self.assertEqual(slot['headers']['Content-Length'], '10')
+
+    def test_sweep_unconfirmed(self):
+        prefix = upload_prefix(timezone.now() - timedelta(hours=5))
+        confirmed = default_storage.save(f'{prefix}user_1/confirmed/a.png', ContentFile(b'a'))
+        thumbnail = default_storage.save(f'{prefix}user_1/confirmed/a_160.webp', ContentFile(b't'))
+        orphan = default_storage.save(f'{prefix}user_1/orphan/b.png', ContentFile(b'b'))
+        recent = default_storage.save(f'{make_key(self.user, "c.png")}', ContentFile(b'c'))
+        File.objects.create(uploaded_by=self.user, file=confirmed, file_name='a.png', size=1)
+
+        self.assertEqual(sweep_unconfirmed(hours=6), 1)
+
+        self.assertEqual([default_storage.exists(key) for key in (confirmed, thumbnail, orphan, recent)],
+                         [True, True, False, True])
+
+
+class ChunkedUploadTest(FileTestCase):
+    content = b'0123456789'
+
+    def start(self) -> dict:
+        response = self.client.post('/file/uploads/', {'file_name': 'chunked.bin', 'size': len(self.content),
+                                                       'chunk_size': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put_part(self, session: dict, number: int, data: bytes | None = None, sha256: str | None = None):
+        data = self.content[(number - 1) * 4:number * 4] if data is None else data
+        return self.client.put(f'/file/uploads/{session["id"]}/parts/{number}/', data,
+                               content_type='application/octet-stream',
+                               HTTP_X_CHUNK_SHA256=sha256 or hashlib.sha256(data).hexdigest())
+
+    def complete(self, session: dict):
+        return self.client.post(f'/file/uploads/{session["id"]}/complete/')
+
+    def test_resume_and_complete(self):
+        session = self.start()
+        self.assertEqual(session['part_count'], 3)
+        self.put_part(session, 1)
+        self.put_part(session, 3)
+
+        self.assertEqual(self.client.get(f'/file/uploads/{session["id"]}/').json()['received_parts'], [1, 3])
+        self.assertEqual(self.complete(session).json()['missing_parts'], [2])
+
+        self.put_part(session, 2)
+        response = self.complete(session)
+        self.assertEqual(response.status_code, 201)
+        with default_storage.open(File.objects.get().file.name, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_checksum_and_size_are_checked(self):
+        session = self.start()
+        self.assertEqual(self.put_part(session, 1, sha256='0' * 64).status_code, 400)
+        self.assertEqual(self.put_part(session, 1, data=b'012').status_code, 400)
+
+    def test_complete_again_returns_same_file(self):
+        session = self.start()
+        for number in range(1, 4):
+            self.put_part(session, number)
+
+        first, second = self.complete(session), self.complete(session)
+
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(first.json()['id'], second.json()['id'])
+        self.assertEqual(File.objects.count(), 1)
+        self.assertEqual(self.put_part(session, 1).status_code, 409)
+        self.assertEqual(self.client.delete(f'/file/uploads/{session["id"]}/').status_code, 409)
+
+    def test_chunk_size_is_limited(self):
+        response = self.client.post('/file/uploads/', {'file_name': 'big.bin', 'size': 10,
+                                                       'chunk_size': MAX_CHUNK_SIZE + 1}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_being_completed(self):
+        session = self.start()
+        for number in range(1, 4):
+            self.put_part(session, number)
+        UploadSession.objects.filter(id=session['id']).update(completing_at=timezone.now())
+
+        self.assertEqual(self.complete(session).status_code, 409)
+        self.assertEqual(self.put_part(session, 1).status_code, 409)
+
+        # Taken over after timeout. (Process completing it died...)
+        UploadSession.objects.filter(id=session['id']).update(completing_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.complete(session).status_code, 201)
+        self.assertIsNone(UploadSession.objects.get().completing_at)
+
+    def test_cancel(self):
+        session = self.start()
+        self.put_part(session, 1)
+
+        self.assertEqual(self.client.delete(f'/file/uploads/{session["id"]}/').status_code, 204)
+        self.assertFalse(UploadSession.objects.exists())
@@ -0,0 +1,67 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from custom_user.models import CustomUser
+
+FILE_THUMBNAIL_SIZES: list[int] = getattr(settings, 'FILE_THUMBNAIL_SIZES', [160, 480])  # For chat.
+PROFILE_THUMBNAIL_SIZES: list[int] = getattr(settings, 'PROFILE_THUMBNAIL_SIZES', [64, 256])  # For avatar.
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff'}
+
+
+def thumbnail_key(name: str, size: int) -> str:
+    """
+    Next to original. (`media/a/b.png` -> `media/a/b_160.webp`)
+    """
+    return f'{os.path.splitext(name)[0]}_{size}.webp'
+
+
+def make_thumbnails(name: str, sizes: list[int], mime_type: str | None = None) -> dict[str, str]:
+    """
+    WebP thumbnails fitting in each size (longer side), Returns {size: key}.
+    Empty if it's not an image. (By `mime_type` if given, Key of blob has no extension.)
+    Already stored one (same blob...) is not made again.
+    """
+    is_image = mime_type.startswith('image/') if mime_type else os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    if not is_image:
+        return {}
+
+    keys = {str(size): thumbnail_key(name, size) for size in sizes}
+    if all(default_storage.exists(key) for key in keys.values()):
+        return keys
+
+    try:
+        with default_storage.open(name, 'rb') as f:
+            image = ImageOps.exif_transpose(Image.open(f))
+            image.load()
+    except (UnidentifiedImageError, OSError):
+        return {}
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+
+    for size, key in keys.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail((int(size), int(size)))  # Never enlarged.
+        buffer = BytesIO()
+        thumbnail.save(buffer, 'WEBP', quality=80, method=4)
+        if default_storage.exists(key):
+            default_storage.delete(key)
+        default_storage.save(key, ContentFile(buffer.getvalue()))
+    return keys
+
+
+def generate_profile_thumbnails(user_id: int):
+    user = CustomUser.objects.filter(id=user_id).first()
+    if user is None or not user.profile_image:
+        return
+    user.profile_thumbnails = {'source': user.profile_image.name,
+                               **make_thumbnails(user.profile_image.name, PROFILE_THUMBNAIL_SIZES)}
+    user.save(update_fields=['profile_thumbnails'])
+
+
+def thumbnail_urls(thumbnails: dict) -> dict[str, str]:
+    return {size: default_storage.url(key) for size, key in (thumbnails or {}).items() if size != 'source'}
@@ -0,0 +1,123 @@
+import posixpath
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import chain
+from uuid import uuid4
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from custom_user.models import CustomUser
+from file.metadata import guess_mime_type
+from file.models import File, UploadSession
+from file.storage import delete_objects, deletion_queue, get_bucket_name, get_s3_client, list_objects
+from workspace.models import Workspace
+
+UPLOAD_TOKEN_SALT = 'file.upload'
+UPLOAD_EXPIRES_IN: int = getattr(settings, 'FILE_UPLOAD_EXPIRES_IN', 60 * 60)  # seconds
+CONFIRM_EXPIRES_IN: int = UPLOAD_EXPIRES_IN * 2  # Max age of upload token.
+UPLOAD_PREFIX = 'media/file/upload/'
+
+
+class UploadError(Exception):
+    pass
+
+
+def upload_prefix(at: datetime) -> str:
+    """
+    Uploads are grouped by hour (UTC) they're issued, So sweeping lists only hours which can't be confirmed anymore.
+    """
+    return f'{UPLOAD_PREFIX}{at.astimezone(dt_timezone.utc):%Y%m%d%H}/'
+
+
+def make_key(user: CustomUser, file_name: str) -> str:
+    """
+    Under prefix of current hour, With random one more level. Presigned PUT overwrites same key.
+    """
+    return f'{upload_prefix(timezone.now())}user_{user.id}/{uuid4().hex}/{get_valid_filename(file_name)}'
+
+
+def create_upload_slot(user: CustomUser, file_name: str, content_type: str, size: int,
+                       workspace: Workspace | None = None) -> dict:
+    """
+    Presigned PUT url of new key. Client uploads to storage directly with returned `headers`,
+    Then confirms it with `upload_token`.
+    `Content-Length` is signed, So storage rejects object of other size than `size` which quota was checked with.
+    Slots never confirmed are deleted by `sweep_unconfirmed`.
+    """
+    key = make_key(user, file_name)
+    params = {'Bucket': get_bucket_name(), 'Key': key, 'ContentType': content_type, 'ContentLength': size}
+    headers = {'Content-Type': content_type, 'Content-Length': str(size)}
+    if acl := getattr(settings, 'AWS_DEFAULT_ACL', None):
+        params['ACL'] = acl
+        headers['x-amz-acl'] = acl
+
+    url = get_s3_client().generate_presigned_url('put_object', Params=params, ExpiresIn=UPLOAD_EXPIRES_IN)
+    return {
+        'url': url,
+        'method': 'PUT',
+        'headers': headers,
+        'key': key,
+        'expires_in': UPLOAD_EXPIRES_IN,
+        'upload_token': signing.dumps({'user_id': user.id, 'key': key, 'file_name': file_name, 'size': size,
+                                       'workspace_id': workspace.id if workspace else None},
+                                      salt=UPLOAD_TOKEN_SALT),
+    }
+
+
+def confirm_upload(user: CustomUser, upload_token: str) -> File:
+    """
+    Check object is really uploaded, and create `File` of it.
+    """
+    try:
+        slot = signing.loads(upload_token, salt=UPLOAD_TOKEN_SALT, max_age=CONFIRM_EXPIRES_IN)
+    except signing.BadSignature:  # Includes expired one.
+        raise UploadError('Invalid or expired upload token.')
+    if slot['user_id'] != user.id:
+        raise UploadError('This upload token is not yours.')
+
+    try:
+        head = get_s3_client().head_object(Bucket=get_bucket_name(), Key=slot['key'])
+    except ClientError:
+        raise UploadError('File is not uploaded yet.')
+    if head['ContentLength'] > slot.get('size', head['ContentLength']):
+        # Quota was checked with declared size. Bigger one is not accepted. (Uploaded by url of other storage...)
+        deletion_queue.enqueue(slot['key'])
+        raise UploadError('Uploaded file is bigger than declared size.')
+
+    # Confirming twice makes no duplicated row.
+    file, _ = File.objects.get_or_create(file=slot['key'], defaults={
+        'uploaded_by': user,
+        'workspace_id': slot.get('workspace_id', None),
+        'file_name': slot['file_name'],
+        'size': head['ContentLength'],
+        'mime_type': guess_mime_type(slot['file_name'], head.get('ContentType', None)),
+    })
+    return file
+
+
+def sweep_unconfirmed(hours: int = 24, page_size: int = 1000) -> int:
+    """
+    Delete objects uploaded to slots but never confirmed, In hours whose tokens are all expired. Returns count.
+    Only last `hours` are listed, So it should run more often than that. (Cron...)
+
+    Each slot has its own directory. Directories of `File`s are kept (with objects made next to it),
+    And of upload sessions too, Completing one could have its object before `File`.
+    """
+    now = timezone.now()
+    hour = (now - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
+    deleted = 0
+    # Slot issued at end of an hour is confirmable until `CONFIRM_EXPIRES_IN` after it.
+    while hour + timedelta(hours=1, seconds=CONFIRM_EXPIRES_IN) <= now:
+        prefix = upload_prefix(hour)
+        kept = {posixpath.dirname(key) for key in chain(
+            File.objects.filter(file__startswith=prefix).values_list('file', flat=True),
+            UploadSession.objects.filter(key__startswith=prefix).values_list('key', flat=True),
+        )}
+        for page in list_objects(prefix, page_size):
+            orphans = [key for key in page if posixpath.dirname(key) not in kept]
+            deleted += len(orphans) - len(delete_objects(orphans))
+        hour += timedelta(hours=1)
+    return deleted
@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
 
-from file.views import FileViewSet
+from file.views import FileViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
 
+router.register('uploads', UploadSessionViewSet)  # Before '', Not to be taken as `pk` of file.
 router.register('', FileViewSet)
 
 urlpatterns = router.urls
@@ -1,10 +1,44 @@
-from rest_framework import viewsets, permissions
+import mimetypes
+from datetime import timedelta
+from urllib.parse import quote
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.response import Response
 
 from chat_channel.models import ChatChannel
-from file.models import File
-from file.serializers import FileSerializer
+from file import blobs, downloads, quota
+from file.metadata import guess_mime_type
+from file.models import Blob, File, UploadPart, UploadSession, UserStorageUsage
+from file.multipart import MAX_CHUNK_SIZE, get_backend, receive_part
+from file.serializers import DedupSerializer, FileSerializer, UploadConfirmSerializer, UploadSessionSerializer, \
+    UploadSlotSerializer
+from file.uploads import UploadError, confirm_upload, create_upload_slot, make_key
+from workspace.models import Workspace
+
+
+def get_upload_workspace(request) -> Workspace | None:
+    """
+    Workspace of `workspace` query parameter (hashed value), Which uploaded file is counted in.
+    Uploader should be a member of it.
+    """
+    if not (hashed_value := request.query_params.get('workspace', None)):
+        return None
+    return get_object_or_404(Workspace, hashed_value=hashed_value, members=request.user)
+
+
+def quota_exceeded(e: quota.QuotaExceeded) -> Response:
+    return Response({'msg': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
 
 
 class FileViewSet(viewsets.ModelViewSet):
@@ -17,15 +51,29 @@ class FileViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         If client request as `list` or method is `DELETE`, Get queryset about themselves,
-        If not (just retrieve for download file), Get not filtering queryset.
+        If not (retrieve, download), Also files sent to channel they're member of. (Including private ones and DMs)
+        Workspace of file is only for quota, Being its member doesn't mean the file was shared.
         """
         if self.kwargs.get('pk', None) and self.request.method == 'GET':
-            return self.queryset
+            user = self.request.user
+            return self.queryset.filter(
+                Q(uploaded_by=user) | Q(channel__members=user) | Q(chat__channel__members=user)
+            ).distinct()
         else:
             return self.queryset.filter(uploaded_by=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(uploaded_by=self.request.user)
+        # Same content is stored once. (See `Blob`)
+        uploaded = serializer.validated_data['file']
+        # Reference of blob is counted in one transaction with file, So it's not left counted when saving fails.
+        with blobs.store(uploaded) as blob:
+            serializer.save(uploaded_by=self.request.user,
+                            workspace=self.upload_workspace,
+                            file=blob.key,
+                            blob=blob,
+                            file_name=uploaded.name,
+                            size=blob.size,
+                            mime_type=guess_mime_type(uploaded.name, uploaded.content_type))
 
     def list(self, request, *args, **kwargs):
         """
@@ -36,9 +84,115 @@ class FileViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         """
         파일 업로드만 담당하며, 다른 비지니스 로직과는 아무 상관이 없습니다.
+        query parameter `workspace`(hashed value)를 주면 그 워크스페이스의 용량에도 포함됩니다.
+        용량을 넘으면 413을 줍니다. (아래 업로드 방법 모두 같음.)
         """
+        self.upload_workspace = get_upload_workspace(request)
+        try:
+            # Before reading body. (`Content-Length` includes a little of multipart form too.)
+            quota.check_quota(request.user, self.upload_workspace, int(request.META.get('CONTENT_LENGTH') or 0))
+        except quota.QuotaExceeded as e:
+            return quota_exceeded(e)
         return super().create(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser], serializer_class=DedupSerializer)
+    def dedup(self, request, *args, **kwargs):
+        """
+        올리기 전에 파일의 sha256을 보내면, 자신이 이미 올린 적 있는 내용일 경우 업로드 없이 파일을 만들어 줍니다. (201)
+        아니면 404를 주니, 그때 업로드 하세요. (다른 사람이 올린 내용이어도 404. 해시만 알고 가져갈 수 없도록.)
+        """
+        s = self.get_serializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        sha256 = s.validated_data['sha256'].lower()
+        workspace = get_upload_workspace(request)
+        # Only content caller has had. Knowing hash of someone's file is not proof of having it.
+        if not File.objects.filter(uploaded_by=request.user, blob__sha256=sha256).exists():
+            return Response({'msg': 'Not stored yet. Upload it.'}, status=status.HTTP_404_NOT_FOUND)
+        if (size := Blob.objects.filter(sha256=sha256).values_list('size', flat=True).first()) is not None:
+            try:
+                quota.check_quota(request.user, workspace, size)
+            except quota.QuotaExceeded as e:
+                return quota_exceeded(e)
+        blob = blobs.acquire(sha256)
+        if blob is None:
+            return Response({'msg': 'Not stored yet. Upload it.'}, status=status.HTTP_404_NOT_FOUND)
+
+        file = File.objects.create(uploaded_by=request.user, workspace=workspace, file=blob.key, blob=blob,
+                                   file_name=s.validated_data['file_name'],
+                                   size=blob.size, mime_type=guess_mime_type(s.validated_data['file_name']))
+        return Response(FileSerializer(file).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser], serializer_class=UploadSlotSerializer)
+    def upload_slot(self, request, *args, **kwargs):
+        """
+        서버를 거치지 않고 storage에 바로 업로드 하기 위한 주소를 발급합니다. (`size`는 올릴 파일의 byte 수)
+        `url`에 `headers`를 넣어 `PUT`으로 파일을 올린 후, `upload_token`으로 `upload_confirm`을 호출하세요.
+        """
+        s = self.get_serializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        workspace = get_upload_workspace(request)
+        try:
+            quota.check_quota(request.user, workspace, s.validated_data['size'])
+        except quota.QuotaExceeded as e:
+            return quota_exceeded(e)
+        slot = create_upload_slot(request.user, s.validated_data['file_name'], s.validated_data['content_type'],
+                                  s.validated_data['size'], workspace)
+        return Response(slot, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser], serializer_class=UploadConfirmSerializer)
+    def upload_confirm(self, request, *args, **kwargs):
+        """
+        storage에 올라간 파일을 확인하고 파일 정보를 만듭니다. (일반 업로드와 같은 응답)
+        """
+        s = self.get_serializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        try:
+            file = confirm_upload(request.user, s.validated_data['upload_token'])
+        except UploadError as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(FileSerializer(file).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def usage(self, request, *args, **kwargs):
+        """
+        자신이 사용 중인 용량과 한도(byte)를 줍니다. (`quota`가 null이면 무제한)
+        """
+        usage = UserStorageUsage.objects.filter(user=request.user).first()
+        return Response({'bytes': usage.bytes if usage else 0,
+                         'file_count': usage.file_count if usage else 0,
+                         'quota': quota.USER_QUOTA})
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, *args, **kwargs):
+        """
+        파일 내용을 서버를 통해 받습니다. (bucket이 공개되지 않아도 됨.)
+        `Range` header로 일부분만 받을 수 있어서, 끊긴 다운로드를 이어 받거나 동영상을 넘겨 볼 수 있습니다.
+        """
+        file: File = self.get_object()
+        key = file.file.name
+        size = downloads.object_size(key)
+        try:
+            byte_range = downloads.parse_range(request.headers.get('Range', None), size)
+        except downloads.RangeNotSatisfiable:
+            response = Response(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file_name = file.file_name or key.rsplit('/', 1)[-1]
+        content_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+        start, end = byte_range or (0, size - 1)
+        # Async iterator, So chunks are sent while being read. (Sync one is read whole into memory under ASGI.)
+        response = StreamingHttpResponse(downloads.aiterate(downloads.stream(key, start, end, size)),
+                                         content_type=content_type,
+                                         status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK)
+        response['Content-Length'] = end - start + 1
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        response['Accept-Ranges'] = 'bytes'
+        response.headers['Content-Disposition'] = f'attachment; filename*=UTF-8\'\'{quote(file_name)}'
+        return response
+
     def retrieve(self, request, *args, **kwargs):
         """
         `id`를 입력해 파일을 다운 받을 수 있게 합니다.
@@ -50,3 +204,149 @@ class FileViewSet(viewsets.ModelViewSet):
         자신의 업로드한 파일이 아니면 지울 수 없습니다.
         """
         return super().destroy(request, *args, **kwargs)
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    이어 올리기가 되는 큰 파일 업로드.
+    1. `POST`로 세션을 만들고 (`file_name`, `size`, `content_type`, 용량을 넘으면 413)
+    2. `chunk_size`씩 잘라 `PUT parts/{번호}/`로 올리고 (body는 조각 그대로, `X-Chunk-SHA256` header에 조각의 sha256 hex)
+    3. 끊기면 `GET`의 `received_parts`를 보고 빠진 조각만 다시 올린 후
+    4. `POST complete/`로 파일을 만듭니다. (일반 업로드와 같은 응답)
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser]
+
+    max_parts = 10000  # Limit of S3 multipart upload.
+    default_chunk_size: int = getattr(settings, 'FILE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    completing_timeout: int = getattr(settings, 'FILE_UPLOAD_COMPLETING_TIMEOUT', 10 * 60)  # seconds
+
+    def get_queryset(self):
+        return self.queryset.filter(uploaded_by=self.request.user).prefetch_related('parts')
+
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except quota.QuotaExceeded as e:
+            return quota_exceeded(e)
+
+    def perform_create(self, serializer):
+        backend = get_backend()
+        size = serializer.validated_data['size']
+        workspace = get_upload_workspace(self.request)
+        quota.check_quota(self.request.user, workspace, size)
+        chunk_size = max(serializer.validated_data.get('chunk_size', self.default_chunk_size),
+                         backend.min_chunk_size,
+                         -(-size // self.max_parts))
+        if chunk_size > MAX_CHUNK_SIZE:
+            raise ValidationError({'size': f'Should be {MAX_CHUNK_SIZE * self.max_parts} bytes or smaller.'})
+        session = serializer.save(uploaded_by=self.request.user,
+                                  workspace=workspace,
+                                  chunk_size=chunk_size,
+                                  key=make_key(self.request.user, serializer.validated_data['file_name']))
+        backend.start(session)
+        session.save()
+
+    def is_completing(self, session: UploadSession) -> bool:
+        return session.completing_at is not None \
+            and timezone.now() - session.completing_at < timedelta(seconds=self.completing_timeout)
+
+    @action(detail=True, methods=['put'], url_path=r'parts/(?P<part_number>[0-9]+)')
+    def part(self, request, *args, **kwargs):
+        session: UploadSession = self.get_object()
+        if session.file_id is not None:
+            return Response({'msg': 'Upload is completed already.'}, status=status.HTTP_409_CONFLICT)
+        if self.is_completing(session):
+            return Response({'msg': 'Upload is being completed.'}, status=status.HTTP_409_CONFLICT)
+        number = int(kwargs['part_number'])
+        if not 1 <= number <= session.part_count:
+            return Response({'msg': f'Part number should be 1 ~ {session.part_count}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        expected = session.chunk_size if number < session.part_count \
+            else session.size - session.chunk_size * (session.part_count - 1)
+        # Not `request.body`, Which is limited by `DATA_UPLOAD_MAX_MEMORY_SIZE` and loads whole part.
+        with receive_part(request.stream, expected) as (f, size, sha256, md5):
+            if size != expected:
+                return Response({'msg': f'Part {number} should be {expected} bytes.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if request.headers.get('X-Chunk-SHA256', '').lower() != sha256:
+                return Response({'msg': 'Checksum mismatch. Send this part again.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            if not any(part.number == number and part.sha256 == sha256 for part in session.parts.all()):
+                etag = get_backend().upload_part(session, number, f, md5)
+                UploadPart.objects.update_or_create(session=session, number=number,
+                                                    defaults={'size': expected, 'sha256': sha256, 'etag': etag})
+        return Response({'number': number, 'size': expected, 'sha256': sha256})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, *args, **kwargs):
+        """
+        조각을 합쳐 파일을 만듭니다. (201)
+        이미 완료된 세션이면 그때 만든 파일을 줍니다. (200, 응답을 못 받아 다시 보낸 경우)
+        합치는 중에 다시 보내면 409, 잠시 후 다시 보내세요.
+        """
+        with transaction.atomic():
+            # Locked only to mark it, So requests sent twice don't complete upload twice.
+            # Storage assembles parts after commit, Not holding the lock meanwhile.
+            session: UploadSession = get_object_or_404(self.get_queryset().select_for_update(), pk=kwargs['pk'])
+            if session.file is not None:
+                return Response(FileSerializer(session.file).data, status=status.HTTP_200_OK)
+            if self.is_completing(session):
+                return Response({'msg': 'Upload is being completed.'}, status=status.HTTP_409_CONFLICT)
+
+            parts = sorted(session.parts.all(), key=lambda part: part.number)
+            missing = sorted(set(range(1, session.part_count + 1)) - {part.number for part in parts})
+            if missing:
+                return Response({'msg': 'Some parts are not uploaded.', 'missing_parts': missing},
+                                status=status.HTTP_400_BAD_REQUEST)
+            session.completing_at = timezone.now()
+            session.save(update_fields=['completing_at', 'updated_at'])
+
+        try:
+            get_backend().complete(session, parts)
+        except ClientError as e:
+            # Completed by S3 before, But saving file failed. (Upload id is gone after complete.)
+            if e.response.get('Error', {}).get('Code', None) != 'NoSuchUpload' \
+                    or not default_storage.exists(session.key):
+                UploadSession.objects.filter(id=session.id).update(completing_at=None)
+                return Response({'msg': 'Upload is not in progress anymore. Start again.'},
+                                status=status.HTTP_409_CONFLICT)
+        except Exception:
+            UploadSession.objects.filter(id=session.id).update(completing_at=None)  # Could be tried again.
+            raise
+
+        with transaction.atomic():
+            session.file = File.objects.create(uploaded_by=request.user,
+                                               workspace=session.workspace,
+                                               file=session.key,
+                                               file_name=session.file_name,
+                                               size=session.size,
+                                               mime_type=guess_mime_type(session.file_name, session.content_type))
+            session.completing_at = None
+            session.save(update_fields=['file', 'key', 'completing_at', 'updated_at'])
+            session.parts.all().delete()
+        return Response(FileSerializer(session.file).data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        """
+        Cancel upload. Uploaded parts are dropped too.
+        """
+        get_backend().abort(instance)
+        instance.delete()
+
+    def destroy(self, request, *args, **kwargs):
+        session: UploadSession = self.get_object()
+        if session.file_id is not None:
+            return Response({'msg': 'Upload is completed already. Delete the file instead.'},
+                            status=status.HTTP_409_CONFLICT)
+        if self.is_completing(session):
+            return Response({'msg': 'Upload is being completed.'}, status=status.HTTP_409_CONFLICT)
+        self.perform_destroy(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
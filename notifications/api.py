@@ -1,4 +1,4 @@
-from django.db.models import Q, Prefetch
+from django.db.models import Q
 
 from chat.models import Chat
 from chat_channel.models import ChatChannel
@@ -61,16 +61,13 @@ def notify_via_rest(sender, chat_id, channel_hashed_value):
         return len(notify_via_signal(chat=c))
 
 
-def get_notification_list(receiver) -> dict[str, dict[str, int]]:
-    """
-    get notifications belongs to user
-    """
+def unread_notifications(receiver):
+    return Notification.objects. \
+        select_related("channel__workspace"). \
+        filter(Q(had_read=False) & Q(receiver=receiver))
 
-    notifications = Notification.objects. \
-        select_related("channel", "receiver"). \
-        filter(Q(had_read=False) & Q(receiver=receiver)). \
-        prefetch_related(Prefetch('channel', queryset=ChatChannel.objects.select_related('workspace')))
 
+def group_by_channel(notifications) -> list[dict[str, str | int]]:
     # For explanation of below codes,
     # This is for O(1) time complexity of dictionary computation
     # and O(n) time complexity of array computation (n is number of key in `d`.)
@@ -90,15 +87,43 @@ def get_notification_list(receiver) -> dict[str, dict[str, int]]:
     return res
 
 
+def get_notification_list(receiver) -> list[dict[str, str | int]]:
+    """
+    get notifications belongs to user
+    """
+    return group_by_channel(unread_notifications(receiver))
+
+
+async def aget_notification_list(receiver) -> list[dict[str, str | int]]:
+    """
+    async version of `get_notification_list`
+    """
+    return group_by_channel([notification async for notification in unread_notifications(receiver)])
+
+
+def channel_id_of(hashed_value):
+    return ChatChannel.objects.filter(hashed_value=hashed_value).values_list("id", flat=True)
+
+
 def read_notification_list(receiver=None, channel=None):
     """
     find notifications and set them to had read
+    channel's hashed value is resolved to id first, so `UPDATE` is on notification table only (without join).
     """
-    noti = (
-        Notification.objects.select_related("channel", "receiver")
-        .filter(
-            Q(had_read=False) & Q(receiver=receiver) & Q(channel__hashed_value=channel)
-        )
-        .update(had_read=True)
-    )
+    if (channel_id := channel_id_of(channel).first()) is None:
+        return 0  # Not `channel_id=None`, Which is notification of DM.
+    noti = Notification.objects.filter(
+        Q(had_read=False) & Q(receiver=receiver) & Q(channel_id=channel_id)
+    ).update(had_read=True)
     return noti
+
+
+async def aread_notification_list(receiver=None, channel=None):
+    """
+    async version of `read_notification_list`
+    """
+    if (channel_id := await channel_id_of(channel).afirst()) is None:
+        return 0
+    return await Notification.objects.filter(
+        Q(had_read=False) & Q(receiver=receiver) & Q(channel_id=channel_id)
+    ).aupdate(had_read=True)
@@ -1,18 +1,13 @@
-from channels.db import database_sync_to_async
-
 from notifications import api
-from notifications.models import Notification
 from websocket.AuthWebsocketConsumer import AuthWebsocketConsumer
 
 
 class NotificationsConsumer(AuthWebsocketConsumer):
-    @database_sync_to_async
-    def _get_unread_notifications(self, user):
-        return api.get_notification_list(user)
+    async def _get_unread_notifications(self, user):
+        return await api.aget_notification_list(user)
 
-    @database_sync_to_async
-    def _read_notification(self, user, channel):
-        return api.read_notification_list(receiver=user, channel=channel)
+    async def _read_notification(self, user, channel):
+        return await api.aread_notification_list(receiver=user, channel=channel)
 
     async def before_accept(self):
         # No need to implement this behavior
@@ -59,9 +54,3 @@ class NotificationsConsumer(AuthWebsocketConsumer):
             raise ValueError(
                 "Notification.consumer>>broadcasting target(self.user) is None"
             )
-
-    async def disconnect(self, code):
-        if hasattr(self, "room_group_name") and self.room_group_name:
-            await self.channel_layer.group_discard(
-                self.room_group_name, self.channel_name
-            )
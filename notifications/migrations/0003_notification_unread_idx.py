@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2023-04-29 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_chat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['receiver', 'had_read', 'channel'], name='notification_unread_idx'),
+        ),
+    ]
@@ -43,5 +43,11 @@ class Notification(models.Model):
 
     objects = NotificationManger()
 
+    class Meta:
+        indexes = [
+            # Unread ones of receiver, Per channel. (`unread_notifications`, `read_notification_list`)
+            models.Index(fields=['receiver', 'had_read', 'channel'], name='notification_unread_idx'),
+        ]
+
     def __str__(self):
         return f"{self.sender} ({self.chat}) to {self.receiver} read: {self.had_read}"
@@ -1,3 +1,36 @@
-from django.test import TestCase
+from django.test import TransactionTestCase
 
-# Create your tests here.
+from chat.models import Chat
+from chat_channel.models import ChatChannel
+from custom_user.models import CustomUser
+from notifications import routing
+from notifications.models import Notification
+from websocket.testing import auth_communicator, no_blocking_queries
+from workspace.models import Workspace
+
+
+class NotificationsConsumerTest(TransactionTestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create(username='sender')
+        self.receiver = CustomUser.objects.create(username='receiver')
+        workspace = Workspace.objects.create(name='notification_workspace', hashed_value='notiws')
+        self.channel = ChatChannel.objects.create(name='notification', workspace=workspace, hashed_value='notich')
+        self.channel.members.add(self.sender, self.receiver)
+        Chat.objects.create(message='hello', chatter=self.sender, channel=self.channel)  # Creates notification.
+
+    async def test_list_and_read_without_blocking_loop(self):
+        with no_blocking_queries():
+            communicator = await auth_communicator(routing.websocket_urlpatterns, '/ws/notification/', self.receiver)
+            notifications = (await communicator.receive_json_from())['notifications']
+
+            await communicator.send_json_to({'channel_hashed_value': 'notich'})
+            read = await communicator.receive_json_from()
+            await communicator.disconnect()
+
+        self.assertEqual(notifications, [{
+            'channel_hashed_value': 'notich',
+            'workspace_hashed_value': 'notiws',
+            'count': 1,
+        }])
+        self.assertTrue(read['success'])
+        self.assertFalse(await Notification.objects.filter(receiver=self.receiver, had_read=False).aexists())
@@ -0,0 +1,58 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+
+class FullTextSearch:
+    """
+    Search text column with MySQL FULLTEXT index (`ngram` parser), Ordered by relevance.
+
+    Keyword is searched as a phrase, So result is same as `icontains` but uses index.
+    Keyword shorter than ngram token size can't be found in index,
+    and other databases (sqlite on local...) have no such index. Both fall back to `icontains` ordered by newest.
+    """
+    token_size: int = getattr(settings, 'SEARCH_NGRAM_TOKEN_SIZE', 2)  # `ngram_token_size` of MySQL.
+    snippet_width: int = getattr(settings, 'SEARCH_SNIPPET_WIDTH', 40)  # Characters around keyword.
+
+    def __init__(self, keyword: str):
+        self.keyword = keyword.strip()
+
+    @property
+    def use_index(self) -> bool:
+        return connection.vendor == 'mysql' and len(self.keyword) >= self.token_size
+
+    def search(self, queryset: QuerySet, *fields: str) -> QuerySet:
+        """
+        Filter `queryset` by `fields` and annotate `relevance`. (0 when index is not used.)
+        Index covering exactly these `fields` should exist.
+        """
+        if not self.use_index:
+            matched = Q()
+            for field in fields:
+                matched |= Q(**{f'{field}__icontains': self.keyword})
+            return queryset.filter(matched) \
+                .annotate(relevance=RawSQL('0', [], output_field=FloatField())) \
+                .order_by('-id')
+
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        columns = ', '.join(f'{table}.{connection.ops.quote_name(queryset.model._meta.get_field(field).column)}'
+                            for field in fields)
+        # Double quotes make it phrase. Quotes in keyword itself can't be escaped in boolean mode.
+        phrase = '"' + self.keyword.replace('"', ' ') + '"'
+        match = RawSQL(f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)', [phrase], output_field=FloatField())
+        return queryset.annotate(relevance=match).filter(relevance__gt=0).order_by('-relevance', '-id')
+
+    def snippet(self, text: str) -> str:
+        """
+        Part of `text` around first keyword, With `…` where it's cut.
+        """
+        found = re.search(re.escape(self.keyword), text, re.IGNORECASE)
+        if found is None:
+            return text[:self.snippet_width * 2]
+
+        start = max(found.start() - self.snippet_width, 0)
+        end = min(found.end() + self.snippet_width, len(text))
+        return ('…' if start > 0 else '') + text[start:end] + ('…' if end < len(text) else '')
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from search.scope import SearchScope
+
+
+class GenerationCache:
+    """
+    Cache whose entries of an owner are invalidated all at once.
+
+    Each owner (workspace, user...) has a generation counter per `namespace`, and it's part of every key.
+    Writes bump the counter, So old entries are never read again and just expire.
+    Counter starts from current time, So a counter evicted from cache doesn't come back to an old value.
+    """
+    timeout: int = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300)  # seconds
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    def _generation_key(self, owner_id: int) -> str:
+        return f'{self.namespace}:generation:{owner_id}'
+
+    def generations(self, owner_ids: list[int]) -> list[int]:
+        keys = [self._generation_key(owner_id) for owner_id in owner_ids]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                cache.add(key, time.time_ns(), timeout=None)
+                found[key] = cache.get(key)
+        return [found[key] for key in keys]
+
+    def bump(self, owner_ids) -> dict[int, int]:
+        """
+        Returns new generation of each owner.
+        """
+        generations = {}
+        for owner_id in set(owner_ids):
+            key = self._generation_key(owner_id)
+            try:
+                generations[owner_id] = cache.incr(key)
+            except ValueError:  # Not in cache. (Never read, or evicted.)
+                cache.add(key, time.time_ns(), timeout=None)
+                generations[owner_id] = cache.get(key)
+        return generations
+
+    def make_key(self, owner_ids: list[int], *parts) -> str:
+        raw = json.dumps([self.generations(owner_ids), owner_ids, *parts], sort_keys=True, default=str)
+        return f'{self.namespace}:{hashlib.sha256(raw.encode()).hexdigest()}'
+
+    def get(self, key: str):
+        return cache.get(key)
+
+    def set(self, key: str, value):
+        cache.set(key, value, timeout=self.timeout)
+
+
+search_cache = GenerationCache('search')  # Generation per workspace, Bumped when searchable rows change.
+
+
+def normalize_query(keyword: str) -> str:
+    """
+    Search is case insensitive and ignores repeated spaces, So these make same key.
+    """
+    return ' '.join(keyword.split()).lower()
+
+
+def search_cache_key(scope: SearchScope, keyword: str, params: dict) -> str:
+    """
+    Result depends only on visible channels / workspaces, keyword and page. (Not on who is searching.)
+    """
+    return search_cache.make_key(scope.workspace_ids,
+                                 scope.channel_ids, scope.by_channel, normalize_query(keyword), params)
+
+
+scope_cache = GenerationCache('search_scope')  # Generation per user, Bumped when memberships of user change.
+
+
+def get_scope(user, workspace_hashed_value: str | None = None, channel_hashed_value: str | None = None) -> SearchScope:
+    key = scope_cache.make_key([user.id], workspace_hashed_value, channel_hashed_value)
+    if (ids := scope_cache.get(key)) is not None:
+        return SearchScope(*ids)
+
+    scope = SearchScope.of(user, workspace_hashed_value, channel_hashed_value)
+    scope_cache.set(key, (scope.channel_ids, scope.workspace_ids, scope.by_channel))
+    return scope
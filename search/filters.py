@@ -0,0 +1,44 @@
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_moment(value: str, end_of_day: bool = False) -> datetime:
+    """
+    Datetime or date. (`until=2023-04-01` means until end of that day.)
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(value)
+        moment = datetime.combine(date, time.max if end_of_day else time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def file_filters(query_params) -> Q:
+    """
+    Filters of file search from query parameters.
+    `file_type` (MIME type or its first part like `image`), `min_size`, `max_size` (bytes),
+    `since`, `until` (uploaded datetime or date), `uploader` (user id).
+    """
+    q = Q()
+    try:
+        if file_type := query_params.get('file_type', None):
+            q &= Q(mime_type=file_type) if '/' in file_type else Q(mime_type__startswith=f'{file_type}/')
+        if min_size := query_params.get('min_size', None):
+            q &= Q(size__gte=int(min_size))
+        if max_size := query_params.get('max_size', None):
+            q &= Q(size__lte=int(max_size))
+        if since := query_params.get('since', None):
+            q &= Q(created_at__gte=parse_moment(since))
+        if until := query_params.get('until', None):
+            q &= Q(created_at__lte=parse_moment(until, end_of_day=True))
+        if uploader := query_params.get('uploader', None):
+            q &= Q(uploaded_by_id=int(uploader))
+    except ValueError as e:
+        raise ValidationError({'msg': f'Wrong filter value: {e}'})
+    return q
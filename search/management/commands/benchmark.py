@@ -0,0 +1,208 @@
+import math
+import random
+import time
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from chat.models import Chat
+from chat_channel.models import ChatChannel
+from chat_counter.models import Counter
+from chat_reaction.models import ChatReaction
+from chat_reaction.serializers import Util
+from custom_user.models import CustomUser
+from file.models import File
+from notifications.models import Notification
+from search.cache import search_cache
+from workspace.models import Workspace
+
+KOREAN_WORDS = ['안녕하세요', '회의', '일정', '배포', '서버', '점심', '확인', '부탁드립니다', '오늘', '내일', '버그', '수정',
+                '리뷰', '감사합니다', '데이터베이스', '검색', '파일', '업로드', '알림', '채널']
+ENGLISH_WORDS = ['hello', 'meeting', 'deploy', 'server', 'lunch', 'review', 'bug', 'fix', 'release', 'search', 'file',
+                 'upload', 'notification', 'channel', 'database', 'index', 'query', 'cache', 'latency', 'today']
+ICONS = ['👍', '🎉', '😂', '👀', '🔥']
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """
+    Nearest rank.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic corpus (workspaces, channels, users, chats, files, reactions, notifications) ' \
+           'and report latency percentiles and query counts of search, chat history and unread count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workspaces', type=int, default=2)
+        parser.add_argument('--channels', type=int, default=5, help='Per workspace.')
+        parser.add_argument('--users', type=int, default=20, help='Per workspace.')
+        parser.add_argument('--chats', type=int, default=2000, help='Per channel.')
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per workload.')
+        parser.add_argument('--warm-cache', action='store_true', help='Let search cache answer repeated searches.')
+        parser.add_argument('--keep', action='store_true', help='Do not delete generated corpus.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.tag = f'bench-{uuid4().hex[:6]}'
+
+        started = time.perf_counter()
+        corpus = self.generate(options)
+        self.stdout.write(f'Generated corpus {self.tag} in {time.perf_counter() - started:.1f}s: '
+                          f'{len(corpus["workspaces"])} workspaces, {len(corpus["channels"])} channels, '
+                          f'{len(corpus["users"])} users, {corpus["chat_count"]} chats.')
+
+        try:
+            self.run(corpus, options)
+        finally:
+            if not options['keep']:
+                self.cleanup(corpus)
+
+    def message(self) -> str:
+        words = self.random.choice([KOREAN_WORDS, ENGLISH_WORDS, KOREAN_WORDS + ENGLISH_WORDS])
+        return ' '.join(self.random.choices(words, k=self.random.randint(3, 15)))
+
+    @transaction.atomic
+    def generate(self, options) -> dict:
+        Workspace.objects.bulk_create([Workspace(name=f'{self.tag}-{i}') for i in range(options['workspaces'])])
+        workspaces = list(Workspace.objects.filter(name__startswith=self.tag))  # With ids on every database.
+
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'{self.tag}-{i}',
+                       display_name=f'{self.random.choice(ENGLISH_WORDS)} {self.random.choice(KOREAN_WORDS)}',
+                       title=self.random.choice(ENGLISH_WORDS))
+            for i in range(options['workspaces'] * options['users'])
+        ])
+        users = list(CustomUser.objects.filter(username__startswith=self.tag).order_by('id'))
+        members = {workspace.id: users[i * options['users']:(i + 1) * options['users']]
+                   for i, workspace in enumerate(workspaces)}
+        Workspace.members.through.objects.bulk_create([
+            Workspace.members.through(workspace_id=workspace_id, customuser_id=user.id)
+            for workspace_id, workspace_users in members.items() for user in workspace_users
+        ])
+
+        ChatChannel.objects.bulk_create([
+            ChatChannel(name=f'{self.tag}-{workspace.id}-{i}', workspace=workspace)
+            for workspace in workspaces for i in range(options['channels'])
+        ])
+        channels = list(ChatChannel.objects.filter(name__startswith=self.tag))
+        ChatChannel.members.through.objects.bulk_create([
+            ChatChannel.members.through(chatchannel_id=channel.id, customuser_id=user.id)
+            for channel in channels for user in members[channel.workspace_id]
+        ])
+
+        File.objects.bulk_create([
+            File(uploaded_by=self.random.choice(users),
+                 file=f'media/file/{self.tag}/{i}.txt',
+                 file_name=f'{self.random.choice(ENGLISH_WORDS)}_{self.random.choice(KOREAN_WORDS)}_{i}.txt')
+            for i in range(max(len(channels) * options['chats'] // 50, 1))
+        ])
+        files = list(File.objects.filter(file__startswith=f'media/file/{self.tag}/'))
+
+        chat_count = 0
+        for channel in channels:
+            Chat.objects.bulk_create([
+                Chat(message=self.message(),
+                     channel=channel,
+                     chatter=self.random.choice(members[channel.workspace_id]),
+                     file=self.random.choice(files) if self.random.random() < 0.02 else None)
+                for _ in range(options['chats'])
+            ], batch_size=1000)
+            chat_count += options['chats']
+
+        chats = list(Chat.objects.filter(channel__in=channels).values_list('id', 'channel_id', 'chatter_id'))
+        reacted = self.random.sample(chats, k=len(chats) // 10)
+        ChatReaction.objects.bulk_create([
+            ChatReaction(chat_id=chat_id, icon=Util.to_inter(self.random.choice(ICONS))) for chat_id, _, _ in reacted
+        ], batch_size=1000)
+
+        # Unread notifications to every member except chatter, For recent chats of each channel.
+        channel_members = {channel.id: members[channel.workspace_id] for channel in channels}
+        Notification.objects.bulk_create([
+            Notification(receiver_id=user.id, sender_id=chatter_id, channel_id=channel_id, chat_id=chat_id)
+            for chat_id, channel_id, chatter_id in chats[:len(channels) * 20]
+            for user in channel_members[channel_id] if user.id != chatter_id
+        ], batch_size=1000)
+        Counter.objects.bulk_create([
+            Counter(channel=channel, user=user) for channel in channels for user in members[channel.workspace_id]
+        ], batch_size=1000)
+
+        return {'workspaces': workspaces, 'channels': channels, 'users': users, 'members': members,
+                'chat_count': chat_count}
+
+    def cleanup(self, corpus: dict):
+        Workspace.objects.filter(name__startswith=self.tag).delete()  # Channels, chats... cascade.
+        # Raw delete, Because there are no stored objects. (`pre_delete` of `File` deletes them from storage.)
+        files = File.objects.filter(file__startswith=f'media/file/{self.tag}/')
+        files._raw_delete(files.db)
+        CustomUser.objects.filter(username__startswith=self.tag).delete()
+        self.stdout.write(f'Deleted corpus {self.tag}.')
+
+    def request(self, user: CustomUser, path: str, params: dict | None = None) -> tuple[float, int]:
+        """
+        Call view directly (without middlewares), Returns (ms, number of queries).
+        """
+        request = APIRequestFactory().get(path, params or {})
+        force_authenticate(request, user=user)
+        match = resolve(path)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            ms = (time.perf_counter() - started) * 1000
+
+        if response.status_code >= 400:
+            raise RuntimeError(f'{path} responded {response.status_code}: {response.content[:200]}')
+        return ms, len(queries)
+
+    def run(self, corpus: dict, options):
+        channels = corpus['channels']
+        workspaces = {workspace.id: workspace for workspace in corpus['workspaces']}
+
+        def search():
+            channel = self.random.choice(channels)
+            user = self.random.choice(corpus['members'][channel.workspace_id])
+            if not options['warm_cache']:
+                search_cache.bump([channel.workspace_id])
+            keyword = self.random.choice(KOREAN_WORDS + ENGLISH_WORDS)
+            return self.request(user, f'/search/{keyword}/',
+                                {'workspace': workspaces[channel.workspace_id].hashed_value})
+
+        def history():
+            channel = self.random.choice(channels)
+            user = self.random.choice(corpus['members'][channel.workspace_id])
+            return self.request(user, f'/chat/{channel.hashed_value}/', {'limit': 50, 'offset': 0})
+
+        def unread_notifications():
+            channel = self.random.choice(channels)
+            user = self.random.choice(corpus['members'][channel.workspace_id])
+            return self.request(user, '/notifications/')
+
+        def unread_count():
+            channel = self.random.choice(channels)
+            user = self.random.choice(corpus['members'][channel.workspace_id])
+            return self.request(user, f'/chat_counter/{channel.hashed_value}/')
+
+        self.stdout.write(f'{"workload":<22}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>10}{"max q":>8}')
+        for name, workload in [('search', search), ('history', history),
+                               ('unread_notifications', unread_notifications), ('unread_count', unread_count)]:
+            results = [workload() for _ in range(options['iterations'])]
+            latencies = sorted(ms for ms, _ in results)
+            queries = [count for _, count in results]
+            self.stdout.write(f'{name:<22}'
+                              f'{percentile(latencies, 50):>10.2f}'
+                              f'{percentile(latencies, 95):>10.2f}'
+                              f'{percentile(latencies, 99):>10.2f}'
+                              f'{sum(queries) / len(queries):>10.1f}'
+                              f'{max(queries):>8}')
+
@@ -0,0 +1,75 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+
+
+class SearchPagination:
+    """
+    Each result type (chat, file, user) is paged separately.
+    `limit` is the cap of each type, And `{type}_cursor` continues that type only.
+    Cursor is opaque to client. (Just give back `next` of response.)
+
+    Cursor has ordering values (relevance, id...) of last row, And next page is filtered to rows after it.
+    So deep pages cost same as first one, Not scanning and skipping rows before.
+    """
+    default_limit: int = getattr(settings, 'SEARCH_PAGE_SIZE', 20)
+    max_limit: int = getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 100)
+
+    def __init__(self, request: Request):
+        self.request = request
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Should be integer.'})
+        self.limit = min(max(limit, 1), self.max_limit)
+
+    @staticmethod
+    def ordering(queryset: QuerySet) -> list[tuple[str, bool]]:
+        """
+        (field, descending) of `order_by`, Which should end with unique field. (id)
+        """
+        return [(field.lstrip('-'), field.startswith('-')) for field in queryset.query.order_by]
+
+    def after(self, queryset: QuerySet, result_type: str) -> QuerySet:
+        """
+        Rows after cursor of `result_type`. (`queryset` itself for first page.)
+        """
+        cursor = self.request.query_params.get(f'{result_type}_cursor', None)
+        if not cursor:
+            return queryset
+
+        ordering = self.ordering(queryset)
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (Base64Error, ValueError):
+            values = None
+        if not isinstance(values, list) or len(values) != len(ordering) \
+                or not all(isinstance(value, (int, float)) for value in values):
+            raise ValidationError({f'{result_type}_cursor': 'Invalid cursor.'})
+
+        # (a, b) after (x, y) is `a after x`, or `a = x and b after y`.
+        after = Q()
+        for i, (field, descending) in enumerate(ordering):
+            same = {previous: value for (previous, _), value in zip(ordering[:i], values[:i])}
+            after |= Q(**same, **{f'{field}__{"lt" if descending else "gt"}': values[i]})
+        return queryset.filter(after)
+
+    def paginate(self, queryset: QuerySet, result_type: str) -> tuple[list, str | None]:
+        """
+        Returns rows of this page and cursor of next page. (`None` if it's last page.)
+        One more row is fetched to know there is next page without `COUNT`.
+        """
+        if not queryset.query.order_by:
+            queryset = queryset.order_by('id')
+        rows = list(self.after(queryset, result_type)[:self.limit + 1])
+        if len(rows) <= self.limit:
+            return rows, None
+
+        rows = rows[:self.limit]
+        last = [getattr(rows[-1], field) for field, _ in self.ordering(queryset)]
+        return rows, urlsafe_b64encode(json.dumps(last).encode()).decode()
@@ -0,0 +1,49 @@
+from django.db.models import QuerySet
+
+from chat_channel.models import ChatChannel
+from custom_user.models import CustomUser
+from workspace.models import Workspace
+
+
+class SearchScope:
+    """
+    Where caller can search. Only channels caller is member of (and workspaces caller joined),
+    Narrowed by `workspace` and `channel` hashed values if given.
+
+    Ids are resolved once per request and put into search query itself,
+    So database looks at rows of these channels only, not whole table.
+    """
+
+    def __init__(self, channel_ids: list[int], workspace_ids: list[int], by_channel: bool = False):
+        self.channel_ids = channel_ids
+        self.workspace_ids = workspace_ids
+        self.by_channel = by_channel
+
+    @classmethod
+    def of(cls, user: CustomUser, workspace_hashed_value: str | None = None,
+           channel_hashed_value: str | None = None) -> 'SearchScope':
+        channels = ChatChannel.objects.filter(members=user)
+        workspaces = Workspace.objects.filter(members=user)
+        if workspace_hashed_value:
+            channels = channels.filter(workspace__hashed_value=workspace_hashed_value)
+            workspaces = workspaces.filter(hashed_value=workspace_hashed_value)
+        if channel_hashed_value:
+            channels = channels.filter(hashed_value=channel_hashed_value)
+
+        return cls(sorted(channels.values_list('id', flat=True)),
+                   sorted(workspaces.values_list('id', flat=True)),
+                   by_channel=bool(channel_hashed_value))
+
+    def chats(self, queryset: QuerySet) -> QuerySet:
+        return queryset.filter(channel_id__in=self.channel_ids)
+
+    def files(self, queryset: QuerySet) -> QuerySet:
+        """
+        File is visible when it's sent to visible channel. (`File.channel`, Which is kept after chat is deleted)
+        """
+        return queryset.filter(channel_id__in=self.channel_ids)
+
+    def users(self, queryset: QuerySet) -> QuerySet:
+        if self.by_channel:
+            return queryset.filter(chat_channel_members__in=self.channel_ids).distinct()
+        return queryset.filter(joined_workspaces__in=self.workspace_ids).distinct()
@@ -20,5 +20,7 @@ class SearchSerializer(serializers.Serializer):
         ),
         read_only=True)
     chat = ChatSerializer(read_only=True)
+    relevance = serializers.FloatField(read_only=True)  # Only for chat.
+    snippet = serializers.CharField(read_only=True)  # Only for chat.
     file = FileSerializer(read_only=True)
     user = CustomUserSerializer(read_only=True)
\ No newline at end of file
@@ -0,0 +1,211 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from chat.models import Chat
+from chat_channel.models import ChatChannel
+from chat_reaction.models import ChatReaction
+from custom_user.models import CustomUser
+from file.models import File
+from search.cache import scope_cache, search_cache
+from search.typeahead import typeahead
+from workspace.models import Workspace
+
+
+# Fields of user which are searched or shown in search results.
+INDEXED_USER_FIELDS = {'username', 'display_name', 'title', 'phone_number', 'profile_image'}
+
+# Set inside `bulk_chat_change`, Chats and reactions are not bumped one by one.
+chat_invalidation_paused: ContextVar[bool] = ContextVar('chat_invalidation_paused', default=False)
+
+
+def load_signal():
+    print('search signals loaded!')
+
+
+class PendingBump:
+    """
+    Workspaces of search cache to bump after commit, One callback per transaction.
+    So rows written together bump each workspace once, With one query resolving their channels and chats.
+    """
+
+    def __init__(self):
+        self.workspace_ids: set[int] = set()
+        self.channel_ids: set[int] = set()
+        self.chat_ids: set[int] = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        workspace_ids = set(self.workspace_ids)
+        if self.channel_ids or self.chat_ids:
+            workspace_ids.update(ChatChannel.objects.filter(
+                Q(id__in=self.channel_ids) | Q(chat__id__in=self.chat_ids)
+            ).values_list('workspace_id', flat=True))
+        search_cache.bump(workspace_ids)
+
+
+def pending_bump() -> PendingBump | None:
+    """
+    Bump registered in current transaction, At same savepoint. (Rolling back a savepoint drops its callbacks.)
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    savepoint_ids = set(connection.savepoint_ids)
+    return next((callback for sids, callback, *_ in reversed(connection.run_on_commit)
+                 if sids == savepoint_ids and isinstance(callback, PendingBump) and not callback.done), None)
+
+
+def bump_after_commit(workspace_ids=(), channel_ids=(), chat_ids=()):
+    pending = pending_bump()
+    is_new = pending is None
+    pending = pending or PendingBump()
+    pending.workspace_ids.update(workspace_ids)
+    pending.channel_ids.update(channel_ids)
+    pending.chat_ids.update(chat_ids)
+    if is_new:  # Runs right away if not in transaction.
+        transaction.on_commit(pending)
+
+
+@contextmanager
+def bulk_chat_change(workspace_ids):
+    """
+    For changing many chats at once. (Archiving...)
+    Saving or deleting chats and reactions inside doesn't bump each time, `workspace_ids` are bumped once at end.
+    """
+    token = chat_invalidation_paused.set(True)
+    try:
+        yield
+    finally:
+        chat_invalidation_paused.reset(token)
+        bump_after_commit(workspace_ids=workspace_ids)
+
+
+@receiver(post_save, sender=Chat)
+@receiver(post_delete, sender=Chat)
+def invalidate_chat(sender, instance: Chat, **kwargs):
+    if chat_invalidation_paused.get():
+        return
+    if Chat.channel.is_cached(instance):  # Sent from consumer, Channel is there already.
+        bump_after_commit(workspace_ids=[instance.channel.workspace_id])
+    else:
+        bump_after_commit(channel_ids=[instance.channel_id])
+
+
+@receiver(post_save, sender=ChatReaction)
+@receiver(post_delete, sender=ChatReaction)
+def invalidate_reaction(sender, instance: ChatReaction, **kwargs):
+    """
+    Chat results have reactions in it.
+    """
+    if chat_invalidation_paused.get():
+        return
+    bump_after_commit(chat_ids=[instance.chat_id])
+
+
+@receiver(m2m_changed, sender=ChatReaction.reactors.through)
+def invalidate_reactors(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        bump_after_commit(chat_ids=ChatReaction.objects.filter(id__in=pk_set or ()).values_list('chat_id', flat=True))
+    else:
+        bump_after_commit(chat_ids=[instance.chat_id])
+
+
+@receiver(post_save, sender=File)
+@receiver(post_delete, sender=File)
+def invalidate_file(sender, instance: File, **kwargs):
+    """
+    File is searched in channel where it's sent. (New one is not sent yet, Saving that chat bumps.)
+    """
+    if instance.channel_id is not None:
+        bump_after_commit(channel_ids=[instance.channel_id])
+
+
+def indexed_values(instance: CustomUser) -> dict:
+    """
+    Indexed fields loaded in instance, As stored in column. (Empty `profile_image` is '', Not `FieldFile`.)
+    Deferred ones are left out, Not to load them.
+    """
+    return {field.name: field.get_prep_value(field.value_from_object(instance))
+            for field in map(CustomUser._meta.get_field, INDEXED_USER_FIELDS)
+            if field.attname in instance.__dict__}
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_indexed_values(sender, instance: CustomUser, **kwargs):
+    instance._indexed_values = indexed_values(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_indexed_fields(sender, instance: CustomUser, update_fields=None, **kwargs):
+    """
+    Whether indexed fields are really changed, Compared with values when it's loaded. (No query)
+    New user, or field not loaded before, Counts as changed.
+    """
+    instance._indexed_fields_changed = False
+    if update_fields is not None and not INDEXED_USER_FIELDS & set(update_fields):
+        return
+    before = getattr(instance, '_indexed_values', None)
+    now = indexed_values(instance)
+    instance._indexed_fields_changed = before is None or any(
+        field not in before or before[field] != value for field, value in now.items()
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user(sender, instance: CustomUser, **kwargs):
+    """
+    Not for saves of other fields only. (`last_login` at every login...)
+    Other processes reload this user into typeahead index after bump, So bump only when it matters.
+    """
+    changed = getattr(instance, '_indexed_fields_changed', True)
+    instance._indexed_values = indexed_values(instance)  # Next save is compared with this one.
+    if not changed:
+        return
+    bump_after_commit(workspace_ids=instance.joined_workspaces.values_list('id', flat=True))
+    transaction.on_commit(lambda: typeahead.update_user(instance))  # Other processes reload it from DB.
+
+
+def members_changed(instance, action: str, reverse: bool, pk_set, member_ids) -> tuple[list, list] | None:
+    """
+    Returns (model instance ids, user ids) whose membership changed. `None` if nothing changed yet.
+    Members to be cleared are remembered at `pre_clear`, Because they are gone at `post_clear`.
+    """
+    if action == 'pre_clear':
+        instance._cleared_member_ids = list(member_ids(instance))
+        return None
+    if action == 'post_clear':
+        changed = instance._cleared_member_ids
+    elif action in ('post_add', 'post_remove'):
+        changed = list(pk_set)
+    else:
+        return None
+
+    # In reverse, instance is user and `changed` are channels or workspaces.
+    return (changed, [instance.id]) if reverse else ([instance.id], changed)
+
+
+@receiver(m2m_changed, sender=Workspace.members.through)
+def invalidate_workspace_members(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    changed = members_changed(instance, action, reverse, pk_set,
+                              lambda i: (i.joined_workspaces if reverse else i.members).values_list('id', flat=True))
+    if changed is not None:
+        workspace_ids, user_ids = changed
+        search_cache.bump(workspace_ids)  # User results are members of workspace.
+        transaction.on_commit(lambda: typeahead.invalidate(workspace_ids, user_ids))
+        scope_cache.bump(user_ids)
+
+
+@receiver(m2m_changed, sender=ChatChannel.members.through)
+def invalidate_channel_members(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    changed = members_changed(instance, action, reverse, pk_set,
+                              lambda i: (i.chat_channel_members if reverse else i.members).values_list('id', flat=True))
+    if changed is not None:
+        scope_cache.bump(changed[1])
@@ -0,0 +1,242 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from chat.models import Chat
+from chat_channel.models import ChatChannel
+from custom_user.models import CustomUser
+from file.models import File
+from file.testing import LocalStorageMixin
+from search.backends import FullTextSearch
+from search.cache import search_cache
+from search.scope import SearchScope
+from search.typeahead import Typeahead
+from workspace.models import Workspace
+
+
+class SnippetTest(SimpleTestCase):
+    def test_around_keyword(self):
+        full_text = FullTextSearch('needle')
+        full_text.snippet_width = 5
+        self.assertEqual(full_text.snippet('hay hay hay NEEDLE hay hay hay'), '… hay NEEDLE hay …')
+        self.assertEqual(full_text.snippet('needle'), 'needle')
+
+    def test_keyword_not_found(self):
+        full_text = FullTextSearch('needle')
+        full_text.snippet_width = 2
+        self.assertEqual(full_text.snippet('haystack'), 'hays')
+
+
+class SearchTestCase(LocalStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = CustomUser.objects.create(username='search_user', display_name='Searcher')
+            self.workspace = Workspace.objects.create(name='search_workspace', hashed_value='searchws')
+            self.workspace.members.add(self.user)
+            self.channel = ChatChannel.objects.create(name='search', workspace=self.workspace, hashed_value='searchch')
+            self.channel.members.add(self.user)
+
+            self.stranger = CustomUser.objects.create(username='stranger', display_name='Searcher too')
+            self.other_workspace = Workspace.objects.create(name='other_workspace', hashed_value='otherws')
+            self.other_workspace.members.add(self.stranger)
+            self.other_channel = ChatChannel.objects.create(name='other', workspace=self.other_workspace,
+                                                            hashed_value='otherch')
+            self.other_channel.members.add(self.stranger)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def chat(self, message: str, channel: ChatChannel | None = None, file: File | None = None) -> Chat:
+        channel = channel or self.channel
+        with self.captureOnCommitCallbacks(execute=True):  # Like committed request.
+            return Chat.objects.create(message=message, chatter=channel.members.first(), channel=channel, file=file)
+
+    def sent_file(self, file_name: str, channel: ChatChannel | None = None) -> File:
+        channel = channel or self.channel
+        file = File.objects.create(uploaded_by=channel.members.first(), workspace=channel.workspace,
+                                   file=ContentFile(b'search', name=file_name), file_name=file_name, size=6)
+        self.chat('file', channel, file)
+        file.refresh_from_db()
+        return file
+
+    def search(self, keyword: str, **params) -> dict:
+        response = self.client.get(f'/search/{keyword}/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    @staticmethod
+    def ids(body: dict, result_type: str) -> list[int]:
+        return [result[result_type]['id'] for result in body['results'] if result['type'] == result_type]
+
+
+class FullTextSearchTest(SearchTestCase):
+    def test_fallback_without_index(self):
+        older = self.chat('Hello world')
+        newer = self.chat('say hello')
+        self.chat('bye')
+
+        full_text = FullTextSearch(' hello ')
+        self.assertFalse(full_text.use_index)  # Not MySQL.
+        chats = list(full_text.search(Chat.objects.all(), 'message'))
+
+        self.assertEqual(chats, [newer, older])  # Newest first.
+        self.assertEqual({chat.relevance for chat in chats}, {0})
+
+
+class SearchScopeTest(SearchTestCase):
+    def test_only_visible_channels(self):
+        mine = self.chat('secret plan')
+        self.chat('secret plan', self.other_channel)
+        my_file = self.sent_file('secret.txt')
+        self.sent_file('secret.txt', self.other_channel)
+
+        body = self.search('secret')
+
+        self.assertEqual(self.ids(body, 'chat'), [mine.id])
+        self.assertEqual(self.ids(body, 'file'), [my_file.id])
+
+    def test_other_workspace_is_not_searched_by_hashed_value(self):
+        self.chat('secret plan', self.other_channel)
+        self.sent_file('secret.txt', self.other_channel)
+
+        body = self.search('secret', workspace='otherws', channel='otherch')
+
+        self.assertEqual(body['results'], [])
+        self.assertEqual(SearchScope.of(self.user, 'otherws').workspace_ids, [])
+
+    def test_users_of_joined_workspaces_only(self):
+        self.assertEqual(self.ids(self.search('Searcher'), 'user'), [self.user.id])
+
+    def test_file_stays_after_chat_is_gone(self):
+        file = self.sent_file('report.txt')
+        Chat.objects.filter(file=file).delete()
+
+        self.assertEqual(self.ids(self.search('report'), 'file'), [file.id])
+
+
+class SearchPaginationTest(SearchTestCase):
+    def test_cursor_continues_each_type(self):
+        chats = [self.chat(f'page {i}') for i in range(5)]
+        found = []
+        cursor = None
+        while True:
+            body = self.search('page', type='chat', limit=2, **({'chat_cursor': cursor} if cursor else {}))
+            found += self.ids(body, 'chat')
+            cursor = body['next']['chat']
+            if cursor is None:
+                break
+
+        self.assertEqual(found, [chat.id for chat in reversed(chats)])
+
+    def test_next_page_is_not_shifted_by_new_rows(self):
+        chats = [self.chat(f'page {i}') for i in range(4)]
+        first = self.search('page', type='chat', limit=2)
+        self.chat('page new')  # Newest, Comes before first page.
+
+        second = self.search('page', type='chat', limit=2, chat_cursor=first['next']['chat'])
+
+        self.assertEqual(self.ids(second, 'chat'), [chats[1].id, chats[0].id])
+
+    def test_invalid_cursor(self):
+        for cursor in ('!!', 'bz0y', 'WzEsIDJd'):  # Not base64, Offset (`o=2`), Values not matching ordering.
+            response = self.client.get('/search/page/', {'chat_cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+class SearchCacheTest(SearchTestCase):
+    def test_cached_until_workspace_changes(self):
+        first = self.chat('cached')
+        self.assertEqual(self.ids(self.search('cached'), 'chat'), [first.id])
+
+        # Row changed without signal, So cached result is still given.
+        Chat.objects.filter(id=first.id).update(message='changed')
+        self.assertEqual(self.ids(self.search('cached'), 'chat'), [first.id])
+
+        second = self.chat('cached again')  # Bumps generation of workspace after commit.
+        self.assertEqual(self.ids(self.search('cached'), 'chat'), [second.id])
+
+    def test_other_workspace_keeps_cache(self):
+        generation = search_cache.generations([self.workspace.id])
+        self.chat('elsewhere', self.other_channel)
+        self.assertEqual(search_cache.generations([self.workspace.id]), generation)
+
+    def test_last_login_does_not_bump(self):
+        generation = search_cache.generations([self.workspace.id])
+        user = CustomUser.objects.get(id=self.user.id)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            user.save(update_fields=['last_login'])
+            user.save()  # Nothing changed.
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT')])  # Not loaded again.
+        self.assertEqual(search_cache.generations([self.workspace.id]), generation)
+
+        self.user.display_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertNotEqual(search_cache.generations([self.workspace.id]), generation)
+
+    def test_bumped_once_per_transaction(self):
+        generation = search_cache.generations([self.workspace.id])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for i in range(3):
+                Chat.objects.create(message=f'together {i}', chatter=self.user, channel=self.channel)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(search_cache.generations([self.workspace.id]), generation)
+
+
+class TypeaheadTest(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kim = CustomUser.objects.create(username='jkim', display_name='John Kim', phone_number='010-1234-5678')
+        self.kimberly = CustomUser.objects.create(username='kimberly', display_name='Kimberly')
+        self.workspace.members.add(self.kim, self.kimberly)
+        self.typeahead = Typeahead()
+
+    def names(self, prefix: str, limit: int = 10) -> list[str]:
+        index = self.typeahead.get_index('searchws')
+        return [user['username'] for user in self.typeahead.search(index, prefix, limit)]
+
+    def test_prefix_of_name_or_word(self):
+        self.assertEqual(self.names('kim'), ['jkim', 'kimberly'])  # "kim" comes before "kimberly".
+        self.assertEqual(self.names('KIMB'), ['kimberly'])
+        self.assertEqual(self.names('john k'), ['jkim'])
+        self.assertEqual(self.names('0101234'), ['jkim'])
+        self.assertEqual(self.names(''), [])
+
+    def test_limit(self):
+        self.assertEqual(self.names('kim', limit=1), ['jkim'])
+
+    def test_not_member_and_unknown_workspace(self):
+        self.assertIsNone(self.typeahead.get_index('nowhere'))
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.client.get('/search/typeahead/searchws/', {'q': 'kim'}).status_code, 404)
+
+    def test_member_leaves(self):
+        self.assertEqual(self.names('kim'), ['jkim', 'kimberly'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.workspace.members.remove(self.kimberly)
+        self.assertEqual(self.names('kim'), ['jkim'])
+
+    def test_changed_users_are_reloaded_only(self):
+        self.assertEqual(self.names('kim'), ['jkim', 'kimberly'])
+        self.kimberly.display_name = 'Berry'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kimberly.save()  # Changed in other process.
+
+        with mock.patch.object(self.typeahead, 'build') as build:
+            self.assertEqual(self.names('berry'), ['kimberly'])
+        build.assert_not_called()
+
+    def test_profile_thumbnails_are_not_stale(self):
+        self.assertEqual(self.names('kim'), ['jkim', 'kimberly'])
+        CustomUser.objects.filter(id=self.kim.id).update(profile_thumbnails={'64': 'thumbnail/kim_64.webp'})
+
+        found = self.typeahead.search(self.typeahead.get_index('searchws'), 'jkim', 10)
+
+        self.assertTrue(found[0]['profile_thumbnails']['64'].endswith('thumbnail/kim_64.webp'))
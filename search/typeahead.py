@@ -0,0 +1,160 @@
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+from custom_user.models import CustomUser
+from custom_user.serializers import CustomUserSerializer
+from search.cache import GenerationCache
+from workspace.models import Workspace
+
+typeahead_cache = GenerationCache('typeahead')  # Only generations are used, To know index of workspace is stale.
+
+
+def normalize(text: str | None) -> str:
+    return ' '.join((text or '').split()).lower()
+
+
+def terms_of(user: CustomUser) -> set[str]:
+    """
+    Whole names and each word of them, So "kim" finds "John Kim". Phone number is digits only.
+    """
+    terms = set()
+    for name in (user.display_name, user.username, user.title):
+        if name := normalize(name):
+            terms.add(name)
+            terms.update(name.split())
+    if phone_number := ''.join(c for c in (user.phone_number or '') if c.isdigit()):
+        terms.add(phone_number)
+    return terms
+
+
+class PrefixIndex:
+    """
+    Sorted (term, user id) list of one workspace. Prefix search is binary search and short scan.
+    Only ids are kept, Users are serialized when searched. So profile changes not indexed (thumbnails...) are never stale.
+    """
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.entries: list[tuple[str, int]] = []
+        self.terms: dict[int, set[str]] = {}  # user id: terms in entries, Also members of workspace.
+
+    def add(self, user: CustomUser):
+        self.remove(user.id)
+        self.terms[user.id] = terms_of(user)
+        for term in self.terms[user.id]:
+            insort(self.entries, (term, user.id))
+
+    def remove(self, user_id: int):
+        for term in self.terms.pop(user_id, ()):
+            del self.entries[bisect_left(self.entries, (term, user_id))]
+
+    def search(self, prefix: str, limit: int) -> list[int]:
+        found: dict[int, None] = {}  # Ordered set.
+        i = bisect_left(self.entries, (prefix,))
+        while i < len(self.entries) and len(found) < limit:
+            term, user_id = self.entries[i]
+            if not term.startswith(prefix):
+                break
+            found[user_id] = None
+            i += 1
+        return list(found)
+
+
+class Typeahead:
+    """
+    In memory prefix index of members per workspace, For mention autocomplete.
+
+    Index is built from DB at first search of workspace in this process.
+    Each bump of workspace generation records users who changed, Other processes reload only them.
+    (Rebuilt whole if those records are expired, or too many changes are behind.)
+    """
+    max_limit: int = getattr(settings, 'TYPEAHEAD_MAX_LIMIT', 20)
+    max_replay: int = getattr(settings, 'TYPEAHEAD_MAX_REPLAY', 100)  # Generations behind to reload incrementally.
+
+    def __init__(self):
+        self.indexes: dict[int, PrefixIndex] = {}  # workspace id: index
+        self.workspace_ids: dict[str, int] = {}  # workspace hashed value: workspace id
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _changed_key(workspace_id: int, generation: int) -> str:
+        return f'typeahead:changed:{workspace_id}:{generation}'
+
+    def get_index(self, workspace_hashed_value: str) -> PrefixIndex | None:
+        """
+        `None` if there is no such workspace.
+        """
+        if (workspace_id := self.workspace_ids.get(workspace_hashed_value, None)) is None:
+            workspace_id = Workspace.objects.filter(hashed_value=workspace_hashed_value) \
+                .values_list('id', flat=True).first()
+            if workspace_id is None:
+                return None
+            self.workspace_ids[workspace_hashed_value] = workspace_id
+
+        generation = typeahead_cache.generations([workspace_id])[0]
+        index = self.indexes.get(workspace_id, None)
+        if index is None or not 0 <= generation - index.generation <= self.max_replay:
+            index = self.build(workspace_id, generation)
+        elif index.generation != generation:
+            index = self.catch_up(workspace_id, index, generation)
+        return index
+
+    def build(self, workspace_id: int, generation: int) -> PrefixIndex:
+        index = PrefixIndex(generation)
+        for user in CustomUser.objects.filter(joined_workspaces=workspace_id):
+            index.add(user)
+        self.indexes[workspace_id] = index  # Swap at once, So searching threads never see half-built one.
+        return index
+
+    def catch_up(self, workspace_id: int, index: PrefixIndex, generation: int) -> PrefixIndex:
+        """
+        Reload users changed after generation of index. Rebuilt whole if a record is gone.
+        """
+        keys = [self._changed_key(workspace_id, g) for g in range(index.generation + 1, generation + 1)]
+        changed = cache.get_many(keys)
+        if len(changed) != len(keys):
+            return self.build(workspace_id, generation)
+
+        user_ids = set().union(*changed.values())
+        users = list(CustomUser.objects.filter(id__in=user_ids, joined_workspaces=workspace_id))  # Left ones are not.
+        with self._lock:
+            for user_id in user_ids:
+                index.remove(user_id)
+            for user in users:
+                index.add(user)
+            index.generation = max(index.generation, generation)
+        return index
+
+    def search(self, index: PrefixIndex, prefix: str, limit: int) -> list[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        user_ids = index.search(prefix, min(max(limit, 1), self.max_limit))
+        users = CustomUser.objects.in_bulk(user_ids)
+        return [CustomUserSerializer(users[user_id]).data for user_id in user_ids if user_id in users]
+
+    def changed(self, workspace_ids, user_ids):
+        """
+        Bumps generation of workspaces, Recording which users to reload.
+        """
+        generations = typeahead_cache.bump(workspace_ids)
+        cache.set_many({self._changed_key(workspace_id, generation): list(user_ids)
+                        for workspace_id, generation in generations.items()}, timeout=typeahead_cache.timeout)
+        return generations
+
+    def update_user(self, user: CustomUser):
+        generations = self.changed(user.joined_workspaces.values_list('id', flat=True), [user.id])
+        with self._lock:
+            for workspace_id, generation in generations.items():
+                if (index := self.indexes.get(workspace_id, None)) is not None and index.generation == generation - 1:
+                    index.add(user)  # Up to date with this change, Others are caught up at next search.
+                    index.generation = generation
+
+    def invalidate(self, workspace_ids, user_ids):
+        self.changed(workspace_ids, user_ids)
+
+
+typeahead = Typeahead()
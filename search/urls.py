@@ -1,7 +1,8 @@
 from django.urls import path
 
-from search.views import SearchView
+from search.views import SearchView, TypeaheadView
 
 urlpatterns = [
+    path('typeahead/<str:workspace_hashed_value>/', TypeaheadView.as_view()),
     path('<str:search_keyword>/', SearchView.as_view()),
 ]
\ No newline at end of file
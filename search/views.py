@@ -1,7 +1,5 @@
-from itertools import chain
-
 from django.db.models import Q, QuerySet, Prefetch
-from rest_framework import generics
+from rest_framework import generics, status
 from rest_framework.request import Request
 from rest_framework.response import Response
 
@@ -12,7 +10,13 @@ from custom_user.models import CustomUser
 from custom_user.serializers import CustomUserSerializer
 from file.models import File
 from file.serializers import FileSerializer
+from search.backends import FullTextSearch
+from search.filters import file_filters
+from search.pagination import SearchPagination
+from search.cache import get_scope, search_cache, search_cache_key
+from search.scope import SearchScope
 from search.serializers import SearchSerializer
+from search.typeahead import typeahead
 
 
 class SearchView(generics.ListAPIView):
@@ -20,51 +24,129 @@ class SearchView(generics.ListAPIView):
     검색 범위는 3가지로 제한 됨. (추가적으로 필요하면 건의할 것.)
     (링크: https://github.com/Team-Discipline/Xlack-Backend/issues/96)
     1. 채팅 내역
-    2. 파일 (이름)
+    2. 파일 (이름, 텍스트 파일의 내용)
     3. (워크 스페이스 내) 가입자
         3.1. display name
         3.2. title
         3.3. phone number
 
-    response에 chat이 들어갈 수도, 정보가 들어갈 수도, 가입자 정보가 들어갈 수도 있지만,
-    response로 배열을 주고 그 안에 하나의 값만 들어감.
+    호출한 사람이 속한 채널(과 워크스페이스) 안에서만 검색 됨.
+    query parameter `workspace`, `channel`(hashed value)로 범위를 더 좁힐 수 있음.
+
+    채팅은 full-text index로 검색하고 관련도 순으로 정렬 됨. (`relevance`, `snippet` 같이 줌.)
+
+    response의 results에 chat이 들어갈 수도, 정보가 들어갈 수도, 가입자 정보가 들어갈 수도 있지만,
+    배열의 각 element에는 하나의 값만 들어감.
 
-    예) 채팅 1개 파일 2개가 검색 결과로 나온다면 크기가 3인 배열이 return되고,
+    예) 채팅 1개 파일 2개가 검색 결과로 나온다면 크기가 3인 배열이 results로 오고,
     chat정보 하나 file정보 2개가 각각의 element로 들어가있는 배열을 보내준다.
+
+    종류(chat, file, user)마다 최대 `limit`개(기본 20, 최대 100)까지만 옴.
+    더 보려면 next에 있는 cursor를 `chat_cursor`, `file_cursor`, `user_cursor`로 넣을 것. (null이면 끝.)
+    `type`을 넣으면 그 종류만 검색 함.
+
+    파일은 `file_type`(MIME type, 또는 `image`처럼 앞부분), `min_size`, `max_size`(byte),
+    `since`, `until`(업로드 날짜), `uploader`(user id)로 거를 수 있음.
     """
 
     serializer_class = SearchSerializer
 
-    def get_queryset(self) -> QuerySet | None:
+    types = ('chat', 'file', 'user')
+
+    page_params = ('type', 'limit', 'chat_cursor', 'file_cursor', 'user_cursor',
+                   'file_type', 'min_size', 'max_size', 'since', 'until', 'uploader')
+
+    def get_scope(self) -> SearchScope:
+        if not hasattr(self, '_scope'):
+            self._scope = get_scope(self.request.user,
+                                    workspace_hashed_value=self.request.query_params.get('workspace', None),
+                                    channel_hashed_value=self.request.query_params.get('channel', None))
+        return self._scope
+
+    def get_queryset(self) -> dict[str, QuerySet] | None:
+        """
+        Queryset of each result type. (Only `type` in query parameter if it's given.)
+        """
         kw = self.kwargs.get('search_keyword', '')
-        if kw:
-            chat = Chat.objects.select_related('file', 'chatter', 'channel') \
-                .filter(message__icontains=kw) \
-                .prefetch_related(Prefetch('reaction',
-                                           queryset=ChatReaction.objects.select_related('chat').all() \
-                                           .prefetch_related('reactors')))
-            file = File.objects.select_related('uploaded_by').filter(file_name__icontains=kw)
-            user = CustomUser.objects.filter(
-                Q(display_name__icontains=kw) | Q(title__icontains=kw) | Q(phone_number__icontains=kw)
+        if not kw:
+            return None
+
+        result_type = self.request.query_params.get('type', None)
+        types = [result_type] if result_type in self.types else self.types
+        scope = self.get_scope()
+
+        querysets = {}
+        if 'chat' in types:
+            querysets['chat'] = FullTextSearch(kw).search(
+                scope.chats(Chat.objects.select_related('file', 'chatter', 'channel')), 'message'
+            ).prefetch_related(Prefetch('reaction',
+                                        queryset=ChatReaction.objects.select_related('chat').all()
+                                        .prefetch_related('reactors')))
+        if 'file' in types:
+            querysets['file'] = FullTextSearch(kw).search(
+                scope.files(File.objects.select_related('uploaded_by').filter(file_filters(self.request.query_params))),
+                'file_name', 'extracted_text'
             )
-            res = chain(chat, file, user)
-            return list(res)
+        if 'user' in types:
+            querysets['user'] = scope.users(CustomUser.objects).filter(
+                Q(display_name__icontains=kw) | Q(title__icontains=kw) | Q(phone_number__icontains=kw)
+            ).order_by('id')
+        return querysets
 
     def list(self, request: Request, *args, **kwargs):
-        q = self.get_queryset()
+        # Same search in same scope is served from cache until something in those workspaces is written.
+        key = None
+        if kw := self.kwargs.get('search_keyword', ''):
+            key = search_cache_key(self.get_scope(), kw,
+                                   {param: request.query_params.get(param, None) for param in self.page_params})
+            if (cached := search_cache.get(key)) is not None:
+                return Response(cached)
+
+        querysets = self.get_queryset() or {}
+        pagination = SearchPagination(request)
+        full_text = FullTextSearch(self.kwargs.get('search_keyword', ''))
         data = []
+        next_cursors = {result_type: None for result_type in self.types}
+
+        # Serialize rows of each type at once, So prefetched relations are shared.
+        if 'chat' in querysets:
+            chats, next_cursors['chat'] = pagination.paginate(querysets['chat'], 'chat')
+            for chat, serialized in zip(chats, ChatSerializer(chats, many=True).data):
+                data.append({
+                    'type': 'chat',
+                    'chat': serialized,
+                    'relevance': chat.relevance,
+                    'snippet': full_text.snippet(chat.message),
+                })
+        if 'file' in querysets:
+            files, next_cursors['file'] = pagination.paginate(querysets['file'], 'file')
+            data += [{'type': 'file', 'file': serialized} for serialized in FileSerializer(files, many=True).data]
+        if 'user' in querysets:
+            users, next_cursors['user'] = pagination.paginate(querysets['user'], 'user')
+            data += [{'type': 'user', 'user': serialized}
+                     for serialized in CustomUserSerializer(users, many=True).data]
+
+        body = {'results': data, 'next': next_cursors}
+        if key is not None:
+            search_cache.set(key, body)
+        return Response(body)
+
+
+class TypeaheadView(generics.ListAPIView):
+    """
+    멘션 자동완성용 가입자 검색. (워크 스페이스 내)
+    display name, username, title (또는 그 안의 단어), phone number가 `q`로 시작하는 가입자를 줌.
+    `limit` 기본 10, 최대 20.
+    """
+    serializer_class = CustomUserSerializer
+
+    def get(self, request: Request, *args, **kwargs):
+        index = typeahead.get_index(kwargs.get('workspace_hashed_value'))
+        if index is None or request.user.id not in index.terms:
+            return Response({'msg': 'No such workspace. Not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        for i, query in enumerate(q):
-            temp = {}
-            if isinstance(query, Chat):
-                temp['type'] = 'chat'
-                temp['chat'] = ChatSerializer(query).data
-            elif isinstance(query, File):
-                temp['type'] = 'file'
-                temp['file'] = FileSerializer(query).data
-            elif isinstance(query, CustomUser):
-                temp['type'] = 'user'
-                temp['user'] = CustomUserSerializer(query).data
-            data.append(temp)
-
-        return Response(data)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        return Response(typeahead.search(index, request.query_params.get('q', ''), limit))
@@ -1,15 +1,15 @@
-from datetime import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from asgiref.sync import async_to_sync
-from django.db.models import Q
-
-from status.models import UserStatus
+from status.online import online
+from status.presence import presence
 from websocket.AuthWebsocketConsumer import AuthWebsocketConsumer
 from workspace.models import Workspace
 
 
 class StatusConsumer(AuthWebsocketConsumer):
     workspace: Workspace | None = None
+    joined: bool = False  # Counted in subscribers of `presence`.
 
     async def before_accept(self):
         kwargs = self.scope["url_route"]["kwargs"]
@@ -18,7 +18,7 @@ class StatusConsumer(AuthWebsocketConsumer):
     async def after_accept(self):
         # Check workspace `hashed_value` is valid.
         try:
-            self.workspace = await Workspace.objects.prefetch_related('members').aget(
+            self.workspace = await Workspace.objects.aget(
                 hashed_value=self.room_group_name
             )
         except Workspace.DoesNotExist:
@@ -28,18 +28,30 @@ class StatusConsumer(AuthWebsocketConsumer):
             }, close=True)
 
     async def after_auth(self):
-        if self.user not in self.workspace.members.all():
+        if not await self.workspace.members.filter(id=self.user.id).aexists():
             await self.send_json({
                 'success': False,
                 'msg': f'{self.user} is not in workspace.'
             }, close=True)
         else:
             await super().after_auth()
+            presence.ensure_started()
+            await presence.join(self.workspace)
+            self.joined = True
+            # Give current statuses once, After this only changed one comes.
+            await self.send_json(await presence.snapshot(self.workspace))
+            # Connection of this user is registered already, But it's published after debounce.
+            online_users = set(online.online_users(self.room_group_name)) | {self.user.id}
+            await self.send_json({'online': sorted(online_users), 'offline': []})
+
+    async def leave(self):
+        if self.joined:
+            self.joined = False
+            presence.leave(self.workspace.id)
 
     message_field = ['status_message', 'status_icon', 'until']
 
     async def from_client(self, content, **kwargs):
-        data = {'type': 'status.broadcast'}
         not_filled = []
         for field in self.message_field:
             if content.get(field, None) is None:
@@ -47,51 +59,33 @@ class StatusConsumer(AuthWebsocketConsumer):
 
         if len(not_filled):
             await self.send_json(content={'msg': f'Not filled this fields: {not_filled}'})
-        else:
-            try:
-                status = UserStatus.objects.get(user=self.user)
-                status.message = content.get('status_message')
-                status.icon = content.get('status_icon')
-                status.until = content.get('until')
-                status.save()
-                del status
-            except UserStatus.DoesNotExist:
-                workspace = Workspace.objects.get(hashed_value__exact=self.room_group_name)
-                UserStatus.objects.create(
-                    message=content.get('status_message'),
-                    icon=content.get('status_icon'),
-                    until=content.get('until'),
-                    workspace=workspace,
-                    user=self.user
-                )
-                del workspace
-
-            # Refine data.
-            print(f'{datetime.utcnow()=}')
-            user_status = UserStatus.objects.prefetch_related('workspace') \
-                .filter(Q(workspace__hashed_value__exact=self.room_group_name) &
-                        Q(until__gt=datetime.utcnow()))
+            return
 
-            result = []
-            for status in user_status:
-                status: UserStatus
-                d = {}
-                d['message'] = status.message
-                d['icon'] = status.icon
-                d['until'] = status.until.strftime('%Y-%m-%d %H:%M%z')
-                d['user_id'] = status.user_id
-                d['workspace_id'] = status.workspace_id
-                result.append(d)
-            data['users_status'] = result
+        until = parse_datetime(str(content.get('until')))
+        if until is None:
+            await self.send_json(content={'msg': f'Wrong datetime format of until: {content.get("until")}'})
+            return
+        if timezone.is_naive(until):
+            until = timezone.make_aware(until)
 
-            # Broadcast refined data.
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                data
-            )
+        # Presence service broadcasts only this user's status and persists it in background.
+        presence.ensure_started()
+        await presence.update(self.workspace,
+                              self.user.id,
+                              message=content.get('status_message'),
+                              icon=content.get('status_icon'),
+                              until=until)
 
     async def status_broadcast(self, event):
         """
         This function speaks message to every body in this group.
+        `users_status` has only changed statuses. (Expired one has `expired: true`.)
         """
+        presence.apply(event)
         await self.send_json(event['users_status'])
+
+    async def presence_broadcast(self, event):
+        """
+        Users who became online or offline in this workspace. (Debounced, So it's a diff of few seconds.)
+        """
+        await self.send_json({'online': event['online'], 'offline': event['offline']})
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from status.models import UserStatus
+
+
+class Command(BaseCommand):
+    help = 'Delete expired user statuses in batches. With `--loop`, keep sweeping every `--interval` seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = self.sweep(options['batch_size'])
+            self.stdout.write(f'{timezone.now().isoformat()} deleted {deleted} expired statuses.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def sweep(batch_size: int) -> int:
+        """
+        Small batches keep each delete short, So it doesn't lock status table for long.
+        """
+        now = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(UserStatus.objects.filter(until__lte=now).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += UserStatus.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2023-02-20 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status', '0002_userstatus_workspace'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userstatus',
+            index=models.Index(fields=['workspace', 'until'], name='status_workspace_until_idx'),
+        ),
+    ]
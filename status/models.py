@@ -25,6 +25,10 @@ class UserStatus(models.Model):
     class Meta:
         verbose_name = 'User Status'
         verbose_name_plural = 'User Status'
+        indexes = [
+            # Active statuses of workspace. (`workspace=..., until__gt=now`)
+            models.Index(fields=['workspace', 'until'], name='status_workspace_until_idx'),
+        ]
 
     def __str__(self):
         return f'{self.message} by {self.user}'
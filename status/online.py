@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from workspace.models import Workspace
+
+
+class OnlineTracker:
+    """
+    Who is connected now, Counted from websocket connections of `AuthWebsocketConsumer`.
+
+    One user can have many connections (tabs, devices...), So user is online while any of them is alive.
+    Changes are not sent right away. They are collected per workspace for `debounce` seconds,
+    and only users whose final state differs from last published one are broadcast as one diff.
+    So a user flapping on bad network makes one update (or nothing) instead of dozens.
+
+    Connection which sent `{"heartbeat": true}` once should keep sending it.
+    If it goes silent over `heartbeat_timeout`, It's closed and counted as gone.
+    (Clients never sending heartbeat rely on websocket ping of daphne.)
+
+    State is per process, like `PresenceService`.
+    """
+
+    def __init__(self):
+        self.debounce: float = getattr(settings, 'PRESENCE_DEBOUNCE', 2.0)  # seconds
+        self.heartbeat_timeout: float = getattr(settings, 'PRESENCE_HEARTBEAT_TIMEOUT', 90.0)  # seconds
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reset()
+
+    def _reset(self):
+        self.connections: dict[int, set[str]] = {}  # user id: channel names
+        self.consumers: dict[str, object] = {}  # channel name: consumer
+        self.heartbeats: dict[str, float] = {}  # channel name: last heartbeat (only for heartbeat clients)
+        self.user_workspaces: dict[int, list[str]] = {}  # user id: workspace hashed values
+        self.online: dict[str, set[int]] = {}  # workspace hashed value: published online users
+        self.pending: dict[str, set[int]] = {}  # workspace hashed value: users changed since last publish
+        self._flushing: set[str] = set()
+
+    def ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+
+        self._reset()
+        self._loop = loop
+        loop.create_task(self._sweep(loop))
+
+    async def connected(self, consumer):
+        self.ensure_started()
+        user_id = consumer.user.id
+
+        if user_id not in self.user_workspaces:
+            workspaces = [
+                hashed_value async for hashed_value in
+                Workspace.objects.filter(members=user_id).values_list('hashed_value', flat=True)
+            ]
+            # Set together after query, Other connection of same user could have come meanwhile.
+            self.user_workspaces.setdefault(user_id, workspaces)
+        self.connections.setdefault(user_id, set()).add(consumer.channel_name)
+        self.consumers[consumer.channel_name] = consumer
+        self._changed(user_id)
+
+    def disconnected(self, consumer):
+        if consumer.user is None or consumer.channel_name not in self.consumers:
+            return  # Not authorized or already removed by sweeper.
+
+        user_id = consumer.user.id
+        del self.consumers[consumer.channel_name]
+        self.heartbeats.pop(consumer.channel_name, None)
+        self.connections[user_id].discard(consumer.channel_name)
+        self._changed(user_id)
+
+    def heartbeat(self, consumer):
+        if consumer.channel_name in self.consumers:
+            self.heartbeats[consumer.channel_name] = time.monotonic()
+
+    def seen(self, consumer):
+        """
+        Any message from heartbeat client is as good as heartbeat.
+        """
+        if consumer.channel_name in self.heartbeats:
+            self.heartbeats[consumer.channel_name] = time.monotonic()
+
+    def online_users(self, workspace_hashed_value: str) -> list[int]:
+        return list(self.online.get(workspace_hashed_value, set()))
+
+    def _changed(self, user_id: int):
+        for hashed_value in self.user_workspaces[user_id]:
+            self.pending.setdefault(hashed_value, set()).add(user_id)
+            if hashed_value not in self._flushing:
+                self._flushing.add(hashed_value)
+                self._loop.call_later(self.debounce, self._schedule_publish, hashed_value)
+
+        if not self.connections[user_id]:
+            # Keep workspaces until published, And drop it after that.
+            self._loop.call_later(self.debounce * 2, self._forget, user_id)
+
+    def _forget(self, user_id: int):
+        if not self.connections.get(user_id, True):
+            del self.connections[user_id]
+            del self.user_workspaces[user_id]
+
+    def _schedule_publish(self, workspace_hashed_value: str):
+        self._loop.create_task(self._publish(workspace_hashed_value))
+
+    async def _publish(self, workspace_hashed_value: str):
+        self._flushing.discard(workspace_hashed_value)
+        changed = self.pending.pop(workspace_hashed_value, set())
+        published = self.online.setdefault(workspace_hashed_value, set())
+
+        online, offline = [], []
+        for user_id in changed:
+            is_online = bool(self.connections.get(user_id, None))
+            if is_online and user_id not in published:
+                published.add(user_id)
+                online.append(user_id)
+            elif not is_online and user_id in published:
+                published.discard(user_id)
+                offline.append(user_id)
+
+        if not published:
+            del self.online[workspace_hashed_value]
+        if online or offline:
+            await get_channel_layer().group_send(workspace_hashed_value, {
+                'type': 'presence.broadcast',
+                'workspace_hashed_value': workspace_hashed_value,
+                'online': online,
+                'offline': offline,
+            })
+
+    async def _sweep(self, loop: asyncio.AbstractEventLoop):
+        while self._loop is loop:
+            await asyncio.sleep(self.heartbeat_timeout / 3)
+
+            deadline = time.monotonic() - self.heartbeat_timeout
+            for channel_name, last in list(self.heartbeats.items()):
+                if last < deadline:
+                    consumer = self.consumers[channel_name]
+                    self.disconnected(consumer)
+                    await consumer.close()
+
+
+online = OnlineTracker()
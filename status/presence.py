@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import math
+from datetime import datetime, timezone as dt_timezone
+from uuid import uuid4
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+
+from status.models import UserStatus
+from workspace.models import Workspace
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel.
+    Adding and cancelling are O(1), And each tick only looks at one slot.
+    Timers longer than one lap wait `rounds` more laps in their slot.
+    """
+
+    def __init__(self, slots: int = 3600):
+        self.slots: list[dict] = [{} for _ in range(slots)]  # In each slot, key: rounds left
+        self.where: dict = {}  # key: slot index
+        self.current = 0
+
+    def add(self, key, ticks: int):
+        self.cancel(key)
+        ticks = max(ticks, 1)
+        index = (self.current + ticks) % len(self.slots)
+        self.slots[index][key] = (ticks - 1) // len(self.slots)
+        self.where[key] = index
+
+    def cancel(self, key):
+        index = self.where.pop(key, None)
+        if index is not None:
+            del self.slots[index][key]
+
+    def advance(self) -> list:
+        """
+        Move one tick and return expired keys.
+        """
+        self.current = (self.current + 1) % len(self.slots)
+        slot = self.slots[self.current]
+        expired = []
+        for key, rounds in list(slot.items()):
+            if rounds:
+                slot[key] = rounds - 1
+            else:
+                del slot[key]
+                del self.where[key]
+                expired.append(key)
+        return expired
+
+
+class PresenceService:
+    """
+    Active user statuses of each workspace in memory.
+
+    Workspace statuses are loaded from `UserStatus` once per process, After that,
+    update is O(1) and only changed user is broadcast to workspace group.
+    Statuses expire by `until` with `TimerWheel`, and are persisted to `UserStatus` in background.
+
+    Broadcasts from other processes are applied by `apply`, So every process which has
+    subscribers of workspace keeps same state.
+    State of workspace is kept only while this process has subscribers of it. (`join` ~ `leave`)
+    Without them, Broadcasts are not received here, So it's dropped and loaded again at next `join`.
+    """
+
+    def __init__(self):
+        self.tick: float = getattr(settings, 'PRESENCE_TICK', 1.0)  # seconds
+        self.flush_interval: float = getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 1.0)  # seconds
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reset()
+
+    def _reset(self):
+        self.origin = uuid4().hex  # To know broadcast of this process.
+        self.workspaces: dict[int, dict[int, dict]] = {}  # workspace id: {user id: status}
+        self.hashed_values: dict[int, str] = {}  # workspace id: workspace hashed value
+        self.user_workspace: dict[int, int] = {}  # user id: workspace id (User has only one status.)
+        self.wheel = TimerWheel()
+        self.dirty: dict[int, dict] = {}  # user id: fields to persist
+        self.subscribers: dict[int, int] = {}  # workspace id: number of local subscribers
+
+        self._loading: dict[int, asyncio.Lock] = {}
+
+    def ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+
+        # New event loop (server restart in same process, tests...). State of old loop can't be trusted.
+        self._reset()
+        self._loop = loop
+        loop.create_task(self._run(loop))
+
+    async def join(self, workspace: Workspace):
+        """
+        Subscriber of workspace came to this process. Call `leave` when it's gone.
+        """
+        self.subscribers[workspace.id] = self.subscribers.get(workspace.id, 0) + 1
+        await self._load(workspace)
+
+    def leave(self, workspace_id: int):
+        if (count := self.subscribers.get(workspace_id, 0) - 1) > 0:
+            self.subscribers[workspace_id] = count
+            return
+
+        self.subscribers.pop(workspace_id, None)
+        for user_id in self.workspaces.pop(workspace_id, {}):
+            self.user_workspace.pop(user_id, None)
+            self.wheel.cancel(user_id)
+        self.hashed_values.pop(workspace_id, None)
+
+    async def snapshot(self, workspace: Workspace) -> list[dict]:
+        await self._load(workspace)
+        return list(self.workspaces[workspace.id].values())
+
+    async def update(self, workspace: Workspace, user_id: int, message: str, icon: str, until: datetime) -> dict:
+        """
+        Set status of user and broadcast it. Returns broadcast status.
+        """
+        await self._load(workspace)
+
+        # User has only one status. If it was in other workspace, It's gone from there.
+        if (previous := self.user_workspace.get(user_id, None)) not in (None, workspace.id):
+            await self._broadcast(self.hashed_values[previous], [self._expired(user_id, previous)])
+
+        status = self._to_status(workspace.id, user_id, message, str(icon.encode('unicode_escape')), until)
+        self._set(status, until)
+        self.dirty[user_id] = {'workspace_id': workspace.id, 'message': message, 'icon': icon, 'until': until}
+
+        await self._broadcast(workspace.hashed_value, [status])
+        return status
+
+    def apply(self, event):
+        """
+        Apply broadcast of other process to local state.
+        """
+        if event.get('origin', None) == self.origin:
+            return
+
+        for status in event['users_status']:
+            if status['workspace_id'] not in self.workspaces:
+                continue  # Not loaded here. It'll be loaded from DB when needed.
+            if status.get('expired', False):
+                self._remove(status['user_id'])
+            else:
+                self._set(status, datetime.fromtimestamp(status['until_timestamp'], dt_timezone.utc))
+
+    async def flush(self):
+        """
+        Persist changed statuses to `UserStatus`.
+        """
+        dirty, self.dirty = self.dirty, {}
+        for user_id, fields in dirty.items():
+            try:
+                try:
+                    status = await UserStatus.objects.aget(user_id=user_id)
+                except UserStatus.DoesNotExist:
+                    status = UserStatus(user_id=user_id)
+                for key, value in fields.items():
+                    setattr(status, key, value)
+                await status.asave()  # `save` encodes icon.
+            except Exception as e:
+                # Retry at next flush, unless newer one is already waiting.
+                logger.warning('Failed to persist status of user %s: %s', user_id, e)
+                self.dirty.setdefault(user_id, fields)
+
+    async def _load(self, workspace: Workspace):
+        if workspace.id in self.workspaces:
+            return
+
+        lock = self._loading.setdefault(workspace.id, asyncio.Lock())
+        async with lock:
+            if workspace.id in self.workspaces:
+                return
+            if self.dirty:  # Could be of this workspace, Which was dropped before persisted.
+                await self.flush()
+
+            statuses = []
+            async for status in UserStatus.objects.filter(workspace=workspace, until__gt=timezone.now()):
+                status: UserStatus
+                statuses.append((self._to_status(workspace.id, status.user_id, status.message, status.icon,
+                                                 status.until), status.until))
+
+            self.workspaces[workspace.id] = {}
+            self.hashed_values[workspace.id] = workspace.hashed_value
+            for status, until in statuses:
+                self._set(status, until)
+
+    @staticmethod
+    def _to_status(workspace_id: int, user_id: int, message: str, icon: str, until: datetime) -> dict:
+        return {
+            'message': message,
+            'icon': icon,
+            'until': until.strftime('%Y-%m-%d %H:%M%z'),
+            'until_timestamp': until.timestamp(),
+            'user_id': user_id,
+            'workspace_id': workspace_id,
+        }
+
+    @staticmethod
+    def _expired(user_id: int, workspace_id: int) -> dict:
+        return {'user_id': user_id, 'workspace_id': workspace_id, 'expired': True}
+
+    def _set(self, status: dict, until: datetime):
+        user_id = status['user_id']
+        self._remove(user_id)
+
+        seconds = (until - timezone.now()).total_seconds()
+        if seconds <= 0 or status['workspace_id'] not in self.workspaces:
+            return
+
+        self.workspaces[status['workspace_id']][user_id] = status
+        self.user_workspace[user_id] = status['workspace_id']
+        self.wheel.add(user_id, math.ceil(seconds / self.tick))
+
+    def _remove(self, user_id: int) -> int | None:
+        workspace_id = self.user_workspace.pop(user_id, None)
+        if workspace_id is not None:
+            self.workspaces[workspace_id].pop(user_id, None)
+        self.wheel.cancel(user_id)
+        return workspace_id
+
+    async def _broadcast(self, workspace_hashed_value: str, users_status: list[dict]):
+        await get_channel_layer().group_send(workspace_hashed_value, {
+            'type': 'status.broadcast',
+            'workspace_hashed_value': workspace_hashed_value,
+            'origin': self.origin,
+            'users_status': users_status,
+        })
+
+    async def _run(self, loop: asyncio.AbstractEventLoop):
+        next_flush = loop.time() + self.flush_interval
+        while self._loop is loop:
+            await asyncio.sleep(self.tick)
+
+            for user_id in self.wheel.advance():
+                workspace_id = self._remove(user_id)
+                if workspace_id is not None:
+                    try:
+                        await self._broadcast(self.hashed_values[workspace_id],
+                                              [self._expired(user_id, workspace_id)])
+                    except Exception:  # Loop should go on. Other processes expire it by themselves too.
+                        logger.exception('Failed to broadcast expiry of user %s.', user_id)
+
+            if self.dirty and loop.time() >= next_flush:
+                next_flush = loop.time() + self.flush_interval
+                await self.flush()
+
+
+presence = PresenceService()
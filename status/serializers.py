@@ -2,16 +2,18 @@ from rest_framework import serializers
 
 from custom_user.serializers import CustomUserSerializer
 from status.models import UserStatus
-from workspace.serializers import BaseWorkspaceSerializer
 
 
 class UserStatusSerializer(serializers.ModelSerializer):
-    workspace = BaseWorkspaceSerializer(read_only=True)
+    """
+    Flat one. Workspace is same for every status in list, So only its hashed value.
+    """
+    workspace_hashed_value = serializers.CharField(source='workspace.hashed_value', read_only=True)
     user = CustomUserSerializer()
 
     class Meta:
         model = UserStatus
-        fields = ['message', 'icon', 'user', 'until', 'workspace']
+        fields = ['message', 'icon', 'user', 'until', 'workspace_hashed_value']
 
 
 class ManyUserStatusSerializer(serializers.Serializer):
@@ -1,3 +1,200 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TransactionTestCase
+from django.utils import timezone
+
+from chat import routing as chat_routing
+from chat_channel.models import ChatChannel
+from chat_reaction import routing as chat_reaction_routing
+from custom_user.models import CustomUser
+from notifications import routing as notifications_routing
+from status import routing
+from status.models import UserStatus
+from status.online import online
+from status.presence import TimerWheel, presence
+from websocket import routing as websocket_routing
+from websocket.testing import auth_communicator, no_blocking_queries
+from workspace.models import Workspace
+
+
+class StatusConsumerTest(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='status_user')
+        self.workspace = Workspace.objects.create(name='status_workspace', hashed_value='statusws')
+        self.workspace.members.add(self.user)
+
+    async def test_update_status_without_blocking_loop(self):
+        until = timezone.now() + timedelta(hours=1)
+
+        with no_blocking_queries():
+            communicator = await auth_communicator(routing.websocket_urlpatterns, '/ws/status/statusws/', self.user)
+            self.assertTrue((await communicator.receive_json_from())['success'])
+            snapshot = await communicator.receive_json_from()
+            await communicator.receive_json_from()  # Online users.
+
+            await communicator.send_json_to({
+                'status_message': 'in meeting',
+                'status_icon': 'calendar',
+                'until': until.isoformat(),
+            })
+            users_status = await communicator.receive_json_from()
+            await presence.flush()
+            await communicator.disconnect()
+
+        self.assertEqual(snapshot, [])
+        self.assertEqual([s['user_id'] for s in users_status], [self.user.id])
+        self.assertEqual(await UserStatus.objects.filter(user=self.user).acount(), 1)
+
+    async def test_reject_not_member(self):
+        stranger = await CustomUser.objects.acreate(username='stranger')
+
+        with no_blocking_queries():
+            communicator = await auth_communicator(routing.websocket_urlpatterns, '/ws/status/statusws/', stranger)
+            self.assertFalse((await communicator.receive_json_from())['success'])
+            await communicator.disconnect()
+
+
+class OnlineTrackerTest(TransactionTestCase):
+    def setUp(self):
+        self.viewer = CustomUser.objects.create(username='viewer')
+        self.user = CustomUser.objects.create(username='online_user')
+        self.workspace = Workspace.objects.create(name='online_workspace', hashed_value='onlinews')
+        self.workspace.members.add(self.viewer, self.user)
+        self.debounce, online.debounce = online.debounce, 0.1
+
+    def tearDown(self):
+        online.debounce = self.debounce
+
+    async def connect(self, user):
+        communicator = await auth_communicator(routing.websocket_urlpatterns, '/ws/status/onlinews/', user)
+        for _ in range(3):  # Auth result, statuses and online users.
+            await communicator.receive_json_from()
+        return communicator
+
+    async def test_publish_diff_per_user_not_per_connection(self):
+        viewer = await self.connect(self.viewer)
+        first = await self.connect(self.user)
+        second = await self.connect(self.user)
+        await first.disconnect()
+
+        diff = await viewer.receive_json_from(timeout=1)
+        self.assertIn(self.user.id, diff['online'])
+        self.assertEqual(diff['offline'], [])
+
+        await second.disconnect()
+        diff = await viewer.receive_json_from(timeout=1)
+        self.assertEqual(diff, {'online': [], 'offline': [self.user.id]})
+        await viewer.disconnect()
+
+
+class OnlineConsumersTest(TransactionTestCase):
+    """
+    Every consumer counts its connection while it's open. (Through `AuthWebsocketConsumer`)
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='online_consumer_user')
+        self.workspace = Workspace.objects.create(name='online_consumer_workspace', hashed_value='onlinecws')
+        self.workspace.members.add(self.user)
+        channel = ChatChannel.objects.create(name='online', workspace=self.workspace, hashed_value='onlinech')
+        channel.members.add(self.user)
+
+    def user_channels(self) -> set[str]:
+        return {channel_name for channel_name, consumer in online.consumers.items() if consumer.user == self.user}
+
+    async def test_connect_and_disconnect(self):
+        sockets = [
+            (chat_routing, '/ws/chat/onlinech/'),
+            (chat_reaction_routing, '/ws/chat_reaction/onlinech/'),
+            (routing, '/ws/status/onlinecws/'),
+            (notifications_routing, '/ws/notification/'),
+            (websocket_routing, '/ws/multiplex/'),
+        ]
+        for module, path in sockets:
+            with self.subTest(path=path):
+                communicator = await auth_communicator(module.websocket_urlpatterns, path, self.user)
+                self.assertTrue((await communicator.receive_json_from())['success'])
+                self.assertEqual(len(self.user_channels()), 1)
+                self.assertEqual(online.connections[self.user.id], self.user_channels())
+
+                await communicator.disconnect()
+                self.assertEqual(self.user_channels(), set())
+                self.assertEqual(online.connections[self.user.id], set())
+
+    async def test_status_snapshot_has_caller(self):
+        communicator = await auth_communicator(routing.websocket_urlpatterns, '/ws/status/onlinecws/', self.user)
+        for _ in range(2):  # Auth result and statuses.
+            await communicator.receive_json_from()
+        snapshot = await communicator.receive_json_from()
+        await communicator.disconnect()
+
+        self.assertEqual(snapshot, {'online': [self.user.id], 'offline': []})
+
+    async def test_connect_at_once(self):
+        first, second = (SimpleNamespace(user=self.user, channel_name=name) for name in ('first', 'second'))
+
+        await asyncio.gather(online.connected(first), online.connected(second))
+
+        self.assertEqual(online.connections[self.user.id], {'first', 'second'})
+        self.assertEqual(online.user_workspaces[self.user.id], ['onlinecws'])
+
+
+class PresenceServiceTest(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='presence_user')
+        self.workspace = Workspace.objects.create(name='presence_workspace', hashed_value='presencews')
+        self.workspace.members.add(self.user)
+        self.tick, presence.tick = presence.tick, 0.05
+
+    def tearDown(self):
+        presence.tick = self.tick
+
+    async def test_state_is_dropped_after_last_subscriber(self):
+        presence.ensure_started()
+        await presence.join(self.workspace)
+        await presence.join(self.workspace)
+        presence.leave(self.workspace.id)
+        self.assertIn(self.workspace.id, presence.workspaces)
+
+        presence.leave(self.workspace.id)
+        self.assertNotIn(self.workspace.id, presence.workspaces)
+
+        # Written by other process while nobody here listened.
+        await UserStatus.objects.acreate(user=self.user, workspace=self.workspace, message='away', icon='zz',
+                                         until=timezone.now() + timedelta(hours=1))
+        await presence.join(self.workspace)
+        statuses = await presence.snapshot(self.workspace)
+        presence.leave(self.workspace.id)
+
+        self.assertEqual([status['user_id'] for status in statuses], [self.user.id])
+
+    async def test_expiry_goes_on_after_broadcast_error(self):
+        presence.ensure_started()
+        await presence.join(self.workspace)
+        other = await CustomUser.objects.acreate(username='presence_other')
+        soon = timezone.now() + timedelta(seconds=presence.tick)
+        for user_id in (self.user.id, other.id):
+            presence._set(presence._to_status(self.workspace.id, user_id, 'brb', 'x', soon), soon)
+
+        with mock.patch.object(presence, '_broadcast', side_effect=RuntimeError) as broadcast, \
+                self.assertLogs('status.presence', level='ERROR'):
+            await asyncio.sleep(presence.tick * 3)
+        presence.leave(self.workspace.id)
+
+        self.assertEqual(broadcast.call_count, 2)
+
+
+class TimerWheelTest(SimpleTestCase):
+    def test_expire_after_laps(self):
+        wheel = TimerWheel(slots=4)
+        wheel.add('short', 2)
+        wheel.add('long', 6)
+        wheel.add('cancelled', 1)
+        wheel.cancel('cancelled')
+
+        expired = [wheel.advance() for _ in range(6)]
+
+        self.assertEqual(expired, [[], ['short'], [], [], [], ['long']])
@@ -2,7 +2,6 @@ import json
 from abc import abstractmethod, ABC
 
 import rest_framework_simplejwt
-from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.utils.encoding import smart_str
 from pytz import unicode
@@ -10,10 +9,13 @@ from rest_framework_simplejwt.exceptions import TokenError
 
 from AuthHelper import AuthHelper
 from custom_user.models import CustomUser
+from status.online import online
+from websocket.metrics import InstrumentedConsumerMixin
 
 
-class AuthWebsocketConsumer(AsyncJsonWebsocketConsumer, ABC):
+class AuthWebsocketConsumer(InstrumentedConsumerMixin, AsyncJsonWebsocketConsumer, ABC):
     user: CustomUser | None = None  # To save current user information.
+    room_group_name: str | None = None  # Group joined right after auth. `None` means no group.
 
     async def connect(self):
         self.scope['subprotocol'] = 'UTF-8'
@@ -36,13 +38,16 @@ class AuthWebsocketConsumer(AsyncJsonWebsocketConsumer, ABC):
         """
 
         if self.user is None and content.get('authorization', None) is not None:
+            self.label_message('auth')
             try:
-                self.user, _ = await sync_to_async(AuthHelper.find_user_by_access_token)(content.get('authorization'))
+                self.user, _ = await AuthHelper.afind_user_by_access_token(content.get('authorization'))
+                await online.connected(self)  # Before `after_auth`, Which could give online users.
                 await self.after_auth()
-                await self.channel_layer.group_add(
-                    self.room_group_name,
-                    self.channel_name
-                )
+                if self.room_group_name:
+                    await self.channel_layer.group_add(
+                        self.room_group_name,
+                        self.channel_name
+                    )
             except rest_framework_simplejwt.exceptions.TokenError as e:
                 await self.send_json({
                     'success': False,
@@ -59,7 +64,13 @@ class AuthWebsocketConsumer(AsyncJsonWebsocketConsumer, ABC):
                     'msg': 'You already have auth info in server.\nIf you want to re-auth, Just re-connect server.',
                     'user': f'user_id: {self.user.id}'
                 })
+            elif content.get('heartbeat', None) is not None:
+                self.label_message('heartbeat')
+                online.heartbeat(self)
+                await self.send_json({'heartbeat': True})
             else:
+                online.seen(self)
+                self.label_message('from_client')
                 await self.from_client(content, **kwargs)
         else:
             await self.send_json({
@@ -93,8 +104,18 @@ class AuthWebsocketConsumer(AsyncJsonWebsocketConsumer, ABC):
             'user_id': self.user.id
         })
 
+    async def leave(self):
+        """
+        Subscription ended. (Socket closed, Or unsubscribed from multiplexed socket.)
+        Release what's held for it, Except group which is discarded by caller.
+        """
+        pass
+
     async def disconnect(self, code):
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.leave()
+        online.disconnected(self)
+        if self.room_group_name:
+            await self.channel_layer.group_discard(
+                self.room_group_name,
+                self.channel_name
+            )
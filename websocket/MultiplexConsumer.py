@@ -0,0 +1,160 @@
+import json
+
+from chat.consumers import ChatConsumer
+from chat_reaction.consumers import ReactionConsumer
+from notifications.consumers import NotificationsConsumer
+from status.consumers import StatusConsumer
+from websocket.AuthWebsocketConsumer import AuthWebsocketConsumer
+
+
+class MultiplexConsumer(AuthWebsocketConsumer):
+    """
+    One socket for every stream a client is looking at.
+    Client authorizes once, then subscribes/unsubscribes streams and talks to them over this socket.
+
+    Each subscription is a "virtual" instance of the single-stream consumer (`ChatConsumer` and etc...),
+    sharing this socket's user, channel layer and channel name.
+    So group names, validation and broadcasting are exactly the same as dedicated sockets.
+    """
+
+    # stream name: (consumer class, url kwarg name of target)
+    streams = {
+        'chat': (ChatConsumer, 'chat_channel_hashed_value'),
+        'reaction': (ReactionConsumer, 'chat_channel_hashed_value'),
+        'status': (StatusConsumer, 'workspace_hashed_value'),
+        'notification': (NotificationsConsumer, None),
+    }
+
+    form = json.dumps({
+        'action': 'subscribe or unsubscribe (omit to send `payload` to subscribed stream)',
+        'stream': ' or '.join(streams.keys()),
+        'target': 'hashed value of chat channel or workspace (omit for notification)',
+        'payload': 'message to stream, same as dedicated socket',
+    })
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.subscriptions: dict[tuple[str, str | None], AuthWebsocketConsumer] = {}
+
+    async def before_accept(self):
+        # Groups are joined per subscription.
+        pass
+
+    async def after_accept(self):
+        pass
+
+    async def after_auth(self):
+        await super().after_auth()
+
+    async def from_client(self, content, **kwargs):
+        stream = content.get('stream', None)
+        if stream not in self.streams:
+            await self.send_json({
+                'success': False,
+                'msg': f'Unknown stream: {stream}',
+                'form': self.form,
+            })
+            return
+
+        # Notification stream has only one target. (current user)
+        target = content.get('target', None) if self.streams[stream][1] else None
+        action = content.get('action', None)
+
+        if action == 'subscribe':
+            await self.subscribe(stream, target)
+        elif action == 'unsubscribe':
+            await self.unsubscribe(stream, target)
+        elif (consumer := self.subscriptions.get((stream, target), None)) is not None:
+            await consumer.from_client(content.get('payload', {}), **kwargs)
+        else:
+            await self.send_json({
+                'success': False,
+                'stream': stream,
+                'target': target,
+                'msg': 'Subscribe this stream first.',
+            })
+
+    async def subscribe(self, stream: str, target: str | None):
+        if (stream, target) in self.subscriptions:
+            await self.send_stream_json(stream, target, {'success': True, 'msg': 'Already subscribed.'})
+            return
+
+        consumer_class, target_kwarg = self.streams[stream]
+        consumer = consumer_class()
+        consumer.scope = {
+            **self.scope,
+            'url_route': {'args': (), 'kwargs': {target_kwarg: target} if target_kwarg else {}},
+        }
+        consumer.channel_layer = self.channel_layer
+        consumer.channel_name = self.channel_name
+        consumer.user = self.user
+        consumer.closed = False
+
+        async def send_json(content, close=False):
+            # `close` of virtual consumer means "this subscription is rejected", not closing the socket.
+            consumer.closed = consumer.closed or close
+            await self.send_stream_json(stream, target, content)
+
+        consumer.send_json = send_json
+
+        for step in (consumer.before_accept, consumer.after_accept, consumer.after_auth):
+            await step()
+            if consumer.closed:
+                return
+
+        if consumer.room_group_name:
+            await self.channel_layer.group_add(consumer.room_group_name, self.channel_name)
+        self.subscriptions[(stream, target)] = consumer
+
+    async def unsubscribe(self, stream: str, target: str | None):
+        consumer = self.subscriptions.pop((stream, target), None)
+        if consumer is None:
+            await self.send_stream_json(stream, target, {'success': False, 'msg': 'Not subscribed.'})
+            return
+
+        await consumer.leave()
+        if consumer.room_group_name and not self.is_group_in_use(consumer.room_group_name):
+            await self.channel_layer.group_discard(consumer.room_group_name, self.channel_name)
+        await self.send_stream_json(stream, target, {'success': True, 'msg': 'Unsubscribed.'})
+
+    def is_group_in_use(self, group: str) -> bool:
+        return any(consumer.room_group_name == group for consumer in self.subscriptions.values())
+
+    async def send_stream_json(self, stream: str, target: str | None, content):
+        await self.send_json({
+            'stream': stream,
+            'target': target,
+            'payload': content,
+        })
+
+    async def to_stream(self, stream: str, target: str | None, handler: str, event):
+        """
+        Pass group event to subscribed virtual consumer. (Which wraps it with stream and target.)
+        """
+        consumer = self.subscriptions.get((stream, target), None)
+        if consumer is not None:
+            await getattr(consumer, handler)(event)
+
+    async def chat_broadcast(self, event):
+        await self.to_stream('chat', event['chat_channel_hashed_value'], 'chat_broadcast', event)
+
+    async def reaction_broadcast(self, event):
+        await self.to_stream('reaction', event['chat_channel_hashed_value'], 'reaction_broadcast', event)
+
+    async def status_broadcast(self, event):
+        await self.to_stream('status', event['workspace_hashed_value'], 'status_broadcast', event)
+
+    async def presence_broadcast(self, event):
+        await self.to_stream('status', event['workspace_hashed_value'], 'presence_broadcast', event)
+
+    async def notifications_broadcast(self, event):
+        await self.to_stream('notification', None, 'notifications_broadcast', event)
+
+    async def disconnect(self, code):
+        for consumer in self.subscriptions.values():
+            await consumer.leave()
+        for group in {consumer.room_group_name for consumer in self.subscriptions.values()}:
+            if group:
+                await self.channel_layer.group_discard(group, self.channel_name)
+        self.subscriptions.clear()
+        await super().disconnect(code)
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import defaultdict, deque
+from datetime import datetime
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    buckets = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)  # Upper bound of each bucket in ms.
+
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)  # Last one is for over 5000ms.
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def snapshot(self) -> dict:
+        labels = [f'le_{bound}' for bound in self.buckets] + ['inf']
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count, 3) if self.count else 0,
+            'max_ms': round(self.max, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class ConsumerMetrics:
+    """
+    Per process metrics of websocket consumers.
+
+    1. Latency histogram per consumer and message type.
+    2. Event loop lag, Measured by heartbeat task which should wake up every `lag_interval`.
+    3. Blocking warnings. Watchdog thread checks heartbeat and when loop did not respond over `threshold`,
+       It logs stack of loop thread and handlers running at that time.
+    """
+
+    def __init__(self):
+        self.threshold: float = getattr(settings, 'WEBSOCKET_BLOCKING_THRESHOLD', 0.25)  # seconds
+        self.lag_interval: float = getattr(settings, 'WEBSOCKET_LOOP_LAG_INTERVAL', 0.1)  # seconds
+
+        self.started_at = datetime.now()
+        self.handlers: dict[str, Histogram] = defaultdict(Histogram)
+        self.loop_lag = Histogram()
+        self.recent_loop_lag: deque[float] = deque(maxlen=120)
+        self.blocking_events: deque[dict] = deque(maxlen=50)
+
+        self.running: dict[int, tuple[str, float]] = {}  # id of task: (label, started at)
+        self._lock = threading.Lock()  # Watchdog thread reads while loop writes.
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._last_tick: float | None = None
+        self._reported_tick: float | None = None
+        self._watchdog: threading.Thread | None = None
+
+    def ensure_started(self):
+        """
+        Start heartbeat on current event loop (and watchdog thread at first time).
+        """
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        loop.create_task(self._heartbeat(loop))
+
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name='websocket-metrics-watchdog', daemon=True)
+            self._watchdog.start()
+
+    def handler_started(self, label: str) -> int:
+        key = id(asyncio.current_task())
+        with self._lock:
+            self.running[key] = (label, time.monotonic())
+        return key
+
+    def handler_finished(self, key: int, label: str):
+        """
+        `label` can be different with started one, Because handler may make it detailed.
+        """
+        with self._lock:
+            _, started_at = self.running.pop(key)
+            self.handlers[label].observe((time.monotonic() - started_at) * 1000)
+
+    async def _heartbeat(self, loop: asyncio.AbstractEventLoop):
+        try:
+            while self._loop is loop:
+                tick = time.monotonic()
+                self._last_tick = tick
+                await asyncio.sleep(self.lag_interval)
+
+                lag = max(time.monotonic() - tick - self.lag_interval, 0) * 1000
+                with self._lock:
+                    self.loop_lag.observe(lag)
+                    self.recent_loop_lag.append(round(lag, 3))
+        finally:
+            # Loop is closing. Stop watching it until new one starts.
+            if self._loop is loop:
+                self._loop = None
+                self._last_tick = None
+
+    def _watch(self):
+        while True:
+            time.sleep(self.threshold / 2)
+
+            last_tick = self._last_tick
+            if last_tick is None:
+                continue
+            stalled = time.monotonic() - last_tick - self.lag_interval
+            if stalled <= self.threshold or self._reported_tick == last_tick:
+                continue
+            self._reported_tick = last_tick  # Report one stall only once.
+
+            frame = sys._current_frames().get(self._loop_thread_id, None)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+            with self._lock:
+                now = time.monotonic()
+                running = {label: round((now - started_at) * 1000, 3) for label, started_at in self.running.values()}
+                self.blocking_events.append({
+                    'at': datetime.now().isoformat(),
+                    'stalled_ms': round(stalled * 1000, 3),
+                    'running_handlers_ms': running,
+                    'stack': stack,
+                })
+
+            logger.warning('Websocket event loop is blocked over %.0fms. Running handlers: %s\n%s',
+                           stalled * 1000, running, stack)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'started_at': self.started_at.isoformat(),
+                'blocking_threshold_ms': self.threshold * 1000,
+                'handlers': {label: histogram.snapshot() for label, histogram in sorted(self.handlers.items())},
+                'loop_lag': self.loop_lag.snapshot(),
+                'recent_loop_lag_ms': list(self.recent_loop_lag),
+                'blocking_events': list(self.blocking_events),
+            }
+
+
+metrics = ConsumerMetrics()
+
+
+class InstrumentedConsumerMixin:
+    """
+    Put this before channels consumer class. Every message (from client or channel layer) is measured.
+    Label is `{consumer class}:{message type}`, Handler can make it detailed with `label_message`.
+    """
+    metrics_label: str | None = None
+
+    def label_message(self, detail: str):
+        self.metrics_label = f'{self.metrics_label}:{detail}'
+
+    async def dispatch(self, message):
+        metrics.ensure_started()
+        self.metrics_label = f'{type(self).__name__}:{message["type"]}'
+        key = metrics.handler_started(self.metrics_label)
+        try:
+            await super().dispatch(message)
+        finally:
+            metrics.handler_finished(key, self.metrics_label)
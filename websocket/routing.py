@@ -0,0 +1,7 @@
+from django.urls import re_path
+
+from websocket.MultiplexConsumer import MultiplexConsumer
+
+websocket_urlpatterns = [
+    re_path(r'ws/multiplex/$', MultiplexConsumer.as_asgi()),
+]
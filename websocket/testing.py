@@ -0,0 +1,64 @@
+import asyncio
+import traceback
+from contextlib import contextmanager
+from unittest import mock
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.db.backends.utils import CursorWrapper
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def is_loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+@contextmanager
+def no_blocking_queries():
+    """
+    Fail if any query is executed on the thread which runs event loop.
+
+    Queries of async ORM (`aget`, `asave`...) run on worker thread, so they pass.
+    Sync ORM inside consumer raises `SynchronousOnlyOperation` already,
+    But this catches it even if `DJANGO_ALLOW_ASYNC_UNSAFE` is set or the error is swallowed.
+    """
+    blocking: list[tuple[str, str]] = []
+    execute, executemany = CursorWrapper.execute, CursorWrapper.executemany
+
+    def check(sql):
+        if is_loop_running():
+            blocking.append((sql, ''.join(traceback.format_stack(limit=15))))
+
+    def patched_execute(self, sql, params=None):
+        check(sql)
+        return execute(self, sql, params)
+
+    def patched_executemany(self, sql, param_list):
+        check(sql)
+        return executemany(self, sql, param_list)
+
+    with mock.patch.object(CursorWrapper, 'execute', patched_execute), \
+            mock.patch.object(CursorWrapper, 'executemany', patched_executemany):
+        yield blocking
+
+    if blocking:
+        sql, stack = blocking[0]
+        raise AssertionError(f'{len(blocking)} blocking queries on event loop. First one: {sql}\n{stack}')
+
+
+async def auth_communicator(websocket_urlpatterns, path: str, user) -> WebsocketCommunicator:
+    """
+    Connect to consumer and send access token of `user`.
+    Greeting is consumed, auth response is left to caller.
+    """
+    communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+    connected, _ = await communicator.connect()
+    assert connected
+    await communicator.receive_json_from()  # Greeting message asking access token.
+
+    await communicator.send_json_to({'authorization': str(AccessToken.for_user(user))})
+    return communicator
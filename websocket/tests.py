@@ -0,0 +1,125 @@
+from channels.layers import get_channel_layer
+from django.test import TransactionTestCase
+
+from chat_channel.models import ChatChannel
+from custom_user.models import CustomUser
+from websocket import routing
+from websocket.testing import auth_communicator, no_blocking_queries
+from workspace.models import Workspace
+
+
+class MultiplexConsumerTest(TransactionTestCase):
+    # Messages sent at subscribe. (Status gives statuses and online users after auth result.)
+    subscribe_messages = {'chat': 1, 'reaction': 1, 'status': 3}
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='multiplex_user')
+        self.workspace = Workspace.objects.create(name='multiplex_workspace', hashed_value='muxws')
+        self.workspace.members.add(self.user)
+        self.channel = ChatChannel.objects.create(name='multiplex', workspace=self.workspace, hashed_value='muxch')
+        self.channel.members.add(self.user)
+
+    async def connect(self):
+        communicator = await auth_communicator(routing.websocket_urlpatterns, '/ws/multiplex/', self.user)
+        self.assertTrue((await communicator.receive_json_from())['success'])
+        return communicator
+
+    async def subscribe(self, communicator, stream: str, target: str | None) -> dict:
+        await communicator.send_json_to({'action': 'subscribe', 'stream': stream, 'target': target})
+        messages = [await communicator.receive_json_from() for _ in range(self.subscribe_messages[stream])]
+        self.assertEqual({(message['stream'], message['target']) for message in messages}, {(stream, target)})
+        return messages[0]['payload']
+
+    @staticmethod
+    def chat_event(hashed_value: str) -> dict:
+        return {
+            'type': 'chat.broadcast', 'chat_id': 1, 'username': 'multiplex_user', 'user_id': 1,
+            'message': 'hello', 'file_id': None, 'created_at': 'now',
+            'chat_channel_hashed_value': hashed_value, 'chat_channel_name': 'multiplex',
+        }
+
+    def status_event(self, hashed_value: str) -> dict:
+        return {
+            'type': 'status.broadcast', 'origin': 'other process', 'workspace_hashed_value': hashed_value,
+            'users_status': [{'user_id': self.user.id, 'workspace_id': self.workspace.id, 'expired': True}],
+        }
+
+    async def test_broadcast_goes_to_its_stream(self):
+        layer = get_channel_layer()
+        with no_blocking_queries():
+            communicator = await self.connect()
+            self.assertTrue((await self.subscribe(communicator, 'chat', 'muxch'))['success'])
+            self.assertTrue((await self.subscribe(communicator, 'reaction', 'muxch'))['success'])
+            self.assertTrue((await self.subscribe(communicator, 'status', 'muxws'))['success'])
+
+            await layer.group_send('muxch', self.chat_event('muxch'))
+            chat = await communicator.receive_json_from()
+            await layer.group_send('reaction_muxch', {'type': 'reaction.broadcast', 'reaction': {'icon': 'ok'},
+                                                      'chat_channel_hashed_value': 'muxch'})
+            reaction = await communicator.receive_json_from()
+            await layer.group_send('muxws', self.status_event('muxws'))
+            status = await communicator.receive_json_from()
+            await communicator.disconnect()
+
+        self.assertEqual((chat['stream'], chat['target'], chat['payload']['message']), ('chat', 'muxch', 'hello'))
+        self.assertEqual((reaction['stream'], reaction['target'], reaction['payload']['reaction']),
+                         ('reaction', 'muxch', {'icon': 'ok'}))
+        self.assertEqual((status['stream'], status['target'], status['payload'][0]['user_id']),
+                         ('status', 'muxws', self.user.id))
+
+    async def test_rejected_subscription(self):
+        with no_blocking_queries():
+            communicator = await self.connect()
+            payload = await self.subscribe(communicator, 'chat', 'nowhere')
+            await communicator.send_json_to({'stream': 'chat', 'target': 'nowhere', 'payload': {'message': 'hi'}})
+            not_subscribed = await communicator.receive_json_from()
+            await communicator.send_json_to({'action': 'subscribe', 'stream': 'unknown'})
+            unknown = await communicator.receive_json_from()
+            await communicator.disconnect()
+
+        self.assertFalse(payload['success'])
+        self.assertEqual(not_subscribed['msg'], 'Subscribe this stream first.')
+        self.assertFalse(unknown['success'])
+
+    async def test_unsubscribe(self):
+        layer = get_channel_layer()
+        with no_blocking_queries():
+            communicator = await self.connect()
+            await self.subscribe(communicator, 'chat', 'muxch')
+            await communicator.send_json_to({'action': 'unsubscribe', 'stream': 'chat', 'target': 'muxch'})
+            unsubscribed = await communicator.receive_json_from()
+            await communicator.send_json_to({'action': 'unsubscribe', 'stream': 'chat', 'target': 'muxch'})
+            again = await communicator.receive_json_from()
+
+            await layer.group_send('muxch', self.chat_event('muxch'))
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+        self.assertTrue(unsubscribed['payload']['success'])
+        self.assertFalse(again['payload']['success'])
+        self.assertNotIn('muxch', layer.groups)
+
+    async def test_group_kept_while_shared(self):
+        # Chat channel and workspace of same hashed value are one group.
+        workspace = await Workspace.objects.acreate(name='shared_workspace', hashed_value='shared')
+        await workspace.members.aadd(self.user)
+        channel = await ChatChannel.objects.acreate(name='shared', workspace=workspace, hashed_value='shared')
+        await channel.members.aadd(self.user)
+        layer = get_channel_layer()
+
+        with no_blocking_queries():
+            communicator = await self.connect()
+            await self.subscribe(communicator, 'chat', 'shared')
+            await self.subscribe(communicator, 'status', 'shared')
+            await communicator.send_json_to({'action': 'unsubscribe', 'stream': 'chat', 'target': 'shared'})
+            await communicator.receive_json_from()
+
+            self.assertIn('shared', layer.groups)
+            await layer.group_send('shared', self.status_event('shared'))
+            status = await communicator.receive_json_from()
+            await layer.group_send('shared', self.chat_event('shared'))  # No chat subscription to take it.
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+        self.assertEqual((status['stream'], status['target']), ('status', 'shared'))
+        self.assertNotIn('shared', layer.groups)
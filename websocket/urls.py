@@ -0,0 +1,7 @@
+from django.urls import path
+
+from websocket.views import WebsocketMetricsView
+
+urlpatterns = [
+    path('metrics/', WebsocketMetricsView.as_view()),
+]
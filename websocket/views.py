@@ -0,0 +1,18 @@
+from rest_framework import generics, permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from websocket.metrics import metrics
+
+
+class WebsocketMetricsView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: Request, *args, **kwargs):
+        """
+        이 프로세스(daphne)의 websocket consumer 지표를 보여줍니다. (staff only)
+        `handlers`는 consumer와 메세지 종류별 처리 시간 분포(ms),
+        `loop_lag`은 event loop 지연 분포,
+        `blocking_events`는 event loop가 임계값 이상 멈췄을 때의 stack trace 입니다.
+        """
+        return Response(metrics.snapshot())
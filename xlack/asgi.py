@@ -24,6 +24,7 @@ import chat_reaction.routing
 import status.routing
 import notifications.routing
 import call.routing
+import websocket.routing
 
 application = ProtocolTypeRouter(
     {
@@ -35,6 +36,7 @@ application = ProtocolTypeRouter(
                 + notifications.routing.websocket_urlpatterns
                 + chat_reaction.routing.websocket_urlpatterns
                 + call.routing.websocket_urlpatterns
+                + websocket.routing.websocket_urlpatterns
             )
         ),
     }
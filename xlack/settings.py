@@ -154,6 +154,14 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared by every process, So invalidation (search generations...) is seen everywhere.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/1",
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -49,6 +49,7 @@ urlpatterns = [
     path("file/", include("file.urls")),
     path("notifications/", include("notifications.urls")),
     path('search/', include('search.urls')),
+    path('websocket/', include('websocket.urls')),
 ]
 
 if settings.DEBUG: